@@ -0,0 +1,11 @@
+"""
+Benchmark suite for the main views.
+
+Seeds a throwaway test database with N users x M transactions x K watchlist
+items, drives the views through the Django test client and reports latency
+percentiles, queries per request and peak memory. Run it with::
+
+    python -m benchmarks --users 5 --transactions 5000 --watchlist 50
+
+See ``python -m benchmarks --help`` for the baseline comparison options.
+"""
@@ -0,0 +1,75 @@
+import argparse
+import os
+import sys
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='Benchmark the main views')
+    parser.add_argument('--users', type=int, default=5)
+    parser.add_argument('--transactions', type=int, default=2000, help='Transactions per user')
+    parser.add_argument('--watchlist', type=int, default=50, help='Watchlist items per user')
+    parser.add_argument('--iterations', type=int, default=30, help='Measured requests per scenario')
+    parser.add_argument('--only', action='append', default=[], help='Run only this scenario (repeatable)')
+    parser.add_argument('--output', default='benchmarks/results.json', help='Where to write the JSON report')
+    parser.add_argument('--baseline', default='benchmarks/baseline.json', help='Baseline report to compare with')
+    parser.add_argument('--save-baseline', action='store_true', help='Also write the report as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed p95 slowdown (fraction)')
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'finance_portfolio.settings')
+    import django
+    django.setup()
+
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    from benchmarks import runner
+    from benchmarks.scenarios import default_scenarios
+    from benchmarks.seed import seed
+
+    scenarios = [s for s in default_scenarios() if not args.only or s.name in args.only]
+
+    # Seed a throwaway test database, never the configured one
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        users = seed(args.users, args.transactions, args.watchlist)
+        report = runner.run(users[0], scenarios, args.iterations, meta={
+            'users': args.users,
+            'transactions_per_user': args.transactions,
+            'watchlist_per_user': args.watchlist,
+        })
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+    print(runner.format_table(report))
+    runner.save(report, args.output)
+    print(f'\nReport written to {args.output}')
+
+    broken = runner.failures(report)
+    if broken:
+        print('\nScenarios that did not respond as expected:')
+        for line in broken:
+            print(f'  {line}')
+        return 1
+
+    if args.save_baseline:
+        runner.save(report, args.baseline)
+        print(f'Baseline written to {args.baseline}')
+        return 0
+
+    if os.path.exists(args.baseline):
+        regressions = runner.compare(report, runner.load(args.baseline), args.tolerance)
+        if regressions:
+            print('\nRegressions against the baseline:')
+            for line in regressions:
+                print(f'  {line}')
+            return 1
+        print('\nNo regressions against the baseline.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
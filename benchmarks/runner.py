@@ -0,0 +1,130 @@
+"""Drive the scenarios, collect statistics and compare with a baseline"""
+import json
+import math
+import platform
+import time
+import tracemalloc
+
+import django
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of ``values``"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+
+def run_scenario(scenario, client, user, iterations, warmup=2):
+    """Run ``scenario`` and return its statistics"""
+    # Warm-up requests are not measured and are extra to ``iterations``
+    scenario.prepare(user, iterations + warmup + 1)
+    for index in range(warmup):
+        scenario.request(client, index)
+
+    timings, queries, statuses = [], [], set()
+    for index in range(warmup, warmup + iterations):
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = scenario.request(client, index)
+            timings.append((time.perf_counter() - started) * 1000)
+        queries.append(len(captured))
+        statuses.add(response.status_code)
+
+    # Peak memory from one more traced request (tracing slows the others)
+    tracemalloc.start()
+    try:
+        scenario.request(client, warmup + iterations)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'iterations': iterations,
+        'p50_ms': round(percentile(timings, 0.50), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'p99_ms': round(percentile(timings, 0.99), 3),
+        'mean_ms': round(sum(timings) / len(timings), 3),
+        'queries': max(queries),
+        'peak_memory_kb': round(peak / 1024, 1),
+        'status_codes': sorted(statuses),
+        'expected_status': scenario.expect,
+    }
+
+
+def run(user, scenarios, iterations, meta=None):
+    """Run every scenario as ``user``; returns the report dict"""
+    client = Client()
+    client.force_login(user)
+    results = {}
+    for scenario in scenarios:
+        results[scenario.name] = run_scenario(scenario, client, user, iterations)
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            **(meta or {}),
+        },
+        'results': results,
+    }
+
+
+def failures(report):
+    """Scenarios that answered with an unexpected status code"""
+    return [
+        f"{name}: status {result['status_codes']}, expected {result['expected_status']}"
+        for name, result in report['results'].items()
+        if result['status_codes'] != [result['expected_status']]
+    ]
+
+
+def compare(report, baseline, tolerance=0.25):
+    """Regressions of ``report`` against ``baseline`` as human-readable lines.
+
+    A scenario regresses when its p95 latency grows by more than
+    ``tolerance`` (a fraction) or it issues more queries per request.
+    """
+    regressions = []
+    for name, result in report['results'].items():
+        previous = baseline.get('results', {}).get(name)
+        if not previous:
+            continue
+        limit = previous['p95_ms'] * (1 + tolerance)
+        if result['p95_ms'] > limit:
+            regressions.append(
+                f"{name}: p95 {result['p95_ms']:.1f}ms > {limit:.1f}ms "
+                f"(baseline {previous['p95_ms']:.1f}ms +{tolerance:.0%})"
+            )
+        if result['queries'] > previous['queries']:
+            regressions.append(
+                f"{name}: {result['queries']} queries > baseline {previous['queries']}"
+            )
+    return regressions
+
+
+def format_table(report):
+    header = f"{'scenario':<30}{'p50':>9}{'p95':>9}{'p99':>9}{'queries':>9}{'peak KB':>10}"
+    lines = [header, '-' * len(header)]
+    for name, result in report['results'].items():
+        lines.append(
+            f"{name:<30}{result['p50_ms']:>9.1f}{result['p95_ms']:>9.1f}{result['p99_ms']:>9.1f}"
+            f"{result['queries']:>9}{result['peak_memory_kb']:>10.0f}"
+        )
+    return '\n'.join(lines)
+
+
+def load(path):
+    with open(path, encoding='utf-8') as handle:
+        return json.load(handle)
+
+
+def save(report, path):
+    with open(path, 'w', encoding='utf-8') as handle:
+        json.dump(report, handle, indent=2)
+        handle.write('\n')
@@ -0,0 +1,121 @@
+"""The requests each benchmark scenario issues"""
+import datetime
+
+from django.urls import reverse
+
+from finance_portfolio.pagination import KeysetPaginator
+from transactions.ledger import refresh_after_bulk_write
+from transactions.models import Transaction
+from transactions.views import TransactionListView
+from watchlist.models import Watchlist
+
+
+class Scenario:
+    """A named request; ``prepare`` runs once, ``request`` once per iteration"""
+
+    def __init__(self, name, request, prepare=None, expect=200):
+        self.name = name
+        self.expect = expect
+        self._request = request
+        self._prepare = prepare
+        self.state = None
+
+    def prepare(self, user, iterations):
+        if self._prepare:
+            self.state = self._prepare(user, iterations)
+
+    def request(self, client, iteration):
+        return self._request(client, iteration, self.state)
+
+
+def _get(url_name, query=''):
+    def request(client, iteration, state):
+        return client.get(reverse(url_name) + query, secure=True)
+    return request
+
+
+def _deep_cursor(user, iterations, depth=0.9):
+    """A cursor ~90% of the way through the user's transactions"""
+    queryset = Transaction.objects.filter(user=user).order_by(*TransactionListView.cursor_ordering)
+    offset = int(queryset.count() * depth)
+    row = queryset[offset:offset + 1].first()
+    return KeysetPaginator(TransactionListView.cursor_ordering).encode(row, 'next') if row else ''
+
+
+def _deep_page(client, iteration, cursor):
+    return client.get(reverse('transaction_list') + f'?cursor={cursor}', secure=True)
+
+
+def _transaction_form(iteration):
+    return {
+        'transaction_type': 'EXPENSE',
+        'category': 'FOOD',
+        'amount': f'{10 + iteration % 90}.50',
+        'currency': 'USD',
+        'description': f'benchmark coffee {iteration}',
+        'date': datetime.date.today().isoformat(),
+    }
+
+
+def _create(client, iteration, state):
+    return client.post(reverse('transaction_create'), _transaction_form(iteration), secure=True)
+
+
+def _own_transactions(user, iterations):
+    return list(
+        Transaction.objects.filter(user=user).order_by('-pk').values_list('pk', flat=True)[:iterations]
+    )
+
+
+def _update(client, iteration, pks):
+    pk = pks[iteration % len(pks)]
+    return client.post(reverse('transaction_update', args=[pk]), _transaction_form(iteration), secure=True)
+
+
+def _move(client, iteration, pks):
+    # Another month and currency each time, so both rollup buckets and the
+    # balance change and the target bucket is often new
+    pk = pks[iteration % len(pks)]
+    form = _transaction_form(iteration)
+    form['date'] = (datetime.date.today() - datetime.timedelta(days=31 * (1 + iteration % 12))).isoformat()
+    form['currency'] = ('EUR', 'GBP', 'JPY')[iteration % 3]
+    return client.post(reverse('transaction_update', args=[pk]), form, secure=True)
+
+
+def _pool_for_delete(user, iterations):
+    # Fresh rows so every iteration deletes something
+    created = Transaction.objects.bulk_create([
+        Transaction(user=user, transaction_type='EXPENSE', category='OTHER', amount=1,
+                    date=datetime.date.today(), description='to delete')
+        for _ in range(iterations)
+    ])
+    refresh_after_bulk_write([user.pk], [transaction.pk for transaction in created])
+    return iter([transaction.pk for transaction in created])
+
+
+def _delete(client, iteration, pool):
+    return client.post(reverse('transaction_delete', args=[next(pool)]), secure=True)
+
+
+def _watchlist_item(user, iterations):
+    return Watchlist.objects.filter(user=user).values_list('pk', flat=True).first()
+
+
+def _detail(client, iteration, pk):
+    return client.get(reverse('watchlist_detail', args=[pk]), secure=True)
+
+
+def default_scenarios():
+    return [
+        Scenario('dashboard', _get('dashboard')),
+        Scenario('transaction_list', _get('transaction_list')),
+        Scenario('transaction_list_filtered', _get('transaction_list', '?type=EXPENSE&category=FOOD')),
+        Scenario('transaction_list_search', _get('transaction_list', '?search=coffee')),
+        Scenario('transaction_list_deep_page', _deep_page, _deep_cursor),
+        Scenario('watchlist_list', _get('watchlist_list')),
+        Scenario('watchlist_detail', _detail, _watchlist_item),
+        Scenario('transaction_create', _create, expect=302),
+        Scenario('transaction_update', _update, _own_transactions, expect=302),
+        Scenario('transaction_update_moved', _move, _own_transactions, expect=302),
+        Scenario('transaction_delete', _delete, _pool_for_delete, expect=302),
+    ]
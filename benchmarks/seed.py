@@ -0,0 +1,85 @@
+"""Bulk data generator for benchmarks"""
+import datetime
+import random
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+
+from finance_portfolio import search
+from transactions.ledger import refresh_after_bulk_write
+from transactions.models import Transaction
+from watchlist.models import Watchlist
+
+
+PASSWORD = 'benchmark-password'
+
+WORDS = (
+    'coffee', 'groceries', 'rent', 'uber', 'netflix', 'salary', 'bonus', 'pharmacy',
+    'books', 'dinner', 'lunch', 'fuel', 'electricity', 'internet', 'gym', 'concert',
+)
+
+
+def _symbols(count):
+    letters = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+    return [
+        letters[i // 676 % 26] + letters[i // 26 % 26] + letters[i % 26]
+        for i in range(count)
+    ]
+
+
+def seed(users=5, transactions=2000, watchlist=50, seed=42, batch_size=2000, days=730):
+    """Create ``users`` users, each with ``transactions`` transactions and
+    ``watchlist`` watchlist items, using ``bulk_create``; returns the users"""
+    rng = random.Random(seed)
+    today = datetime.date.today()
+    password = make_password(PASSWORD)
+    created = User.objects.bulk_create(
+        [User(username=f'bench{index}', password=password) for index in range(users)]
+    )
+    # Re-read for primary keys on backends that do not return them
+    accounts = list(User.objects.filter(username__in=[user.username for user in created]).order_by('pk'))
+
+    categories = [code for code, _ in Transaction.CATEGORY_CHOICES]
+    asset_types = [code for code, _ in Watchlist.ASSET_TYPE_CHOICES]
+    statuses = [code for code, _ in Watchlist.STATUS_CHOICES]
+    symbols = _symbols(watchlist)
+
+    for user in accounts:
+        batch = []
+        for _ in range(transactions):
+            income = rng.random() < 0.2
+            batch.append(Transaction(
+                user=user,
+                transaction_type='INCOME' if income else 'EXPENSE',
+                category='SALARY' if income else rng.choice(categories),
+                amount=Decimal(rng.randint(100, 500000)) / 100,
+                description=' '.join(rng.sample(WORDS, 3)),
+                date=today - datetime.timedelta(days=rng.randrange(days)),
+            ))
+            if len(batch) >= batch_size:
+                Transaction.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            Transaction.objects.bulk_create(batch)
+
+        Watchlist.objects.bulk_create([
+            Watchlist(
+                user=user,
+                symbol=symbol,
+                name=f'{symbol} Holdings',
+                asset_type=rng.choice(asset_types),
+                status=rng.choice(statuses),
+                quantity=Decimal(rng.randint(0, 1000)) / 10,
+                purchase_price=Decimal(rng.randint(100, 50000)) / 100,
+                current_price=Decimal(rng.randint(100, 50000)) / 100,
+                target_price=Decimal(rng.randint(100, 50000)) / 100,
+                notes=' '.join(rng.sample(WORDS, 4)),
+            )
+            for symbol in symbols
+        ], batch_size=batch_size)
+
+    # bulk_create skips the signals: profiles, balances, rollups, search index
+    refresh_after_bulk_write([user.pk for user in accounts])
+    search.rebuild_index(Watchlist)
+    return accounts
@@ -0,0 +1,121 @@
+"""
+Cold-start benchmark for the WSGI entry points.
+
+Each sample runs in a fresh interpreter, as a new serverless instance would,
+and times importing the entry point module (settings, app registry, URLconf
+and any warm-up) and then serving one request through the WSGI callable.
+The regular entry point (``finance_portfolio.wsgi``) is compared with the
+slim serverless one (``finance_portfolio.wsgi_vercel`` with
+``SERVERLESS=True``)::
+
+    python -m benchmarks.startup --runs 10 --path /login/
+
+The first request goes straight to the WSGI application, so pick a path
+that works against the configured database (the login page needs none).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# (name, entry point module, SERVERLESS)
+MODES = (
+    ('default', 'finance_portfolio.wsgi', 'False'),
+    ('serverless', 'finance_portfolio.wsgi_vercel', 'True'),
+)
+
+PROBE = """
+import importlib, io, json, sys, time
+started = time.perf_counter()
+module = importlib.import_module(sys.argv[1])
+imported = time.perf_counter()
+environ = {
+    'REQUEST_METHOD': 'GET', 'PATH_INFO': sys.argv[2], 'QUERY_STRING': '',
+    'SERVER_NAME': 'localhost', 'SERVER_PORT': '443', 'HTTP_HOST': 'localhost',
+    'SERVER_PROTOCOL': 'HTTP/1.1', 'wsgi.url_scheme': 'https',
+    'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr,
+}
+status = []
+body = module.application(environ, lambda code, headers, exc_info=None: status.append(code))
+for chunk in body:
+    pass
+body.close()
+finished = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'first_request_ms': (finished - imported) * 1000,
+    'status': int(status[0].split()[0]),
+    'modules': len(sys.modules),
+}))
+"""
+
+
+def sample(module, serverless, path):
+    """Import ``module`` and serve ``path`` in a new interpreter; returns its timings"""
+    env = dict(os.environ, SERVERLESS=serverless)
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'finance_portfolio.settings')
+    completed = subprocess.run(
+        [sys.executable, '-c', PROBE, module, path],
+        cwd=BASE_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def run(runs, path):
+    """Median timings per mode over ``runs`` cold starts each"""
+    report = {'path': path, 'runs': runs, 'modes': {}}
+    for name, module, serverless in MODES:
+        samples = [sample(module, serverless, path) for _ in range(runs)]
+        imports = [s['import_ms'] for s in samples]
+        requests = [s['first_request_ms'] for s in samples]
+        totals = [s['import_ms'] + s['first_request_ms'] for s in samples]
+        report['modes'][name] = {
+            'entry_point': module,
+            'import_ms': round(statistics.median(imports), 3),
+            'first_request_ms': round(statistics.median(requests), 3),
+            'total_ms': round(statistics.median(totals), 3),
+            'modules': samples[-1]['modules'],
+            'status_codes': sorted({s['status'] for s in samples}),
+        }
+    return report
+
+
+def format_table(report):
+    """Plain-text table of the report"""
+    lines = [f"{'mode':<12}{'import':>10}{'request':>10}{'total':>10}{'modules':>9}  status"]
+    lines.append('-' * len(lines[0]))
+    for name, row in report['modes'].items():
+        lines.append(
+            f"{name:<12}{row['import_ms']:>10.1f}{row['first_request_ms']:>10.1f}"
+            f"{row['total_ms']:>10.1f}{row['modules']:>9}  {','.join(map(str, row['status_codes']))}"
+        )
+    before, after = report['modes']['default']['total_ms'], report['modes']['serverless']['total_ms']
+    if before:
+        lines.append(f"\nserverless cold start: {after - before:+.1f} ms ({(after - before) / before:+.0%}) vs default")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.startup', description='Benchmark cold starts')
+    parser.add_argument('--runs', type=int, default=10, help='Cold starts per entry point')
+    parser.add_argument('--path', default='/login/', help='Path of the first request')
+    parser.add_argument('--output', help='Also write the JSON report here')
+    args = parser.parse_args(argv)
+
+    report = run(args.runs, args.path)
+    print(format_table(report))
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(report, handle, indent=2)
+        print(f'\nReport written to {args.output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -7,6 +7,6 @@ echo "Building Django project for Vercel..."
 pip install -r requirements.txt
 
 # Collect static files
-python3.9 manage.py collectstatic --noinput --clear
+python3.11 manage.py collectstatic --noinput --clear
 
 echo "Build completed successfully!"
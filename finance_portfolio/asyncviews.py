@@ -0,0 +1,83 @@
+"""
+Building blocks for the async (ASGI) variants of the read-heavy views.
+
+Under ASGI an async view runs on the event loop, so it must not touch the
+ORM synchronously: that includes resolving the lazy ``request.user``.
+``AsyncLoginRequiredMixin`` resolves it with ``request.auser()`` first, and
+``AsyncListMixin`` fetches a ListView's page with async iteration before the
+usual (query-free) ``get_context_data`` runs. Template rendering still
+happens in Django's sync thread, as it does for every async view.
+"""
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.paginator import InvalidPage
+from django.http import Http404
+from django.utils.translation import gettext as _
+
+from .pagination import KeysetPaginator
+
+
+class AsyncLoginRequiredMixin(LoginRequiredMixin):
+    """LoginRequiredMixin for views with ``async def`` handlers"""
+
+    async def dispatch(self, request, *args, **kwargs):
+        # Resolve the user off the event loop once; later reads are free
+        request.user = await request.auser()
+        if not request.user.is_authenticated:
+            return self.handle_no_permission()
+        return await super().dispatch(request, *args, **kwargs)
+
+
+class AsyncListMixin:
+    """Async ``get`` for ListViews using KeysetPaginationMixin.
+
+    Subclasses that need more data for ``get_context_data`` load it in
+    ``aprefetch``, awaited after the page query, and keep it on ``self`` for
+    their sync context hooks.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        self.object_list = self.get_queryset()
+        page_size = self.get_paginate_by(self.object_list)
+        page = await self.apaginate_queryset(self.object_list, page_size) if page_size else None
+        await self.aprefetch()
+        self._async_page = page
+        return self.render_to_response(self.get_context_data())
+
+    async def aprefetch(self):
+        pass
+
+    async def apaginate_queryset(self, queryset, page_size):
+        if self.use_cursor_pagination():
+            page = await KeysetPaginator(self.cursor_ordering).apaginate(
+                queryset,
+                page_size,
+                self.request.GET.get(self.cursor_param),
+                self.request.GET,
+                self.cursor_param,
+            )
+            return (None, page, page.object_list, page.has_other_pages())
+
+        # Offset pagination with the count and the page fetched asynchronously
+        paginator = self.get_paginator(
+            queryset, page_size, orphans=self.get_paginate_orphans(),
+            allow_empty_first_page=self.get_allow_empty(),
+        )
+        paginator.count = await queryset.acount()
+        page_kwarg = self.page_kwarg
+        page = self.kwargs.get(page_kwarg) or self.request.GET.get(page_kwarg) or 1
+        try:
+            page_number = paginator.num_pages if page == 'last' else int(page)
+        except ValueError:
+            raise Http404(_('Page is not “last”, nor can it be converted to an int.'))
+        try:
+            page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise Http404(_('Invalid page (%(page_number)s): %(message)s') % {
+                'page_number': page_number, 'message': str(exc),
+            })
+        page.object_list = [obj async for obj in page.object_list]
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+    def paginate_queryset(self, queryset, page_size):
+        # get_context_data() asks for the page; hand over the one fetched above
+        return self._async_page
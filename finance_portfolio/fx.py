@@ -0,0 +1,462 @@
+"""
+Currency conversion for transactions, budgets and holdings.
+
+Rates live in ``transactions.ExchangeRate``, one row per currency and day,
+as units of the currency per one ``RATE_BASE`` (US dollar); any pair is
+converted through two rates. Amounts are converted into the owner's
+``UserProfile.base_currency``:
+
+* a transaction at its month's opening rate, the latest rate on or before
+  the first day of its month. Every row of a MonthlySummary bucket shares
+  that rate, so converted rollups are exact, and a month's totals do not
+  move when the next daily rate arrives;
+* a holding at the latest rate;
+* a date before a currency's first stored rate at that first rate.
+
+A currency with no stored rate at all cannot be converted. Both paths then
+raise ``MissingRateError``, which ``MissingRateMiddleware`` answers with a
+page naming the currency instead of a server error: ``rate``/``convert``
+raise it directly, and the SQL expressions evaluate to NULL, which the
+queries collect with ``unconverted`` and pass to ``check_converted`` rather
+than letting an aggregate skip the row.
+
+There are two paths to the rates:
+
+* ``to_currency``/``to_base`` build SQL expressions that join each row to
+  the rate table (as-of lookups on its (currency, date) index), so an
+  aggregate converts thousands of rows inside the database;
+* ``rate``/``convert`` serve single values, such as a balance delta on
+  write, from an in-process LRU cache keyed by (currency, date).
+  ``refresh_rates`` bumps a version in the default cache, which makes every
+  process drop its LRU on its next lookup. That needs a cache shared by the
+  processes (``CACHE_BACKEND=file``); entries also expire after
+  ``FX_RATE_CACHE_TTL`` seconds.
+
+Rates are loaded by an ``FxRateProvider``; ``LocalFxRateProvider`` reads
+``settings.FX_FIXTURE_PATH``, a JSON file of
+``{"base": "USD", "rates": {"2026-10-16": {"EUR": "0.9210", ...}}}``.
+"""
+import bisect
+import datetime
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, DateField, DecimalField, F, Func, Max, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, Round, TruncMonth
+from django.db.models.lookups import IsNull
+from django.utils.module_loading import import_string
+
+
+RATE_BASE = 'USD'
+
+CURRENCY_CHOICES = [
+    ('USD', 'US Dollar'),
+    ('EUR', 'Euro'),
+    ('GBP', 'British Pound'),
+    ('JPY', 'Japanese Yen'),
+    ('INR', 'Indian Rupee'),
+    ('CAD', 'Canadian Dollar'),
+    ('AUD', 'Australian Dollar'),
+    ('CHF', 'Swiss Franc'),
+]
+
+CURRENCY_SYMBOLS = {
+    'USD': '$',
+    'EUR': '€',
+    'GBP': '£',
+    'JPY': '¥',
+    'INR': '₹',
+    'CAD': 'CA$',
+    'AUD': 'A$',
+    'CHF': 'CHF ',
+}
+
+# Output types for conversion expressions
+RATE = DecimalField(max_digits=24, decimal_places=10)
+MONEY = DecimalField(max_digits=24, decimal_places=6)
+
+ONE = Decimal('1')
+CENT = Decimal('0.01')
+
+# Rates older than a requested day that one batch load still reads; days
+# without a rate in the window are resolved one by one
+LOOKBACK = datetime.timedelta(days=31)
+
+_VERSION_KEY = 'fx:rates:version'
+
+
+class MissingRateError(LookupError):
+    """Raised when amounts in ``currency`` cannot be converted for want of a rate"""
+
+    def __init__(self, currency):
+        super().__init__(f'No exchange rate to convert {currency} amounts')
+        self.currency = currency
+
+
+def default_currency():
+    """Currency of new profiles, and of totals that span several users"""
+    return getattr(settings, 'DEFAULT_CURRENCY', RATE_BASE)
+
+
+def symbol(currency):
+    """Display prefix for ``currency``"""
+    return CURRENCY_SYMBOLS.get(currency, f'{currency} ')
+
+
+def period_start(day):
+    """First day of ``day``'s month; a transaction converts at its rate"""
+    return day.replace(day=1)
+
+
+# -- Base currency per user ---------------------------------------------------
+
+def _base_key(user_id):
+    return f'fx:base:{user_id}'
+
+
+def base_currency_timeout():
+    """Seconds a user's base currency stays cached"""
+    return getattr(settings, 'FX_BASE_CURRENCY_CACHE_TIMEOUT', 300)
+
+
+def base_currency(user_id, refresh=False):
+    """The user's ``UserProfile.base_currency``, cached.
+
+    The cached value may be stale for up to ``base_currency_timeout()`` in a
+    process that did not see the change, so writes must not trust it blindly
+    (see ``transactions.ledger.apply_base_delta``). ``refresh`` reads the
+    profile and caches the result.
+    """
+    from transactions.models import UserProfile
+
+    currency = None if refresh else cache.get(_base_key(user_id))
+    if currency is None:
+        currency = UserProfile.objects.filter(user_id=user_id).values_list(
+            'base_currency', flat=True
+        ).first() or default_currency()
+        cache.set(_base_key(user_id), currency, base_currency_timeout())
+    return currency
+
+
+def invalidate_base_currency(user_id):
+    """Drop the cached base currency once the current transaction commits"""
+    transaction.on_commit(partial(cache.delete, _base_key(user_id)))
+
+
+# -- In-process rate cache ----------------------------------------------------
+
+class RateCache:
+    """LRU of ``(currency, day) -> rate`` for this process.
+
+    Entries are reloaded after ``FX_RATE_CACHE_TTL`` seconds, which bounds
+    how long a process keeps serving replaced rates if it missed the version
+    bump (the bump only reaches other processes through a shared cache).
+    """
+
+    def __init__(self, maxsize=None, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # (currency, day) -> (rate, monotonic time it expires)
+        self._rates = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+
+    def _sync(self):
+        # Drop every entry once any process has stored new rates
+        version = cache.get(_VERSION_KEY)
+        with self._lock:
+            if version != self._version:
+                self._rates.clear()
+                self._version = version
+
+    def get_many(self, keys):
+        """``{(currency, day): rate}``; misses are loaded together"""
+        self._sync()
+        now = time.monotonic()
+        found, missing = {}, []
+        with self._lock:
+            for key in keys:
+                if key[0] == RATE_BASE:
+                    found[key] = ONE
+                elif key in self._rates and self._rates[key][1] > now:
+                    self._rates.move_to_end(key)
+                    found[key] = self._rates[key][0]
+                else:
+                    missing.append(key)
+        if missing:
+            loaded = _load_rates(missing)
+            maxsize = self.maxsize or getattr(settings, 'FX_RATE_CACHE_SIZE', 4096)
+            expires = now + (self.ttl if self.ttl is not None else getattr(settings, 'FX_RATE_CACHE_TTL', 300))
+            with self._lock:
+                for key, value in loaded.items():
+                    self._rates[key] = (value, expires)
+                    self._rates.move_to_end(key)
+                while len(self._rates) > maxsize:
+                    self._rates.popitem(last=False)
+            found.update(loaded)
+        return found
+
+    def clear(self):
+        with self._lock:
+            self._rates.clear()
+
+    def __len__(self):
+        return len(self._rates)
+
+
+def _load_rates(keys):
+    """Resolve ``(currency, day)`` keys with one range query, plus one query
+    per key that has no rate in the lookback window"""
+    from transactions.models import ExchangeRate
+
+    days = [day for _, day in keys]
+    rows = ExchangeRate.objects.filter(
+        currency__in={currency for currency, _ in keys},
+        date__gte=min(days) - LOOKBACK,
+        date__lte=max(days),
+    ).order_by('currency', 'date').values_list('currency', 'date', 'rate')
+    series = {}
+    for currency, day, value in rows:
+        dates, rates = series.setdefault(currency, ([], []))
+        dates.append(day)
+        rates.append(value)
+
+    loaded = {}
+    for currency, day in keys:
+        dates, rates = series.get(currency, ((), ()))
+        index = bisect.bisect_right(dates, day)
+        loaded[currency, day] = rates[index - 1] if index else _rate_as_of(currency, day)
+    return loaded
+
+
+def _rate_as_of(currency, day):
+    # One query with the SQL path's fallback; no row means no rate at all
+    from transactions.models import ExchangeRate
+
+    rate = ExchangeRate.objects.filter(currency=currency).values_list(
+        _as_of(currency, day), flat=True
+    ).first()
+    if rate is None:
+        raise MissingRateError(currency)
+    return rate
+
+
+_rates = RateCache()
+
+
+def rate(currency, day):
+    """Units of ``currency`` per ``RATE_BASE`` on ``day``"""
+    return _rates.get_many([(currency, day)])[currency, day]
+
+
+def factors(sources, target, day):
+    """``{source: factor}`` multiplying amounts in each source into ``target``"""
+    sources = set(sources)
+    if sources <= {target}:
+        return {target: ONE}
+    rates = _rates.get_many([(currency, day) for currency in sources | {target}])
+    return {currency: rates[target, day] / rates[currency, day] for currency in sources}
+
+
+def convert(amount, source, target, day):
+    """``amount`` in ``source`` expressed in ``target`` at the rate of ``day``"""
+    if source == target or not amount:
+        return amount
+    # Rounded like SQL ROUND, so deltas add up to the converted aggregates
+    return (amount * factors([source], target, day)[source]).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+# -- SQL conversion -----------------------------------------------------------
+
+class MonthStart(Func):
+    """First day of the month from integer year and month columns"""
+    function = 'MAKE_DATE'
+    output_field = DateField()
+
+    def __init__(self, year, month, **extra):
+        super().__init__(year, month, Value(1), **extra)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        year, month, _ = self.get_source_expressions()
+        year_sql, year_params = compiler.compile(year)
+        month_sql, month_params = compiler.compile(month)
+        return (
+            f"DATE({year_sql} || '-01-01', '+' || ({month_sql} - 1) || ' months')",
+            (*year_params, *month_params),
+        )
+
+
+def month_start(date_field):
+    """SQL for the first day of ``date_field``'s month (see ``period_start``)"""
+    return TruncMonth(date_field, output_field=DateField())
+
+
+def _as_of(currency, day):
+    # Latest rate on or before ``day``, else the currency's first rate
+    from transactions.models import ExchangeRate
+
+    rates = ExchangeRate.objects.filter(currency=currency).values('rate')
+    return Coalesce(
+        Subquery(rates.filter(date__lte=day).order_by('-date')[:1]),
+        Subquery(rates.order_by('date')[:1]),
+        output_field=RATE,
+    )
+
+
+def _rate_expression(currency, day):
+    if isinstance(currency, str):
+        return Value(ONE, output_field=RATE) if currency == RATE_BASE else _as_of(currency, day)
+    return Case(
+        When(Q(**{currency.name: RATE_BASE}), then=Value(ONE)),
+        default=_as_of(OuterRef(currency.name), day),
+        output_field=RATE,
+    )
+
+
+def to_currency(amount, target, source='currency', day=None):
+    """SQL expression converting ``amount`` from the row's ``source`` currency into ``target``.
+
+    ``target`` is a currency code or an ``F()`` of a currency field.
+    ``day`` names the date field or annotation whose rate applies, or is a
+    date; it defaults to today. Rows already in ``target`` skip the lookups;
+    converted amounts are rounded to cents, as ``convert`` rounds them.
+    """
+    amount = F(amount) if isinstance(amount, str) else amount
+    day = OuterRef(day) if isinstance(day, str) else (day or datetime.date.today())
+    converted = Round(amount * _rate_expression(target, day) / _rate_expression(F(source), day), 2)
+    return Case(
+        When(Q(**{source: target}), then=amount),
+        default=converted,
+        output_field=MONEY,
+    )
+
+
+def to_base(amount, day=None, source='currency', user='user'):
+    """``to_currency`` into the base currency of each row's owner"""
+    return to_currency(amount, F(f'{user}__profile__base_currency'), source=source, day=day)
+
+
+def unconverted(converted, source='currency'):
+    """Aggregate naming a ``source`` currency of a row whose ``converted``
+    amount is NULL (a rate is missing), or None when every row converted"""
+    converted = F(converted) if isinstance(converted, str) else converted
+    return Max(source, filter=IsNull(converted, True))
+
+
+def check_converted(currency):
+    """Raise ``MissingRateError`` for a currency found by ``unconverted``"""
+    if currency is not None:
+        raise MissingRateError(currency)
+
+
+# -- Rate providers -----------------------------------------------------------
+
+class FxProviderError(Exception):
+    """Raised by a provider when rates cannot be fetched"""
+
+
+class FxRateProvider:
+    """Interface for exchange rate sources"""
+    name = 'base'
+
+    def fetch(self):
+        """Return ``{date: {currency: rate}}``, rates in units per ``RATE_BASE``"""
+        raise NotImplementedError
+
+
+class LocalFxRateProvider(FxRateProvider):
+    """Rates read from a local JSON file"""
+    name = 'local'
+
+    def __init__(self, path=None):
+        self.path = path or getattr(settings, 'FX_FIXTURE_PATH', None)
+
+    def fetch(self):
+        try:
+            with open(self.path, encoding='utf-8') as fixture:
+                data = json.load(fixture)
+            base = data.get('base', RATE_BASE).upper()
+            rates = {}
+            for day, quotes in data['rates'].items():
+                quotes = {str(currency).upper(): Decimal(str(value)) for currency, value in quotes.items()}
+                quotes[base] = ONE
+                # Re-express the quotes per RATE_BASE
+                pivot = quotes[RATE_BASE]
+                rates[datetime.date.fromisoformat(day)] = {
+                    currency: value / pivot for currency, value in quotes.items() if currency != RATE_BASE
+                }
+        except (OSError, ValueError, KeyError, TypeError, InvalidOperation) as exc:
+            raise FxProviderError(f'Cannot read exchange rate file {self.path}: {exc}') from exc
+        return rates
+
+
+PROVIDERS = {
+    'local': LocalFxRateProvider,
+}
+
+
+def get_fx_provider(name=None):
+    """Instantiate the configured provider (registered name or dotted path)"""
+    name = name or getattr(settings, 'FX_PROVIDER', 'local')
+    provider_class = PROVIDERS.get(name) or import_string(name)
+    return provider_class()
+
+
+@dataclass
+class FxRefreshResult:
+    """Outcome of a rate refresh"""
+    days: int = 0
+    rates: int = 0
+    users_reconciled: int = 0
+    elapsed: float = 0.0
+
+
+def refresh_rates(provider=None):
+    """Store the provider's rates and bring converted balances up to date.
+
+    Rates are upserted with one ``bulk_create``. Balances are held in each
+    user's base currency, so users with transactions in another currency are
+    reconciled; rollups keep original amounts and need no rebuild.
+    """
+    from transactions import cache as dashboard_cache
+    from transactions.ledger import reconcile_balances
+    from transactions.models import ExchangeRate, Transaction
+
+    started = time.perf_counter()
+    provider = provider or get_fx_provider()
+    fetched = provider.fetch()
+    known = {code for code, _ in CURRENCY_CHOICES}
+    rows = [
+        ExchangeRate(currency=currency, date=day, rate=value)
+        for day, quotes in fetched.items()
+        for currency, value in quotes.items()
+        if currency in known
+    ]
+    ExchangeRate.objects.bulk_create(
+        rows, batch_size=1000, update_conflicts=True,
+        unique_fields=['currency', 'date'], update_fields=['rate'],
+    )
+    cache.set(_VERSION_KEY, time.time_ns(), None)
+    _rates.clear()
+
+    user_ids = list(
+        Transaction.objects.exclude(currency=F('user__profile__base_currency'))
+        .values_list('user_id', flat=True).distinct().order_by()
+    )
+    if user_ids:
+        reconcile_balances(user_ids)
+        for user_id in user_ids:
+            dashboard_cache.invalidate_dashboard(user_id)
+
+    return FxRefreshResult(
+        days=len(fetched), rates=len(rows), users_reconciled=len(user_ids),
+        elapsed=time.perf_counter() - started,
+    )
@@ -0,0 +1,266 @@
+"""
+Per-view request instrumentation and a Prometheus ``/metrics`` endpoint.
+
+``InstrumentationMiddleware`` wraps every request and records, per resolved
+URL name (``dashboard``, ``transaction_list``, ...):
+
+* the number of SQL queries and the time spent in them, counted by an
+  execute wrapper on every connection so it works with ``DEBUG = False``
+* template render time (from ``process_template_response`` to the
+  response's post-render callback)
+* total wall time
+
+The numbers go into in-process histograms (one set per worker process) that
+``metrics_view`` renders in the Prometheus text format. ``VIEW_QUERY_BUDGETS``
+maps URL names to a maximum query count; a request over budget logs a
+warning and increments a counter.
+
+The middleware runs natively in both sync and async stacks. The per-request
+query timer lives in a context variable, which ``sync_to_async`` carries into
+the thread that runs the ORM, so concurrent async requests sharing that
+thread are still counted separately.
+"""
+import contextvars
+import logging
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the histogram buckets (+Inf is implicit)
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+UNRESOLVED = '<unresolved>'
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += value
+        self.count += 1
+
+    def cumulative(self):
+        running = 0
+        for bound, count in zip((*self.buckets, '+Inf'), self.counts):
+            running += count
+            yield bound, running
+
+
+class MetricsRegistry:
+    """Thread-safe per-view request metrics for this process"""
+
+    METRICS = (
+        ('wall_seconds', 'Wall time of the request', SECONDS_BUCKETS),
+        ('db_seconds', 'Time spent executing SQL', SECONDS_BUCKETS),
+        ('template_seconds', 'Time spent rendering templates', SECONDS_BUCKETS),
+        ('queries', 'SQL queries executed', QUERY_BUCKETS),
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._views = {}
+            self._requests = {}
+            self._over_budget = {}
+
+    def record(self, view, status, wall, db, template, queries, over_budget=False):
+        with self._lock:
+            histograms = self._views.get(view)
+            if histograms is None:
+                histograms = self._views[view] = {
+                    name: Histogram(buckets) for name, _, buckets in self.METRICS
+                }
+            histograms['wall_seconds'].observe(wall)
+            histograms['db_seconds'].observe(db)
+            histograms['template_seconds'].observe(template)
+            histograms['queries'].observe(queries)
+            key = (view, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            if over_budget:
+                self._over_budget[view] = self._over_budget.get(view, 0) + 1
+
+    def snapshot(self, view):
+        """``{metric: (count, sum)}`` for one view, mainly for tests and debugging"""
+        with self._lock:
+            histograms = self._views.get(view, {})
+            return {name: (h.count, h.total) for name, h in histograms.items()}
+
+    def render(self):
+        """The registry in Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            lines.append('# HELP django_view_requests_total Requests handled, by view and status')
+            lines.append('# TYPE django_view_requests_total counter')
+            for (view, status), count in sorted(self._requests.items()):
+                lines.append(f'django_view_requests_total{{view="{_escape(view)}",status="{status}"}} {count}')
+
+            for name, help_text, _ in self.METRICS:
+                metric = f'django_view_{name}'
+                lines.append(f'# HELP {metric} {help_text}')
+                lines.append(f'# TYPE {metric} histogram')
+                for view, histograms in sorted(self._views.items()):
+                    histogram = histograms[name]
+                    label = f'view="{_escape(view)}"'
+                    for bound, count in histogram.cumulative():
+                        lines.append(f'{metric}_bucket{{{label},le="{bound}"}} {count}')
+                    lines.append(f'{metric}_sum{{{label}}} {_number(histogram.total)}')
+                    lines.append(f'{metric}_count{{{label}}} {histogram.count}')
+
+            lines.append('# HELP django_view_query_budget_exceeded_total Requests over their query budget')
+            lines.append('# TYPE django_view_query_budget_exceeded_total counter')
+            for view, count in sorted(self._over_budget.items()):
+                lines.append(f'django_view_query_budget_exceeded_total{{view="{_escape(view)}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _number(value):
+    return str(int(value)) if float(value).is_integer() else f'{value:.6f}'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = MetricsRegistry()
+
+
+def query_budget(view):
+    """The configured maximum query count for ``view``, or None"""
+    return getattr(settings, 'VIEW_QUERY_BUDGETS', {}).get(view)
+
+
+class _QueryTimer:
+    """Query count and time for one request"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+_current_timer = contextvars.ContextVar('instrumentation_timer', default=None)
+
+
+def _time_query(execute, sql, params, many, context):
+    timer = _current_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timer.seconds += time.perf_counter() - started
+        timer.count += 1
+
+
+def _install(connection, **kwargs):
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+# Connections are per thread; cover the ones opened later, e.g. in the
+# thread that runs the ORM for async views.
+connection_created.connect(_install, dispatch_uid='instrumentation_query_timer')
+
+
+class InstrumentationMiddleware:
+    """Record query count, DB time, template time and wall time per view"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        for connection in connections.all(initialized_only=True):
+            _install(connection)
+        timer, token, started = self._start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_timer.reset(token)
+        return self._finish(request, response, timer, started)
+
+    async def __acall__(self, request):
+        timer, token, started = self._start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_timer.reset(token)
+        return self._finish(request, response, timer, started)
+
+    def _start(self, request):
+        timer = _QueryTimer()
+        token = _current_timer.set(timer)
+        request._instrumentation_template = [None, 0.0]
+        return timer, token, time.perf_counter()
+
+    def _finish(self, request, response, timer, started):
+        wall = time.perf_counter() - started
+        match = getattr(request, 'resolver_match', None)
+        view = (match.view_name if match else None) or UNRESOLVED
+        budget = query_budget(view)
+        over_budget = budget is not None and timer.count > budget
+        if over_budget:
+            logger.warning(
+                'Query budget exceeded for %s: %d queries (budget %d) on %s',
+                view, timer.count, budget, request.path,
+            )
+        registry.record(
+            view,
+            response.status_code,
+            wall,
+            timer.seconds,
+            request._instrumentation_template[1],
+            timer.count,
+            over_budget,
+        )
+        return response
+
+    def process_template_response(self, request, response):
+        timing = request._instrumentation_template
+        timing[0] = time.perf_counter()
+
+        def rendered(response):
+            timing[1] += time.perf_counter() - timing[0]
+
+        response.add_post_render_callback(rendered)
+        return response
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint, for staff users or a bearer METRICS_TOKEN"""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    header = request.headers.get('Authorization', '')
+    authorized = bool(token) and constant_time_compare(header, f'Bearer {token}')
+    if not authorized and not (request.user.is_authenticated and request.user.is_staff):
+        return HttpResponseForbidden('Forbidden')
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
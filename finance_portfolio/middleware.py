@@ -0,0 +1,47 @@
+"""Project middleware"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.shortcuts import render
+from django.utils.deprecation import MiddlewareMixin
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from . import fx
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """WhiteNoise that also runs natively in an async middleware stack.
+
+    WhiteNoise's middleware is sync-only, which makes Django run everything
+    below it in a worker thread under ASGI. Finding a static file is a dict
+    lookup (or a stat with autorefresh), so the async path does it inline.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = self.find_file(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+
+class MissingRateMiddleware(MiddlewareMixin):
+    """Answer a request that needed a missing exchange rate with a page naming
+    the currency, instead of a server error"""
+
+    def process_exception(self, request, exception):
+        if isinstance(exception, fx.MissingRateError):
+            return render(request, 'missing_rate.html', {'currency': exception.currency}, status=503)
+        return None
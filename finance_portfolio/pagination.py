@@ -0,0 +1,193 @@
+"""
+Keyset (cursor) pagination for the list views.
+
+Offset pagination issues a ``COUNT(*)`` over the filtered set and an
+``OFFSET n`` scan, so deep pages get slower the further back they are. Keyset
+pagination instead remembers the sort key of the first/last row on the page
+and asks for the rows strictly before/after it, which is an index range seek
+no matter how deep the page is.
+
+Cursors are opaque URL-safe tokens; their content is an implementation detail.
+"""
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import Http404
+
+
+def pagination_mode():
+    """Return the configured list pagination mode ('cursor' or 'offset')"""
+    return getattr(settings, 'LIST_PAGINATION', 'cursor')
+
+
+class CursorPage:
+    """A page of results with opaque cursors to its neighbours"""
+
+    def __init__(self, object_list, next_cursor, previous_cursor, query_params, cursor_param):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self._query_params = query_params
+        self._cursor_param = cursor_param
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def _query_for(self, cursor):
+        params = self._query_params.copy()
+        params.pop('page', None)
+        params[self._cursor_param] = cursor
+        return params.urlencode()
+
+    @property
+    def next_query(self):
+        """Query string (without '?') for the next page, keeping the filters"""
+        return self._query_for(self.next_cursor) if self.next_cursor else ''
+
+    @property
+    def previous_query(self):
+        """Query string (without '?') for the previous page, keeping the filters"""
+        return self._query_for(self.previous_cursor) if self.previous_cursor else ''
+
+    @property
+    def first_query(self):
+        """Query string (without '?') for the first page, keeping the filters"""
+        params = self._query_params.copy()
+        params.pop('page', None)
+        params.pop(self._cursor_param, None)
+        return params.urlencode()
+
+
+class KeysetPaginator:
+    """Slice a queryset by keyset on ``ordering`` (field names, '-' for descending)"""
+
+    def __init__(self, ordering):
+        self.ordering = [
+            (name.lstrip('-'), name.startswith('-')) for name in ordering
+        ]
+
+    def encode(self, obj, direction):
+        values = [
+            self._serialize(getattr(obj, name)) for name, _ in self.ordering
+        ]
+        payload = json.dumps([direction, values], separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode(self, model, token):
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            direction, values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if direction not in ('next', 'prev') or len(values) != len(self.ordering):
+                raise ValueError(token)
+            values = [
+                model._meta.get_field(name).to_python(value)
+                for (name, _), value in zip(self.ordering, values)
+            ]
+        except (ValueError, TypeError, binascii.Error, ValidationError) as exc:
+            raise Http404('Invalid page cursor.') from exc
+        return direction, values
+
+    @staticmethod
+    def _serialize(value):
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return value
+
+    def _seek(self, values, forward):
+        """Q selecting rows strictly after (``forward``) or before the key"""
+        condition = Q()
+        equal = Q()
+        for (name, descending), value in zip(self.ordering, values):
+            # Moving forward through a descending field means smaller values.
+            lookup = 'lt' if descending == forward else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def _order(self, forward):
+        return [
+            f"{'-' if descending == forward else ''}{name}"
+            for name, descending in self.ordering
+        ]
+
+    def _window(self, queryset, page_size, token):
+        """The ``page_size + 1`` rows to fetch, and whether we move forward"""
+        forward = True
+        if token:
+            direction, values = self.decode(queryset.model, token)
+            forward = direction == 'next'
+            queryset = queryset.filter(self._seek(values, forward))
+        return queryset.order_by(*self._order(forward))[:page_size + 1], forward
+
+    def _page(self, rows, page_size, token, forward, query_params, cursor_param):
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if not forward:
+            rows.reverse()
+
+        if forward:
+            has_next, has_previous = has_more, bool(token)
+        else:
+            has_next, has_previous = True, has_more
+
+        next_cursor = self.encode(rows[-1], 'next') if rows and has_next else None
+        previous_cursor = self.encode(rows[0], 'prev') if rows and has_previous else None
+        return CursorPage(rows, next_cursor, previous_cursor, query_params, cursor_param)
+
+    def paginate(self, queryset, page_size, token, query_params, cursor_param='cursor'):
+        window, forward = self._window(queryset, page_size, token)
+        return self._page(list(window), page_size, token, forward, query_params, cursor_param)
+
+    async def apaginate(self, queryset, page_size, token, query_params, cursor_param='cursor'):
+        """``paginate`` for async views, fetching the page with async iteration"""
+        window, forward = self._window(queryset, page_size, token)
+        rows = [row async for row in window]
+        return self._page(rows, page_size, token, forward, query_params, cursor_param)
+
+
+class KeysetPaginationMixin:
+    """ListView mixin that swaps offset pagination for keyset pagination.
+
+    Set ``cursor_ordering`` to a unique ordering (ending in the primary key)
+    backed by an index. Falls back to Django's offset paginator when
+    ``settings.LIST_PAGINATION`` is 'offset'.
+    """
+    cursor_ordering = ('-id',)
+    cursor_param = 'cursor'
+
+    def use_cursor_pagination(self):
+        return pagination_mode() == 'cursor'
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.use_cursor_pagination():
+            return super().paginate_queryset(queryset, page_size)
+
+        page = KeysetPaginator(self.cursor_ordering).paginate(
+            queryset,
+            page_size,
+            self.request.GET.get(self.cursor_param),
+            self.request.GET,
+            self.cursor_param,
+        )
+        return (None, page, page.object_list, page.has_other_pages())
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['cursor_pagination'] = self.use_cursor_pagination()
+        return context
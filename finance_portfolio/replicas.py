@@ -0,0 +1,144 @@
+"""
+Read-replica routing for the read-only views.
+
+Replicas are the databases configured from ``REPLICA_DATABASE_URL`` (aliases
+``replica1``, ``replica2``, ...). ``ReplicaRoutingMiddleware`` picks one per
+request, and only for the URL names in ``REPLICA_READ_VIEWS``;
+``ReplicaRouter`` then sends that request's reads to it. Every other request,
+every write and everything outside a request (management commands, cron
+jobs) uses ``default``.
+
+Replicas lag the primary, so a client that has just written is pinned to the
+primary for ``REPLICA_PIN_SECONDS``: any INSERT, UPDATE or DELETE executed
+during a request sets a short-lived cookie, and requests carrying it read
+from ``default``. A request that writes also reads its remaining queries
+from the primary.
+
+The per-request state lives in a context variable, which ``sync_to_async``
+carries into the thread that runs the ORM for async views.
+"""
+import contextvars
+import random
+import re
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.signals import connection_created
+
+
+REPLICA_PREFIX = 'replica'
+
+_WRITE_SQL = re.compile(r'\s*(INSERT|UPDATE|DELETE|REPLACE)\b', re.IGNORECASE)
+
+
+def replica_aliases():
+    """The configured replica database aliases"""
+    return [alias for alias in settings.DATABASES if alias.startswith(REPLICA_PREFIX)]
+
+
+class _RoutingState:
+    """Replica choice and pinning for one request"""
+
+    def __init__(self, pinned):
+        self.alias = None
+        self.pinned = pinned
+        self.wrote = False
+
+
+_current_state = contextvars.ContextVar('replica_routing_state', default=None)
+
+
+class ReplicaRouter:
+    """Send reads of replica-eligible requests to the request's replica"""
+
+    def db_for_read(self, model, **hints):
+        state = _current_state.get()
+        if state is None or state.alias is None or state.pinned or state.wrote:
+            return None
+        return state.alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        aliases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+
+def _track_writes(execute, sql, params, many, context):
+    state = _current_state.get()
+    if state is not None and not state.wrote and _WRITE_SQL.match(sql):
+        state.wrote = True
+    return execute(sql, params, many, context)
+
+
+def _install(connection, **kwargs):
+    if connection.alias == DEFAULT_DB_ALIAS and _track_writes not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_track_writes)
+
+
+connection_created.connect(_install, dispatch_uid='replica_write_tracker')
+
+
+class ReplicaRoutingMiddleware:
+    """Route the read-only views to a replica, pinning recent writers to the primary"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        for connection in connections.all(initialized_only=True):
+            _install(connection)
+        state, token = self._start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_state.reset(token)
+        return self._finish(state, response)
+
+    async def __acall__(self, request):
+        state, token = self._start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_state.reset(token)
+        return self._finish(state, response)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = _current_state.get()
+        aliases = replica_aliases()
+        if state is not None and aliases and request.resolver_match.view_name in settings.REPLICA_READ_VIEWS:
+            state.alias = random.choice(aliases)
+        return None
+
+    def _start(self, request):
+        try:
+            pinned = float(request.COOKIES.get(settings.REPLICA_PIN_COOKIE_NAME, 0)) > time.time()
+        except ValueError:
+            pinned = False
+        state = _RoutingState(pinned)
+        return state, _current_state.set(state)
+
+    def _finish(self, state, response):
+        if state.wrote and replica_aliases():
+            seconds = settings.REPLICA_PIN_SECONDS
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE_NAME,
+                str(int(time.time()) + seconds),
+                max_age=seconds,
+                secure=settings.SESSION_COOKIE_SECURE,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
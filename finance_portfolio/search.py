@@ -0,0 +1,257 @@
+"""
+Pluggable full-text search for transaction descriptions and watchlist notes.
+
+``icontains`` searches compile to ``LIKE '%term%'`` and scan the whole table.
+The backends here use a real text index instead:
+
+* ``SQLiteFTSBackend`` keeps an FTS5 virtual table per model (rowid = pk),
+  kept in sync from the model signals, and ranks matches with ``bm25()``.
+* ``PostgresSearchBackend`` relies on a GIN index over a ``tsvector``
+  expression plus ``pg_trgm`` trigram indexes (so ``icontains`` on the main
+  text column is index-backed too) and ranks with ``ts_rank``. The indexes
+  are expression indexes, so PostgreSQL keeps them current itself.
+* ``LikeSearchBackend`` is the old ``icontains`` behaviour, used for other
+  databases or when ``SEARCH_BACKEND = 'like'``.
+
+The backend is chosen per database connection by ``get_search_backend``.
+"""
+import re
+
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+
+# Searchable text columns per model. The first field is the main text column
+# that also gets a trigram index on PostgreSQL.
+SEARCH_FIELDS = {
+    'transactions.transaction': ('description', 'category'),
+    'watchlist.watchlist': ('notes', 'symbol', 'name'),
+}
+
+SEARCH_CONFIG = 'english'
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def search_fields(model):
+    return SEARCH_FIELDS[model._meta.label_lower]
+
+
+def fts_table(db_table):
+    return f'{db_table}_fts'
+
+
+def _pg_document(db_table, fields):
+    """SQL for the tsvector expression; the index and queries must match exactly"""
+    parts = " || ' ' || ".join(f"coalesce(\"{db_table}\".\"{name}\", '')" for name in fields)
+    return f"to_tsvector('{SEARCH_CONFIG}', {parts})"
+
+
+# -- schema helpers (also used by migrations) ---------------------------------
+
+def create_search_index(schema_editor, db_table, fields):
+    """Create the full-text index for a table on the migrating connection"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        table = fts_table(db_table)
+        columns = ', '.join(fields)
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5("
+            f"{columns}, tokenize='unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            f"INSERT INTO {table}(rowid, {columns}) SELECT id, {columns} FROM {db_table}"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {db_table}_fts_idx ON {db_table} "
+            f"USING gin (({_pg_document(db_table, fields)}))"
+        )
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {db_table}_trgm_idx ON {db_table} "
+            f"USING gin (UPPER(\"{fields[0]}\") gin_trgm_ops)"
+        )
+
+
+def drop_search_index(schema_editor, db_table, fields):
+    """Reverse ``create_search_index``"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {fts_table(db_table)}')
+    elif vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {db_table}_fts_idx')
+        schema_editor.execute(f'DROP INDEX IF EXISTS {db_table}_trgm_idx')
+
+
+# -- backends -----------------------------------------------------------------
+
+class LikeSearchBackend:
+    """Unindexed ``icontains`` search across the model's search fields"""
+
+    def filter(self, queryset, term):
+        condition = Q()
+        for name in search_fields(queryset.model):
+            condition |= Q(**{f'{name}__icontains': term})
+        return queryset.filter(condition)
+
+    def ranked(self, queryset, term):
+        return self.filter(queryset, term)
+
+    def index(self, instance):
+        pass
+
+    def remove(self, instance):
+        pass
+
+    def rebuild(self, model, pks=None):
+        pass
+
+
+class SQLiteFTSBackend(LikeSearchBackend):
+    """FTS5-backed search for SQLite"""
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    @staticmethod
+    def match_query(term):
+        """Turn user input into an FTS5 query of quoted prefix terms"""
+        words = _WORD_RE.findall(term)
+        return ' '.join(f'"{word}"*' for word in words)
+
+    def filter(self, queryset, term):
+        query = self.match_query(term)
+        if not query:
+            return super().filter(queryset, term)
+        table = fts_table(queryset.model._meta.db_table)
+        return queryset.filter(
+            pk__in=RawSQL(f'SELECT rowid FROM {table} WHERE {table} MATCH %s', [query])
+        )
+
+    def ranked(self, queryset, term):
+        query = self.match_query(term)
+        if not query:
+            return super().ranked(queryset, term)
+        db_table = queryset.model._meta.db_table
+        table = fts_table(db_table)
+        rank = RawSQL(
+            f'SELECT bm25({table}) FROM {table} WHERE {table} MATCH %s AND rowid = "{db_table}"."id"',
+            [query],
+            output_field=FloatField(),
+        )
+        # bm25() is lower for better matches.
+        return self.filter(queryset, term).annotate(search_rank=-rank).order_by('-search_rank', '-pk')
+
+    def index(self, instance):
+        model = type(instance)
+        fields = search_fields(model)
+        table = fts_table(model._meta.db_table)
+        values = [getattr(instance, name) or '' for name in fields]
+        with connections[self.alias].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {table} WHERE rowid = %s', [instance.pk])
+            cursor.execute(
+                f"INSERT INTO {table}(rowid, {', '.join(fields)}) VALUES (%s{', %s' * len(fields)})",
+                [instance.pk, *values],
+            )
+
+    def remove(self, instance):
+        table = fts_table(type(instance)._meta.db_table)
+        with connections[self.alias].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {table} WHERE rowid = %s', [instance.pk])
+
+    def rebuild(self, model, pks=None):
+        """Re-index ``pks`` (or the whole table) after writes that skip signals"""
+        fields = search_fields(model)
+        db_table = model._meta.db_table
+        table = fts_table(db_table)
+        columns = ', '.join(fields)
+        with connections[self.alias].cursor() as cursor:
+            if pks is None:
+                cursor.execute(f'DELETE FROM {table}')
+                cursor.execute(f'INSERT INTO {table}(rowid, {columns}) SELECT id, {columns} FROM {db_table}')
+                return
+            pks = list(pks)
+            for start in range(0, len(pks), 500):
+                chunk = pks[start:start + 500]
+                placeholders = ', '.join(['%s'] * len(chunk))
+                cursor.execute(f'DELETE FROM {table} WHERE rowid IN ({placeholders})', chunk)
+                cursor.execute(
+                    f'INSERT INTO {table}(rowid, {columns}) SELECT id, {columns} '
+                    f'FROM {db_table} WHERE id IN ({placeholders})',
+                    chunk,
+                )
+
+
+class PostgresSearchBackend(LikeSearchBackend):
+    """tsvector/GIN + trigram search for PostgreSQL"""
+
+    @staticmethod
+    def ts_query(term):
+        """Turn user input into a to_tsquery() string of ANDed prefix terms"""
+        return ' & '.join(f'{word}:*' for word in _WORD_RE.findall(term))
+
+    def _document(self, queryset):
+        return _pg_document(queryset.model._meta.db_table, search_fields(queryset.model))
+
+    def filter(self, queryset, term):
+        query = self.ts_query(term)
+        if not query:
+            return super().filter(queryset, term)
+        match = RawSQL(
+            f"{self._document(queryset)} @@ to_tsquery('{SEARCH_CONFIG}', %s)",
+            [query],
+            output_field=BooleanField(),
+        )
+        # The trigram index keeps substring matches on the main column indexed.
+        main_field = search_fields(queryset.model)[0]
+        return queryset.filter(Q(match) | Q(**{f'{main_field}__icontains': term}))
+
+    def ranked(self, queryset, term):
+        query = self.ts_query(term)
+        if not query:
+            return super().ranked(queryset, term)
+        rank = RawSQL(
+            f"ts_rank({self._document(queryset)}, to_tsquery('{SEARCH_CONFIG}', %s))",
+            [query],
+            output_field=FloatField(),
+        )
+        return self.filter(queryset, term).annotate(search_rank=rank).order_by('-search_rank', '-pk')
+
+
+def get_search_backend(model):
+    """Return the search backend for the database ``model`` is read from"""
+    alias = router.db_for_read(model)
+    choice = getattr(settings, 'SEARCH_BACKEND', 'auto')
+    vendor = connections[alias].vendor
+    if choice == 'like':
+        return LikeSearchBackend()
+    if vendor == 'sqlite':
+        return SQLiteFTSBackend(alias)
+    if vendor == 'postgresql':
+        return PostgresSearchBackend()
+    return LikeSearchBackend()
+
+
+def _writer(model):
+    alias = router.db_for_write(model)
+    if getattr(settings, 'SEARCH_BACKEND', 'auto') != 'like' and connections[alias].vendor == 'sqlite':
+        return SQLiteFTSBackend(alias)
+    return LikeSearchBackend()
+
+
+def index_instance(instance):
+    """Add or refresh one row in the search index (called from post_save)"""
+    _writer(type(instance)).index(instance)
+
+
+def remove_instance(instance):
+    """Drop one row from the search index (called from post_delete)"""
+    _writer(type(instance)).remove(instance)
+
+
+def rebuild_index(model, pks=None):
+    """Re-index rows written without signals (bulk_create, bulk_update)"""
+    _writer(model).rebuild(model, pks)
@@ -0,0 +1,33 @@
+"""
+Start-up helpers for serverless function instances.
+
+A function instance serves a handful of requests before it is recycled, so
+work that a long-running worker amortises shows up in every cold start.
+``warm_up`` does the per-process work the first request would otherwise pay
+for while the instance is still initialising: it builds the URL resolver's
+lookup tables and compiles the most requested templates into the cached
+template loader.
+"""
+from django.template import TemplateDoesNotExist
+from django.template.loader import get_template
+from django.urls import get_resolver
+
+
+# Pages a new instance is most likely to serve first
+WARM_TEMPLATES = (
+    'registration/login.html',
+    'transactions/dashboard.html',
+    'transactions/transaction_list.html',
+)
+
+
+def warm_up(templates=WARM_TEMPLATES):
+    """Populate the URL resolver and compile ``templates``"""
+    resolver = get_resolver()
+    # Imports every view module and fills the reverse() lookup tables
+    resolver.reverse_dict
+    for name in templates:
+        try:
+            get_template(name)
+        except TemplateDoesNotExist:
+            pass
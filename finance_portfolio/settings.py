@@ -5,15 +5,19 @@ Generated for Django 5.x
 
 from pathlib import Path
 import os
-from dotenv import load_dotenv
+import tempfile
 import dj_database_url
-
-# Load environment variables
-load_dotenv()
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Load environment variables from .env (python-dotenv is only imported when
+# there is one, which keeps it off serverless cold starts)
+if (BASE_DIR / '.env').exists():
+    from dotenv import load_dotenv
+    load_dotenv(BASE_DIR / '.env')
+
 
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = os.environ.get('SECRET_KEY', 'django-insecure-your-secret-key-change-in-production-12345')
@@ -23,6 +27,12 @@ DEBUG = os.environ.get('DEBUG', 'False') == 'True'
 
 ALLOWED_HOSTS = os.environ.get('ALLOWED_HOSTS', 'localhost,127.0.0.1,.vercel.app').split(',')
 
+# Slim mode for serverless function instances (on by default on Vercel):
+# no admin site, no WhiteNoise (Vercel serves /static/ itself) and an
+# explicitly cached template loader. finance_portfolio.wsgi_vercel also
+# warms URL resolution and the hot templates at import.
+SERVERLESS = os.environ.get('SERVERLESS', 'True' if os.environ.get('VERCEL') else 'False') == 'True'
+
 
 # Application definition
 
@@ -38,16 +48,24 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'finance_portfolio.instrumentation.InstrumentationMiddleware',  # Per-view metrics, first so it times everything
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',  # Add WhiteNoise
+    'finance_portfolio.middleware.AsyncWhiteNoiseMiddleware',  # WhiteNoise, async-capable
+    'finance_portfolio.replicas.ReplicaRoutingMiddleware',  # Outside sessions so their writes pin
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'transactions.profiles.ProfileMiddleware',  # Lazy, memoized request.profile
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'finance_portfolio.middleware.MissingRateMiddleware',  # Explains a missing exchange rate
 ]
 
+if SERVERLESS:
+    INSTALLED_APPS.remove('django.contrib.admin')
+    MIDDLEWARE.remove('finance_portfolio.middleware.AsyncWhiteNoiseMiddleware')
+
 ROOT_URLCONF = 'finance_portfolio.urls'
 
 TEMPLATES = [
@@ -66,7 +84,23 @@ TEMPLATES = [
     },
 ]
 
+if SERVERLESS:
+    # Compiled templates are kept for the life of the function instance
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+
 WSGI_APPLICATION = 'finance_portfolio.wsgi.application'
+ASGI_APPLICATION = 'finance_portfolio.asgi.application'
+
+# Serve the dashboard, transaction list and watchlist with their async views.
+# Turn on when running under ASGI (see gunicorn.conf.py); under WSGI the sync
+# views avoid an event loop per request.
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', 'False') == 'True'
 
 
 # Database
@@ -78,7 +112,9 @@ if os.environ.get('DATABASE_URL'):
     DATABASES = {
         'default': dj_database_url.config(
             default=os.environ.get('DATABASE_URL'),
-            conn_max_age=600,
+            # Persistent connections are not safe across ASGI event loops;
+            # rely on a pooler (e.g. PgBouncer) there instead.
+            conn_max_age=0 if ASYNC_VIEWS else 600,
             conn_health_checks=True,
         )
     }
@@ -91,6 +127,80 @@ else:
         }
     }
 
+# Read replicas
+# REPLICA_DATABASE_URL is a comma-separated list of replica URLs (aliases
+# replica1, replica2, ...). Reads from the REPLICA_READ_VIEWS URL names go to
+# one of them; a client that wrote within REPLICA_PIN_SECONDS reads from the
+# primary. Two SQLite files work locally (copy the primary to "replicate").
+for _index, _url in enumerate(filter(None, os.environ.get('REPLICA_DATABASE_URL', '').split(',')), start=1):
+    DATABASES[f'replica{_index}'] = dj_database_url.parse(
+        _url.strip(),
+        conn_max_age=0 if ASYNC_VIEWS else 600,
+        conn_health_checks=True,
+    )
+    # Tests read through the primary instead of a separate test replica
+    DATABASES[f'replica{_index}']['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['finance_portfolio.replicas.ReplicaRouter']
+REPLICA_READ_VIEWS = {'dashboard', 'transaction_list', 'watchlist_list', 'watchlist_detail'}
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', '10'))
+REPLICA_PIN_COOKIE_NAME = 'primary_pin'
+
+
+# Cache
+# Local-memory by default; set CACHE_BACKEND=file to share the cache between
+# worker processes on one host (CACHE_LOCATION sets the directory).
+if os.environ.get('CACHE_BACKEND') == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get(
+                'CACHE_LOCATION', os.path.join(tempfile.gettempdir(), 'finance_portfolio_cache')
+            ),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'finance-portfolio',
+        }
+    }
+
+# Sessions
+# 'db' (default) always uses the database; 'cookie' keeps them in signed
+# cookies with no server-side storage; 'cached_db' reads sessions from the
+# default cache and only falls back to the database on a miss (writes go to
+# both). cached_db needs the shared cache (CACHE_BACKEND=file): with a
+# per-process cache, a logout or key rotation would only reach one worker.
+SESSION_MODE = os.environ.get('SESSION_MODE', 'db')
+if SESSION_MODE == 'cached_db' and os.environ.get('CACHE_BACKEND') != 'file':
+    raise ImproperlyConfigured('SESSION_MODE=cached_db requires a shared cache (CACHE_BACKEND=file)')
+SESSION_ENGINE = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cookie': 'django.contrib.sessions.backends.signed_cookies',
+}[SESSION_MODE]
+
+# Seconds a cached dashboard stays valid (it is also invalidated on every
+# transaction or budget change); 0 disables dashboard caching.
+DASHBOARD_CACHE_TIMEOUT = int(os.environ.get('DASHBOARD_CACHE_TIMEOUT', '300'))
+
+# z-score at which a category's spend this month is flagged as unusual
+SPENDING_ANOMALY_Z = float(os.environ.get('SPENDING_ANOMALY_Z', '2.0'))
+
+
+# List pagination
+# 'cursor' pages transaction and watchlist lists by keyset (index range seek,
+# no COUNT/OFFSET); 'offset' restores numbered pages.
+LIST_PAGINATION = os.environ.get('LIST_PAGINATION', 'cursor')
+
+
+# Search
+# 'auto' uses SQLite FTS5 or PostgreSQL tsvector/trigram indexes depending on
+# the database; 'like' falls back to unindexed icontains matching.
+SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND', 'auto')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -138,7 +248,102 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Ledger settings
+# 'incremental' applies a signed delta to UserProfile.total_balance on every
+# transaction write; 'recompute' re-aggregates the user's full history.
+LEDGER_MODE = os.environ.get('LEDGER_MODE', 'incremental')
+
+# Currencies
+# DEFAULT_CURRENCY is the base currency of new profiles and of admin totals.
+# Exchange rates come from FX_PROVIDER, a registered provider name ('local')
+# or a dotted path to a finance_portfolio.fx.FxRateProvider subclass; the
+# local provider reads FX_FIXTURE_PATH. FX_RATE_CACHE_SIZE bounds the
+# per-process LRU of (currency, date) rates and FX_RATE_CACHE_TTL (seconds)
+# the age of its entries. Users' base currencies are cached for
+# FX_BASE_CURRENCY_CACHE_TIMEOUT seconds.
+DEFAULT_CURRENCY = os.environ.get('DEFAULT_CURRENCY', 'USD')
+FX_PROVIDER = os.environ.get('FX_PROVIDER', 'local')
+FX_FIXTURE_PATH = os.environ.get('FX_FIXTURE_PATH', str(BASE_DIR / 'transactions' / 'data' / 'fx_rates.json'))
+FX_RATE_CACHE_SIZE = int(os.environ.get('FX_RATE_CACHE_SIZE', '4096'))
+FX_RATE_CACHE_TTL = int(os.environ.get('FX_RATE_CACHE_TTL', '300'))
+FX_BASE_CURRENCY_CACHE_TIMEOUT = int(os.environ.get('FX_BASE_CURRENCY_CACHE_TIMEOUT', '300'))
+
+# Rows written per bulk_create batch by the CSV/OFX importer
+TRANSACTION_IMPORT_BATCH_SIZE = int(os.environ.get('TRANSACTION_IMPORT_BATCH_SIZE', '1000'))
+
+# Rows per bulk_create batch when materializing recurring transactions
+RECURRING_BATCH_SIZE = int(os.environ.get('RECURRING_BATCH_SIZE', '5000'))
+
+# Delivery backend for budget alerts: 'console', 'file' (JSON lines appended
+# to BUDGET_ALERT_FILE_PATH) or the dotted path of an AlertBackend subclass.
+BUDGET_ALERT_BACKEND = os.environ.get('BUDGET_ALERT_BACKEND', 'console')
+BUDGET_ALERT_FILE_PATH = os.environ.get('BUDGET_ALERT_FILE_PATH', str(BASE_DIR / 'budget_alerts.jsonl'))
+
+# Seconds the budget limits checked on every write stay cached per user
+# (they are also dropped when a budget changes)
+BUDGET_LIMITS_CACHE_TIMEOUT = int(os.environ.get('BUDGET_LIMITS_CACHE_TIMEOUT', '60'))
+
+# Rows fetched per database round trip when streaming exports
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', '2000'))
+
+# Market prices
+# PRICE_PROVIDER is a registered provider name ('local') or a dotted path to a
+# watchlist.prices.PriceProvider subclass. The local provider reads
+# PRICE_FIXTURE_PATH, a JSON object of {symbol: price}.
+PRICE_PROVIDER = os.environ.get('PRICE_PROVIDER', 'local')
+PRICE_FIXTURE_PATH = os.environ.get('PRICE_FIXTURE_PATH', str(BASE_DIR / 'watchlist' / 'data' / 'prices.json'))
+PRICE_REFRESH_CONCURRENCY = int(os.environ.get('PRICE_REFRESH_CONCURRENCY', '8'))
+PRICE_REFRESH_BATCH_SIZE = int(os.environ.get('PRICE_REFRESH_BATCH_SIZE', '500'))
+
+# Set a watchlist item's status to BUY/SELL when a price update crosses its
+# target price (the crossing is recorded either way).
+WATCHLIST_TRIGGER_UPDATE_STATUS = os.environ.get('WATCHLIST_TRIGGER_UPDATE_STATUS', 'False') == 'True'
+
+# Directory for the memory-mapped price history files (rebuilt from the
+# PriceSnapshot table when missing, so a temporary directory is fine)
+PRICE_HISTORY_DIR = os.environ.get(
+    'PRICE_HISTORY_DIR', os.path.join(tempfile.gettempdir(), 'finance_portfolio_prices')
+)
+
+# Instrumentation
+# Per-view query budgets (URL name -> max SQL queries per request); requests
+# over budget log a warning. Metrics are served at /metrics to staff users or
+# to scrapers sending "Authorization: Bearer $METRICS_TOKEN".
+# Budgets are the most each view's benchmark scenarios (benchmarks/scenarios.py)
+# issue on SQLite with cold caches and no price history files; the tests hold
+# them to it.
+VIEW_QUERY_BUDGETS = {
+    # Session and user, then the summary and recent rows
+    'dashboard': 4,
+    'transaction_list': 4,
+    # Writes also update the balance, rollup, search index (two statements on
+    # SQLite, none on PostgreSQL) and budget alerts; edits and deletes first
+    # lock the stored row. An edit that moves a row to another month and
+    # currency updates two rollup buckets, creating the new one inside a
+    # savepoint, and loads the rates of both months.
+    'transaction_create': 15,
+    'transaction_update': 17,
+    'transaction_delete': 10,
+    'watchlist_list': 4,
+    # Two of them build the history files of the item and of the user's
+    # other positions while those are missing
+    'watchlist_detail': 8,
+}
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Admin
+# Unfiltered changelists of tables larger than this show the database's row
+# estimate (planner statistics) instead of running COUNT(*)
+ADMIN_ESTIMATED_COUNT_THRESHOLD = int(os.environ.get('ADMIN_ESTIMATED_COUNT_THRESHOLD', '100000'))
+
 # Authentication settings
+# ProfileBackend loads the UserProfile in the same query as the user; it
+# authenticates first, and ModelBackend keeps sessions that were signed in
+# through it valid (their profile is loaded on first use instead).
+AUTHENTICATION_BACKENDS = [
+    'transactions.profiles.ProfileBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'dashboard'
 LOGOUT_REDIRECT_URL = 'login'
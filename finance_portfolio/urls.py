@@ -2,12 +2,14 @@
 URL configuration for finance_portfolio project.
 Complete working version with custom logout
 """
-from django.contrib import admin
+from django.apps import apps
 from django.urls import path, include
 from django.contrib.auth import views as auth_views
 from django.contrib.auth import logout
 from django.shortcuts import redirect
-from transactions.views import DashboardView, SignUpView
+from django.conf import settings
+from transactions.views import AsyncDashboardView, DashboardView, SignUpView
+from finance_portfolio.instrumentation import metrics_view
 
 
 # Custom logout view function
@@ -18,11 +20,8 @@ def custom_logout(request):
 
 
 urlpatterns = [
-    # Admin
-    path('admin/', admin.site.urls),
-    
     # Main dashboard
-    path('', DashboardView.as_view(), name='dashboard'),
+    path('', (AsyncDashboardView if settings.ASYNC_VIEWS else DashboardView).as_view(), name='dashboard'),
     
     # App URLs
     path('transactions/', include('transactions.urls')),
@@ -38,4 +37,13 @@ urlpatterns = [
     
     # Signup
     path('signup/', SignUpView.as_view(), name='signup'),
-]
\ No newline at end of file
+    
+    # Prometheus metrics
+    path('metrics', metrics_view, name='metrics'),
+]
+
+# Admin (not installed in SERVERLESS mode)
+if apps.is_installed('django.contrib.admin'):
+    from django.contrib import admin
+
+    urlpatterns.insert(0, path('admin/', admin.site.urls))
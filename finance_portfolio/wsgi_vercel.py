@@ -10,10 +10,17 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(BASE_DIR))
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'finance_portfolio.settings')
+# Slim settings for function instances (see settings.SERVERLESS)
+os.environ.setdefault('SERVERLESS', 'True')
 
 from django.core.wsgi import get_wsgi_application
 
 application = get_wsgi_application()
 
+# Do the first request's URL and template set-up during initialisation
+from finance_portfolio.serverless import warm_up
+
+warm_up()
+
 # Vercel serverless function handler
 app = application
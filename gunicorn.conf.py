@@ -0,0 +1,39 @@
+"""
+Gunicorn configuration for serving the project over ASGI with uvicorn workers.
+
+    CACHE_BACKEND=file ASYNC_VIEWS=True gunicorn -c gunicorn.conf.py finance_portfolio.asgi:application
+
+Each worker is one process running one event loop, so a single worker can
+hold many concurrent dashboard loads without a thread per request; while a
+request waits on the database or the cache, the loop serves others. Scale
+with processes (WEB_CONCURRENCY, roughly one or two per CPU), not threads.
+For local development the equivalent single process is
+
+    ASYNC_VIEWS=True uvicorn finance_portfolio.asgi:application --reload
+"""
+import multiprocessing
+import os
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+worker_class = 'uvicorn.workers.UvicornWorker'
+workers = int(os.environ.get('WEB_CONCURRENCY', min(multiprocessing.cpu_count() * 2, 8)))
+
+# The local-memory cache is per process: dashboard versions, exchange rates
+# and cached sessions invalidated in one worker would stay stale in the others
+if workers > 1 and os.environ.get('CACHE_BACKEND') != 'file':
+    raise RuntimeError(
+        f'{workers} workers need a cache shared between processes: set CACHE_BACKEND=file '
+        'or WEB_CONCURRENCY=1'
+    )
+
+# Async workers keep idle keep-alive connections cheaply
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', '5'))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+
+# Recycle workers now and then to bound memory growth
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '2000'))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', '200'))
+
+accesslog = '-'
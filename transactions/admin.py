@@ -1,40 +1,122 @@
 from django.contrib import admin
-from .models import Transaction, UserProfile
+from finance_portfolio import fx
+from finance_portfolio.admin_tools import ScalableAdminMixin, UserFilter
+
+from . import cache as dashboard_cache, ledger
+from .models import (
+    BudgetAlert, CategoryBudget, ExchangeRate, MonthlySummary, RecurringTransaction, Transaction, UserProfile,
+)
+from .summary import transaction_totals
+
+
+@admin.action(description='Recalculate balances of the selected users')
+def recalculate_balances(modeladmin, request, queryset):
+    """Recompute the owners' balances with grouped aggregates (see ledger.reconcile_balances)"""
+    user_ids = set(queryset.order_by().values_list('user_id', flat=True).distinct())
+    drift = ledger.reconcile_balances(user_ids)
+    for user_id, _, _ in drift:
+        dashboard_cache.invalidate_dashboard(user_id)
+    modeladmin.message_user(
+        request, f'Recalculated {len(user_ids)} balance(s); {len(drift)} had drifted and were corrected.'
+    )
 
 
 @admin.register(Transaction)
-class TransactionAdmin(admin.ModelAdmin):
-    list_display = ('user', 'transaction_type', 'category', 'amount', 'date', 'created_at')
-    list_filter = ('transaction_type', 'category', 'date', 'user')
+class TransactionAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    list_display = ('user', 'transaction_type', 'category', 'amount', 'currency', 'date', 'created_at')
+    list_filter = ('transaction_type', 'category', 'currency', 'date', UserFilter)
     search_fields = ('description', 'user__username')
-    date_hierarchy = 'date'
     ordering = ('-date', '-created_at')
+    actions = [recalculate_balances]
     
     fieldsets = (
         ('Transaction Details', {
-            'fields': ('user', 'transaction_type', 'category', 'amount', 'date')
+            'fields': ('user', 'transaction_type', 'category', 'amount', 'currency', 'date')
         }),
         ('Additional Information', {
             'fields': ('description',)
         }),
     )
+    
+    def changelist_view(self, request, extra_context=None):
+        """Show income/expense totals for the filtered changelist, in DEFAULT_CURRENCY"""
+        response = super().changelist_view(request, extra_context)
+        context = getattr(response, 'context_data', None)
+        # Only once filtered or searched: totals over the whole table are a full scan
+        if context and 'cl' in context and context['cl'].queryset.query.where:
+            context['totals'] = transaction_totals(context['cl'].queryset)
+            context['totals_currency'] = fx.default_currency()
+        return response
 
 
 @admin.register(UserProfile)
-class UserProfileAdmin(admin.ModelAdmin):
-    list_display = ('user', 'total_balance', 'monthly_budget', 'updated_at')
+class UserProfileAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    list_display = ('user', 'total_balance', 'base_currency', 'monthly_budget', 'updated_at')
     search_fields = ('user__username', 'user__email')
     readonly_fields = ('created_at', 'updated_at')
+    actions = [recalculate_balances]
     
     fieldsets = (
         ('User', {
             'fields': ('user',)
         }),
         ('Financial Information', {
-            'fields': ('total_balance', 'monthly_budget')
+            'fields': ('base_currency', 'total_balance', 'monthly_budget')
         }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
     )
+
+
+@admin.register(MonthlySummary)
+class MonthlySummaryAdmin(admin.ModelAdmin):
+    list_display = ('user', 'year', 'month', 'transaction_type', 'category', 'currency', 'total', 'count')
+    list_filter = ('transaction_type', 'category', 'currency', 'year')
+    search_fields = ('user__username',)
+    ordering = ('-year', '-month')
+    readonly_fields = ('user', 'year', 'month', 'transaction_type', 'category', 'currency', 'total', 'count')
+
+
+@admin.register(RecurringTransaction)
+class RecurringTransactionAdmin(admin.ModelAdmin):
+    list_display = ('user', 'transaction_type', 'category', 'amount', 'frequency', 'interval', 'next_run', 'active')
+    list_filter = ('active', 'frequency', 'transaction_type', 'category')
+    search_fields = ('description', 'user__username')
+    ordering = ('next_run',)
+    raw_id_fields = ('user',)
+    
+    fieldsets = (
+        ('Transaction Template', {
+            'fields': ('user', 'transaction_type', 'category', 'amount', 'currency', 'description')
+        }),
+        ('Schedule', {
+            'fields': ('frequency', 'interval', 'start_date', 'end_date', 'next_run', 'active')
+        }),
+    )
+
+
+@admin.register(ExchangeRate)
+class ExchangeRateAdmin(admin.ModelAdmin):
+    list_display = ('currency', 'date', 'rate')
+    list_filter = ('currency',)
+    date_hierarchy = 'date'
+    ordering = ('currency', '-date')
+
+
+@admin.register(CategoryBudget)
+class CategoryBudgetAdmin(admin.ModelAdmin):
+    list_display = ('user', 'category', 'amount', 'updated_at')
+    list_filter = ('category',)
+    search_fields = ('user__username',)
+    raw_id_fields = ('user',)
+
+
+@admin.register(BudgetAlert)
+class BudgetAlertAdmin(admin.ModelAdmin):
+    list_display = ('user', 'category', 'year', 'month', 'level', 'spent', 'budget', 'created_at', 'delivered_at')
+    list_filter = ('level', 'category', 'year', 'month')
+    search_fields = ('user__username',)
+    ordering = ('-created_at',)
+    readonly_fields = ('user', 'category', 'year', 'month', 'level', 'spent', 'budget', 'created_at', 'delivered_at')
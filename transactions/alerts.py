@@ -0,0 +1,309 @@
+"""
+Budget alerts, evaluated on every transaction write.
+
+A user has an overall monthly limit (``UserProfile.monthly_budget``) and
+optional per-category limits (``CategoryBudget``). When an expense write
+pushes this month's spending across 70%, 90% or 100% of a limit, a
+``BudgetAlert`` row is written; the unique constraint on (user, category,
+month, level) means each threshold fires at most once per month.
+
+Evaluation is O(1) per write: the change in spending is known from the
+saved row and its previous state, writes that do not increase this month's
+spending return immediately, and the running month totals come from the
+user's MonthlySummary buckets for the month (one row per category) rather
+than from an aggregate over their transactions. Limits are cached per user
+(for ``BUDGET_LIMITS_CACHE_TIMEOUT`` seconds, and dropped when a budget
+changes) and, like the spending they are compared with, in the user's base
+currency.
+
+Alerts with ``delivered_at`` unset form the delivery queue, drained by
+``deliver_alerts`` (the ``deliver_budget_alerts`` command) through the
+backend named by ``settings.BUDGET_ALERT_BACKEND``.
+"""
+import datetime
+import json
+import logging
+import sys
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from finance_portfolio import fx
+
+
+logger = logging.getLogger(__name__)
+
+# (level, percentage of the budget), in increasing order
+THRESHOLDS = (
+    ('WARNING', 70),
+    ('DANGER', 90),
+    ('EXCEEDED', 100),
+)
+_WARNING, _DANGER = THRESHOLDS[0][1], THRESHOLDS[1][1]
+
+# Key of the overall monthly budget in a user's limits
+OVERALL = ''
+
+
+def budget_level(spent, budget):
+    """'no-budget', 'safe', 'warning' or 'danger' for spending against a budget"""
+    if budget == 0:
+        return 'no-budget'
+
+    percentage = (spent / budget) * 100
+
+    if percentage < _WARNING:
+        return 'safe'
+    elif percentage < _DANGER:
+        return 'warning'
+    else:
+        return 'danger'
+
+
+def limits_cache_timeout():
+    """Seconds a user's cached limits live (they are also dropped on every change)"""
+    return getattr(settings, 'BUDGET_LIMITS_CACHE_TIMEOUT', 60)
+
+
+def _limits_key(user_id):
+    return f'budgets:limits:{user_id}'
+
+
+def get_limits(user_id):
+    """``{category: amount}`` of the user's budgets, ``OVERALL`` for the monthly one"""
+    from .models import CategoryBudget, UserProfile
+
+    limits = cache.get(_limits_key(user_id))
+    if limits is None:
+        limits = dict(
+            CategoryBudget.objects.filter(user_id=user_id).values_list('category', 'amount')
+        )
+        overall = UserProfile.objects.filter(user_id=user_id).values_list('monthly_budget', flat=True).first()
+        if overall:
+            limits[OVERALL] = overall
+        cache.set(_limits_key(user_id), limits, limits_cache_timeout())
+    return limits
+
+
+def invalidate_limits(user_id):
+    """Drop the cached limits once the current database transaction commits.
+
+    Deleting earlier would let a concurrent write cache the old limits again.
+    The timeout bounds staleness where the cache is not shared by every
+    process.
+    """
+    transaction.on_commit(partial(cache.delete, _limits_key(user_id)))
+
+
+def _crossed(budget, before, after):
+    """Levels whose threshold lies in ``(before, after]``"""
+    for level, percentage in THRESHOLDS:
+        limit = budget * percentage / 100
+        if before < limit <= after:
+            yield level
+
+
+def _spending(fields, **filters):
+    # Expense buckets summed per ``fields`` in the owners' base currencies
+    from .summary import converted_summaries
+
+    return converted_summaries(transaction_type='EXPENSE', **filters).values(*fields).annotate(
+        spent=Sum('base_total'),
+    ).values_list(*fields, 'spent').order_by()
+
+
+def _base_amount(state):
+    return fx.convert(abs(state.amount), state.currency, fx.base_currency(state.user_id), fx.period_start(state.date))
+
+
+def _expense(state, year, month):
+    if state is None or state.transaction_type != 'EXPENSE':
+        return None
+    if (state.date.year, state.date.month) != (year, month):
+        return None
+    return state
+
+
+def record_save(state, previous, today=None):
+    """Queue alerts for thresholds crossed by saving a transaction.
+
+    ``state`` and ``previous`` are ``LedgerState`` tuples for the row after
+    and before the save (``previous`` is ``None`` for a new row). Must run
+    after the rollup has been updated. Only the current month is evaluated.
+    """
+    today = today or datetime.date.today()
+    current = _expense(state, today.year, today.month)
+    if current is None:
+        return []
+    before = _expense(previous, today.year, today.month)
+
+    amount = _base_amount(current)
+    same_user = before and before.user_id == current.user_id
+    previous_amount = _base_amount(before) if same_user else 0
+    month_added = amount - previous_amount
+    category_added = amount - (previous_amount if same_user and before.category == current.category else 0)
+    if month_added <= 0 and category_added <= 0:
+        return []
+
+    limits = get_limits(current.user_id)
+    if not limits:
+        return []
+
+    totals = dict(
+        _spending(['category'], user_id=current.user_id, year=today.year, month=today.month)
+    )
+    scopes = [
+        (OVERALL, sum(totals.values()), month_added),
+        (current.category, totals.get(current.category, 0), category_added),
+    ]
+    return _queue(current.user_id, today, limits, scopes)
+
+
+def _queue(user_id, today, limits, scopes):
+    from .models import BudgetAlert
+
+    alerts = []
+    for category, spent, added in scopes:
+        budget = limits.get(category)
+        if not budget or added <= 0:
+            continue
+        for level in _crossed(budget, spent - added, spent):
+            alerts.append(BudgetAlert(
+                user_id=user_id, category=category, year=today.year, month=today.month,
+                level=level, spent=spent, budget=budget,
+            ))
+    if alerts:
+        BudgetAlert.objects.bulk_create(alerts, ignore_conflicts=True)
+    return alerts
+
+
+def check_users(user_ids, today=None):
+    """Queue alerts for every threshold the users are already past this month.
+
+    Used after bulk writes, which bypass the per-row evaluation; thresholds
+    that already fired this month are skipped by the unique constraint.
+    """
+    today = today or datetime.date.today()
+    rows = _spending(
+        ['user_id', 'category'], user_id__in=list(user_ids), year=today.year, month=today.month,
+    )
+    totals = {}
+    for user_id, category, total in rows:
+        totals.setdefault(user_id, {})[category] = total
+
+    queued = []
+    for user_id, categories in totals.items():
+        limits = get_limits(user_id)
+        # Evaluate as if all of this month's spending arrived at once
+        scopes = [(OVERALL, sum(categories.values()), sum(categories.values()))]
+        scopes += [(category, total, total) for category, total in categories.items()]
+        queued += _queue(user_id, today, limits, scopes)
+    return queued
+
+
+class AlertDeliveryError(Exception):
+    """Raised by a backend when alerts could not be delivered"""
+
+
+class AlertBackend:
+    """Delivers budget alerts; subclasses implement ``send``"""
+
+    def send(self, alerts):
+        raise NotImplementedError
+
+    @staticmethod
+    def message(alert):
+        scope = alert.get_category_display() if alert.category else 'monthly budget'
+        return (
+            f'{alert.get_level_display()}: {scope} spending for {alert.year}-{alert.month:02d} '
+            f'is {alert.spent} of {alert.budget} ({alert.percentage:.0f}%)'
+        )
+
+    @classmethod
+    def payload(cls, alert):
+        return {
+            'id': alert.pk,
+            'user_id': alert.user_id,
+            'category': alert.category or None,
+            'year': alert.year,
+            'month': alert.month,
+            'level': alert.level,
+            'spent': str(alert.spent),
+            'budget': str(alert.budget),
+            'created_at': alert.created_at.isoformat(),
+            'message': cls.message(alert),
+        }
+
+
+class ConsoleAlertBackend(AlertBackend):
+    """Writes alerts to stdout, one line each (development stub)"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def send(self, alerts):
+        for alert in alerts:
+            self.stream.write(f'[budget alert] user {alert.user_id}: {self.message(alert)}\n')
+        self.stream.flush()
+
+
+class FileAlertBackend(AlertBackend):
+    """Appends alerts to ``path`` as JSON lines"""
+
+    def __init__(self, path=None):
+        self.path = path or getattr(settings, 'BUDGET_ALERT_FILE_PATH', 'budget_alerts.jsonl')
+
+    def send(self, alerts):
+        try:
+            with open(self.path, 'a', encoding='utf-8') as handle:
+                for alert in alerts:
+                    handle.write(json.dumps(self.payload(alert)) + '\n')
+        except OSError as exc:
+            raise AlertDeliveryError(str(exc)) from exc
+
+
+BACKENDS = {
+    'console': ConsoleAlertBackend,
+    'file': FileAlertBackend,
+}
+
+
+def get_alert_backend(name=None):
+    """Instantiate the backend ``name`` (a registered name or dotted path)"""
+    name = name or getattr(settings, 'BUDGET_ALERT_BACKEND', 'console')
+    backend_class = BACKENDS.get(name) or import_string(name)
+    return backend_class()
+
+
+def deliver_alerts(backend=None, batch_size=500):
+    """Send queued alerts in batches; returns ``(delivered, failed)``.
+
+    A batch is marked delivered only after the backend accepted it, so a
+    failure leaves it queued for the next run.
+    """
+    from .models import BudgetAlert
+
+    backend = backend or get_alert_backend()
+    delivered = failed = 0
+    last_pk = 0
+    while True:
+        batch = list(
+            BudgetAlert.objects.filter(delivered_at__isnull=True, pk__gt=last_pk).order_by('pk')[:batch_size]
+        )
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+        try:
+            backend.send(batch)
+        except AlertDeliveryError as exc:
+            logger.warning('Budget alert delivery failed for %d alert(s): %s', len(batch), exc)
+            failed += len(batch)
+            continue
+        BudgetAlert.objects.filter(pk__in=[alert.pk for alert in batch]).update(delivered_at=timezone.now())
+        delivered += len(batch)
+    return delivered, failed
@@ -0,0 +1,212 @@
+"""
+Spending analytics over a user's whole transaction history.
+
+The ``(date, type, category, amount)`` columns are read with one
+``values_list`` query into NumPy arrays (amounts converted into the user's
+base currency by the database), bucketed by month and week with
+``bincount``, and everything else is derived from those arrays in one pass:
+
+* monthly and weekly income/expense series and rolling averages
+* a month-end run-rate projection of this month's expenses against
+  ``UserProfile.monthly_budget``
+* per-category anomaly flags: this month's spend in a category compared with
+  its earlier months as a z-score
+
+Results are cached per user against the dashboard version, so the next
+transaction write (or budget change) recomputes them. The dashboard uses
+``monthly_analytics`` instead, which derives the monthly figures from the
+rollup totals its summary has already read.
+"""
+import calendar
+import datetime
+from dataclasses import dataclass, field
+
+import numpy as np
+from django.conf import settings
+
+from finance_portfolio import fx
+
+from .models import Transaction, UserProfile
+
+
+CATEGORY_CODES = [code for code, _ in Transaction.CATEGORY_CHOICES]
+CATEGORY_LABELS = dict(Transaction.CATEGORY_CHOICES)
+
+
+def anomaly_threshold():
+    return getattr(settings, 'SPENDING_ANOMALY_Z', 2.0)
+
+
+@dataclass
+class SpendingAnalytics:
+    """Computed spending series and flags for one user"""
+    months: list = field(default_factory=list)
+    monthly_income: list = field(default_factory=list)
+    monthly_expenses: list = field(default_factory=list)
+    rolling_expenses: list = field(default_factory=list)
+    weeks: list = field(default_factory=list)
+    weekly_expenses: list = field(default_factory=list)
+    month_to_date: float = 0.0
+    projected_expenses: float = 0.0
+    monthly_budget: float = 0.0
+    projected_over_budget: float = 0.0
+    anomalies: list = field(default_factory=list)
+
+    def as_dict(self):
+        return {
+            'months': self.months,
+            'monthly_income': self.monthly_income,
+            'monthly_expenses': self.monthly_expenses,
+            'rolling_expenses': self.rolling_expenses,
+            'weeks': self.weeks,
+            'weekly_expenses': self.weekly_expenses,
+            'month_to_date': self.month_to_date,
+            'projected_expenses': self.projected_expenses,
+            'monthly_budget': self.monthly_budget,
+            'projected_over_budget': self.projected_over_budget,
+            'anomalies': self.anomalies,
+        }
+
+
+def _column_rows(user):
+    return (
+        Transaction.objects.filter(user=user)
+        .annotate(fx_day=fx.month_start('date'), base_amount=fx.to_base('amount', day='fx_day'))
+        .order_by()
+        .values_list('date', 'transaction_type', 'category', 'base_amount', 'currency')
+    )
+
+
+def to_columns(rows):
+    """``(days, is_expense, category_codes, amounts)`` arrays from column rows"""
+    count = len(rows)
+    category_index = {code: index for index, code in enumerate(CATEGORY_CODES)}
+    days = np.fromiter((row[0].toordinal() for row in rows), dtype=np.int64, count=count)
+    is_expense = np.fromiter((row[1] == 'EXPENSE' for row in rows), dtype=bool, count=count)
+    categories = np.fromiter(
+        (category_index.get(row[2], len(CATEGORY_CODES) - 1) for row in rows), dtype=np.int64, count=count
+    )
+    amounts = np.fromiter((float(row[3]) for row in rows), dtype=np.float64, count=count)
+    return days, is_expense, categories, amounts
+
+
+def load_columns(user):
+    """One query: ``(days, is_expense, category_codes, amounts)`` arrays"""
+    rows = list(_column_rows(user))
+    for row in rows:
+        if row[3] is None:
+            raise fx.MissingRateError(row[4])
+    return to_columns(rows)
+
+
+def _month_numbers(days):
+    """Months since year 0 for an array of day ordinals"""
+    dates = (days - datetime.date(1970, 1, 1).toordinal()).astype('datetime64[D]')
+    return dates.astype('datetime64[M]').astype(np.int64) + 1970 * 12
+
+
+def _round(values):
+    return [round(float(value), 2) for value in values]
+
+
+def compute(days, is_expense, categories, amounts, today, monthly_budget=0.0,
+            months=12, weeks=26, window=3, threshold=None):
+    """Compute ``SpendingAnalytics`` from transaction columns"""
+    threshold = anomaly_threshold() if threshold is None else threshold
+    result = SpendingAnalytics(monthly_budget=round(float(monthly_budget), 2))
+
+    current_month = today.year * 12 + today.month - 1
+    first_month = current_month - months + 1
+    month_of = _month_numbers(days) - first_month
+    in_range = (month_of >= 0) & (month_of < months)
+
+    # Monthly series: one bincount per type over the month buckets
+    expense = in_range & is_expense
+    income = in_range & ~is_expense
+    monthly_expenses = np.bincount(month_of[expense], weights=amounts[expense], minlength=months)
+    monthly_income = np.bincount(month_of[income], weights=amounts[income], minlength=months)
+    result.months = [
+        f'{(first_month + index) // 12:04d}-{(first_month + index) % 12 + 1:02d}' for index in range(months)
+    ]
+    result.monthly_expenses = _round(monthly_expenses)
+    result.monthly_income = _round(monthly_income)
+
+    # Rolling mean of completed months (the current month is partial)
+    completed = monthly_expenses[:-1]
+    if len(completed) >= window:
+        cumulative = np.concatenate(([0.0], np.cumsum(completed)))
+        rolling = (cumulative[window:] - cumulative[:-window]) / window
+        result.rolling_expenses = [None] * (window - 1) + _round(rolling)
+
+    # Weekly expenses, weeks starting on Monday
+    this_week = today.toordinal() - today.weekday()
+    week_of = (days - (this_week - 7 * (weeks - 1))) // 7
+    weekly = is_expense & (week_of >= 0) & (week_of < weeks)
+    result.weeks = [
+        datetime.date.fromordinal(this_week - 7 * (weeks - 1 - index)).isoformat() for index in range(weeks)
+    ]
+    result.weekly_expenses = _round(np.bincount(week_of[weekly], weights=amounts[weekly], minlength=weeks))
+
+    # Month-end run-rate projection
+    days_in_month = calendar.monthrange(today.year, today.month)[1]
+    month_to_date = monthly_expenses[-1]
+    result.month_to_date = round(float(month_to_date), 2)
+    result.projected_expenses = round(float(month_to_date / today.day * days_in_month), 2)
+    if monthly_budget:
+        result.projected_over_budget = round(result.projected_expenses - float(monthly_budget), 2)
+
+    # Category x month matrix in one bincount, then z-scores of the current
+    # month against each category's earlier months
+    buckets = len(CATEGORY_CODES) * months
+    by_category = np.bincount(
+        categories[expense] * months + month_of[expense], weights=amounts[expense], minlength=buckets
+    ).reshape(len(CATEGORY_CODES), months)
+    history, current = by_category[:, :-1], by_category[:, -1]
+    active = (history > 0).sum(axis=1) >= 2
+    mean = history.mean(axis=1)
+    std = history.std(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z_scores = np.where(std > 0, (current - mean) / std, 0.0)
+    flagged = np.flatnonzero(active & (z_scores >= threshold))
+    result.anomalies = sorted(
+        (
+            {
+                'category': CATEGORY_CODES[index],
+                'label': CATEGORY_LABELS[CATEGORY_CODES[index]],
+                'month_to_date': round(float(current[index]), 2),
+                'average': round(float(mean[index]), 2),
+                'z_score': round(float(z_scores[index]), 2),
+            }
+            for index in flagged
+        ),
+        key=lambda anomaly: -anomaly['z_score'],
+    )
+    return result
+
+
+def monthly_analytics(months, today=None, monthly_budget=0.0):
+    """``SpendingAnalytics`` from per-month category totals, without a query.
+
+    ``months`` is ``DashboardSummary.months`` (read from the MonthlySummary
+    rollup). The monthly series, projection and anomalies match
+    ``spending_analytics``; the weekly series needs day-level rows and is
+    left empty.
+    """
+    today = today or datetime.date.today()
+    rows = []
+    for row in months:
+        day = datetime.date(row['year'], row['month'], 1)
+        if row['expenses']:
+            rows.append((day, 'EXPENSE', row['category'], row['expenses']))
+        if row['income']:
+            rows.append((day, 'INCOME', row['category'], row['income']))
+    return compute(*to_columns(rows), today=today, monthly_budget=monthly_budget, weeks=0)
+
+
+def spending_analytics(user, today=None):
+    """Load ``user``'s history and compute their spending analytics"""
+    today = today or datetime.date.today()
+    profile = UserProfile.objects.filter(user=user).only('monthly_budget').first()
+    budget = profile.monthly_budget if profile else 0
+    return compute(*load_columns(user), today=today, monthly_budget=budget)
+
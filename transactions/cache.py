@@ -0,0 +1,189 @@
+"""
+Versioned per-user cache for the dashboard.
+
+Each user has a version number in the cache. Anything cached for the
+dashboard (the computed context and spending analytics here, and the
+rendered fragments in ``dashboard.html``) is stored against the current
+version, so bumping it from the Transaction signals or a budget change makes
+every older entry unreachable without having to find and delete it.
+
+The version lives in the default cache, so with several worker processes
+that cache must be shared between them (``CACHE_BACKEND=file``); with the
+per-process local-memory cache a bump would only reach one worker.
+``gunicorn.conf.py`` refuses to start several workers without it.
+
+A dashboard hit costs one ``get_many`` round trip that returns both the
+version and the cached context. The ``a``-prefixed functions are the same
+lookups for the async views, with ``build`` returning an awaitable.
+"""
+import threading
+import time
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+
+def cache_timeout():
+    """Seconds a dashboard entry lives; 0 disables the cache"""
+    return getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 300)
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def cache_stats():
+    """Return a snapshot of the hit/miss counters for this process"""
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+    return stats
+
+
+def reset_cache_stats():
+    """Zero this process's hit/miss counters"""
+    with _stats_lock:
+        for name in _stats:
+            _stats[name] = 0
+
+
+def _version_key(user_id):
+    return f'dashboard:version:{user_id}'
+
+
+def _context_key(user_id, day):
+    return f'dashboard:context:{user_id}:{day.isoformat()}'
+
+
+def _analytics_key(user_id, day):
+    return f'dashboard:analytics:{user_id}:{day.isoformat()}'
+
+
+def _new_version():
+    # Seeded from the clock so a version key that was evicted and recreated
+    # never collides with entries written under an older version.
+    return int(time.time() * 1000)
+
+
+def dashboard_version(user_id):
+    """Return the user's current dashboard version, creating it if needed"""
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        version = _new_version()
+        cache.add(_version_key(user_id), version, None)
+        version = cache.get(_version_key(user_id), version)
+    return version
+
+
+async def adashboard_version(user_id):
+    """Async version of ``dashboard_version``"""
+    version = await cache.aget(_version_key(user_id))
+    if version is None:
+        version = _new_version()
+        await cache.aadd(_version_key(user_id), version, None)
+        version = await cache.aget(_version_key(user_id), version)
+    return version
+
+
+def invalidate_dashboard(user_id):
+    """Bump the user's version so all cached dashboard data goes stale.
+
+    The bump waits for the current database transaction to commit (it runs
+    at once outside one), so a dashboard rebuilt in between cannot be cached
+    under the new version with the old figures, and a rolled back write
+    invalidates nothing.
+    """
+    transaction.on_commit(partial(_bump_version, user_id))
+
+
+def _bump_version(user_id):
+    _count('invalidations')
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        cache.set(_version_key(user_id), _new_version(), None)
+
+
+def _get_versioned(user_id, key, build):
+    """Return ``(value, version)`` for ``key``, calling ``build(version)`` on a miss"""
+    version_key = _version_key(user_id)
+    found = cache.get_many([version_key, key])
+    version = found.get(version_key)
+    entry = found.get(key)
+
+    if version is not None and entry is not None and entry['version'] == version:
+        _count('hits')
+        return entry['value'], version
+
+    _count('misses')
+    if version is None:
+        version = dashboard_version(user_id)
+    value = build(version)
+    cache.set(key, {'version': version, 'value': value}, cache_timeout())
+    return value, version
+
+
+async def _aget_versioned(user_id, key, build):
+    """Async version of ``_get_versioned``; ``build(version)`` returns an awaitable"""
+    version_key = _version_key(user_id)
+    found = await cache.aget_many([version_key, key])
+    version = found.get(version_key)
+    entry = found.get(key)
+
+    if version is not None and entry is not None and entry['version'] == version:
+        _count('hits')
+        return entry['value'], version
+
+    _count('misses')
+    if version is None:
+        version = await adashboard_version(user_id)
+    value = await build(version)
+    await cache.aset(key, {'version': version, 'value': value}, cache_timeout())
+    return value, version
+
+
+def get_dashboard_context(user_id, day, build):
+    """Return the cached dashboard context for ``user_id`` on ``day``.
+
+    On a miss ``build()`` is called and its result stored under the current
+    version. The returned dict always carries ``dashboard_version`` so
+    templates can key fragment caches on it.
+    """
+    if not cache_timeout():
+        return dict(build(), dashboard_version=None)
+
+    context, _ = _get_versioned(
+        user_id,
+        _context_key(user_id, day),
+        lambda version: dict(build(), dashboard_version=version),
+    )
+    return context
+
+
+def get_spending_analytics(user_id, day, build):
+    """Return the cached spending analytics for ``user_id`` on ``day``"""
+    if not cache_timeout():
+        return build()
+    analytics, _ = _get_versioned(user_id, _analytics_key(user_id, day), lambda version: build())
+    return analytics
+
+
+async def aget_dashboard_context(user_id, day, build):
+    """Async version of ``get_dashboard_context``"""
+    if not cache_timeout():
+        return dict(await build(), dashboard_version=None)
+
+    async def build_versioned(version):
+        return dict(await build(), dashboard_version=version)
+
+    context, _ = await _aget_versioned(user_id, _context_key(user_id, day), build_versioned)
+    return context
+
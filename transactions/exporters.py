@@ -0,0 +1,128 @@
+"""
+Constant-memory export of transaction history.
+
+Rows are read with ``values_list(...).iterator(chunk_size=...)`` (a
+server-side cursor on PostgreSQL), so neither model instances nor the whole
+result set are held in memory; each writer turns the row stream into a
+stream of text chunks for ``StreamingHttpResponse`` or a file
+(``astream_export`` wraps it as an async iterator for ASGI).
+
+Formats:
+
+* ``csv``      - header row, then one line per transaction
+* ``ndjson``   - one JSON object per line
+* ``columnar`` - a ``{"columns": [...]}`` line, then one line per chunk
+                 holding ``{column: [values, ...]}`` arrays
+"""
+import csv
+import json
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+
+EXPORT_FIELDS = ('date', 'transaction_type', 'category', 'amount', 'currency', 'description')
+
+# format -> (content type, file extension)
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'columnar': ('application/x-ndjson', 'columns.ndjson'),
+}
+
+EXPORT_ORDERING = ('-date', '-created_at', '-id')
+
+
+def default_chunk_size():
+    return getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+
+
+def export_rows(queryset, fields=EXPORT_FIELDS, chunk_size=None):
+    """Stream ``fields`` tuples for ``queryset`` without building instances"""
+    return queryset.order_by(*EXPORT_ORDERING).values_list(*fields).iterator(
+        chunk_size=chunk_size or default_chunk_size()
+    )
+
+
+class _Echo:
+    """File-like object whose write() returns the value, for csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def _json_value(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    # Decimal amounts keep their exact text form
+    return str(value)
+
+
+def _dumps(data):
+    return json.dumps(data, separators=(',', ':')) + '\n'
+
+
+def stream_csv(rows, fields=EXPORT_FIELDS):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_ndjson(rows, fields=EXPORT_FIELDS):
+    for row in rows:
+        yield _dumps({name: _json_value(value) for name, value in zip(fields, row)})
+
+
+def stream_columnar(rows, fields=EXPORT_FIELDS, chunk_size=None):
+    chunk_size = chunk_size or default_chunk_size()
+    yield _dumps({'columns': list(fields)})
+    block = [[] for _ in fields]
+    size = 0
+    for row in rows:
+        for column, value in zip(block, row):
+            column.append(_json_value(value))
+        size += 1
+        if size >= chunk_size:
+            yield _dumps(dict(zip(fields, block)))
+            block = [[] for _ in fields]
+            size = 0
+    if size:
+        yield _dumps(dict(zip(fields, block)))
+
+
+def stream_export(queryset, export_format='csv', fields=EXPORT_FIELDS, chunk_size=None):
+    """Return an iterator of text chunks for ``queryset`` in ``export_format``"""
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f'Unknown export format: {export_format!r}')
+    rows = export_rows(queryset, fields, chunk_size)
+    if export_format == 'ndjson':
+        return stream_ndjson(rows, fields)
+    if export_format == 'columnar':
+        return stream_columnar(rows, fields, chunk_size)
+    return stream_csv(rows, fields)
+
+
+async def astream_export(queryset, export_format='csv', fields=EXPORT_FIELDS, chunk_size=None, batch=100):
+    """Async iterator over ``stream_export``'s chunks, for responses served over ASGI.
+
+    Under ASGI, ``StreamingHttpResponse`` reads a sync iterator to the end
+    before sending anything. Here the sync writer (and its cursor) stays on
+    the thread Django keeps for sync code, and ``batch`` chunks at a time are
+    handed to the event loop.
+    """
+    chunks = stream_export(queryset, export_format, fields, chunk_size)
+    next_batch = sync_to_async(lambda: list(islice(chunks, batch)))
+    try:
+        while block := await next_batch():
+            for chunk in block:
+                yield chunk
+    finally:
+        await sync_to_async(chunks.close)()
+
+
+def export_filename(username, export_format):
+    return f'transactions-{username}.{EXPORT_FORMATS[export_format][1]}'
@@ -0,0 +1,40 @@
+"""
+Query-string filters shared by the transaction list and the export endpoint.
+"""
+from django.core.exceptions import ValidationError
+
+from finance_portfolio.search import get_search_backend
+
+from .models import Transaction
+
+
+def filter_transactions(queryset, params, ranked=False):
+    """Apply the type, category, date range and search filters from ``params``.
+
+    With ``ranked`` the search orders results by relevance (for display);
+    otherwise it only filters and leaves the ordering to the caller.
+    """
+    transaction_type = params.get('type')
+    if transaction_type in ['EXPENSE', 'INCOME']:
+        queryset = queryset.filter(transaction_type=transaction_type)
+
+    category = params.get('category')
+    if category:
+        queryset = queryset.filter(category=category)
+
+    date_field = Transaction._meta.get_field('date')
+    for param, lookup in (('date_from', 'date__gte'), ('date_to', 'date__lte')):
+        value = params.get(param)
+        if value:
+            try:
+                queryset = queryset.filter(**{lookup: date_field.to_python(value)})
+            except ValidationError:
+                # Ignore malformed dates the same way unknown types are ignored
+                continue
+
+    search = params.get('search')
+    if search:
+        backend = get_search_backend(Transaction)
+        queryset = backend.ranked(queryset, search) if ranked else backend.filter(queryset, search)
+
+    return queryset
@@ -1,15 +1,23 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
+from finance_portfolio import fx
 from .models import Transaction
 
 
+def validate_positive_amount(amount):
+    """Validate that amount is positive"""
+    if amount and amount <= 0:
+        raise forms.ValidationError("Amount must be greater than zero.")
+    return amount
+
+
 class TransactionForm(forms.ModelForm):
     """Form for creating and updating transactions with validation"""
     
     class Meta:
         model = Transaction
-        fields = ['transaction_type', 'category', 'amount', 'description', 'date']
+        fields = ['transaction_type', 'category', 'amount', 'currency', 'description', 'date']
         widgets = {
             'transaction_type': forms.Select(attrs={
                 'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-blue-500 focus:ring-blue-500 bg-gray-50'
@@ -23,6 +31,9 @@ class TransactionForm(forms.ModelForm):
                 'step': '0.01',
                 'min': '0.01'
             }),
+            'currency': forms.Select(attrs={
+                'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-blue-500 focus:ring-blue-500 bg-gray-50'
+            }),
             'description': forms.Textarea(attrs={
                 'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-blue-500 focus:ring-blue-500 bg-gray-50',
                 'rows': 3,
@@ -36,10 +47,7 @@ class TransactionForm(forms.ModelForm):
     
     def clean_amount(self):
         """Validate that amount is positive"""
-        amount = self.cleaned_data.get('amount')
-        if amount and amount <= 0:
-            raise forms.ValidationError("Amount must be greater than zero.")
-        return amount
+        return validate_positive_amount(self.cleaned_data.get('amount'))
 
 
 class SignUpForm(UserCreationForm):
@@ -90,7 +98,14 @@ class SignUpForm(UserCreationForm):
 
 
 class BudgetUpdateForm(forms.Form):
-    """Form for updating monthly budget"""
+    """Form for updating the base currency, monthly budget and the optional per-category limits"""
+    base_currency = forms.ChoiceField(
+        choices=fx.CURRENCY_CHOICES,
+        help_text='Balances, budgets and totals are shown in this currency.',
+        widget=forms.Select(attrs={
+            'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-blue-500 focus:ring-blue-500 bg-gray-50'
+        })
+    )
     monthly_budget = forms.DecimalField(
         max_digits=12,
         decimal_places=2,
@@ -101,3 +116,57 @@ class BudgetUpdateForm(forms.Form):
             'step': '0.01'
         })
     )
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Blank means no limit for that category
+        for code, label in Transaction.CATEGORY_CHOICES:
+            self.fields[self.category_field(code)] = forms.DecimalField(
+                label=label,
+                required=False,
+                max_digits=12,
+                decimal_places=2,
+                min_value=0,
+                widget=forms.NumberInput(attrs={
+                    'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-blue-500 focus:ring-blue-500 bg-gray-50',
+                    'placeholder': 'No limit',
+                    'step': '0.01'
+                })
+            )
+    
+    @staticmethod
+    def category_field(code):
+        return f'category_{code.lower()}'
+    
+    def category_fields(self):
+        return [self[self.category_field(code)] for code, _ in Transaction.CATEGORY_CHOICES]
+    
+    def category_budgets(self):
+        """``{category: amount or None}`` from the cleaned data"""
+        return {
+            code: self.cleaned_data.get(self.category_field(code))
+            for code, _ in Transaction.CATEGORY_CHOICES
+        }
+
+
+class TransactionImportForm(forms.Form):
+    """Form for uploading a bank export to import"""
+    FORMAT_CHOICES = [
+        ('auto', 'Detect from file name'),
+        ('csv', 'CSV'),
+        ('ofx', 'OFX / QFX'),
+    ]
+    
+    file = forms.FileField(
+        widget=forms.ClearableFileInput(attrs={
+            'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-blue-500 focus:ring-blue-500 bg-gray-50',
+            'accept': '.csv,.ofx,.qfx'
+        })
+    )
+    file_format = forms.ChoiceField(
+        choices=FORMAT_CHOICES,
+        initial='auto',
+        widget=forms.Select(attrs={
+            'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-blue-500 focus:ring-blue-500 bg-gray-50'
+        })
+    )
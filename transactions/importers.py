@@ -0,0 +1,255 @@
+"""
+Streaming import of bank exports (CSV and OFX) into Transaction rows.
+
+Files are parsed line by line as generators, so memory use does not depend on
+the file size. Each row is validated with the same field rules as
+TransactionForm (without building a form per row) and written with
+``bulk_create`` in batches inside a single database transaction. ``bulk_create``
+does not send post_save, so the rows are applied to the balance and rollups
+as grouped deltas, and the search index and dashboard cache are refreshed,
+once at the end instead of once per row.
+"""
+import csv
+import datetime
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction as db_transaction
+
+from finance_portfolio import fx
+
+from .forms import TransactionForm, validate_positive_amount
+from .ledger import count_created, refresh_after_bulk_write
+from .models import Transaction
+
+
+# Keep error reports bounded for huge files.
+MAX_REPORTED_ERRORS = 100
+
+CSV_COLUMNS = {
+    'date': ('date', 'posted', 'transaction date', 'posting date'),
+    'amount': ('amount', 'value', 'transaction amount'),
+    'transaction_type': ('transaction_type', 'type'),
+    'category': ('category',),
+    'currency': ('currency', 'ccy', 'currency code'),
+    'description': ('description', 'memo', 'name', 'payee', 'details'),
+}
+
+_CATEGORY_LOOKUP = {
+    **{code.lower(): code for code, _ in Transaction.CATEGORY_CHOICES},
+    **{label.lower(): code for code, label in Transaction.CATEGORY_CHOICES},
+}
+_TYPE_LOOKUP = {
+    **{code.lower(): code for code, _ in Transaction.TRANSACTION_TYPES},
+    'debit': 'EXPENSE',
+    'credit': 'INCOME',
+}
+_OFX_TAG_RE = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+
+
+class ImportFormatError(ValueError):
+    """Raised when a file cannot be parsed as the requested format"""
+
+
+@dataclass
+class ImportResult:
+    """Outcome of an import run"""
+    created: int = 0
+    skipped: int = 0
+    errors: list = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_second(self):
+        processed = self.created + self.skipped
+        return processed / self.elapsed if self.elapsed else float(processed)
+
+
+def default_batch_size():
+    return getattr(settings, 'TRANSACTION_IMPORT_BATCH_SIZE', 1000)
+
+
+def detect_format(filename):
+    """Guess the file format from its extension"""
+    name = (filename or '').lower()
+    if name.endswith(('.ofx', '.qfx')):
+        return 'ofx'
+    return 'csv'
+
+
+def parse_amount(raw):
+    """Parse a signed amount such as '-1,234.50', '$12' or '(12.00)'"""
+    text = (raw or '').strip().replace(',', '').replace('$', '').replace(' ', '')
+    negative = text.startswith('(') and text.endswith(')')
+    if negative:
+        text = text[1:-1]
+    try:
+        amount = Decimal(text)
+    except InvalidOperation:
+        raise ValidationError(f"Invalid amount: {raw!r}")
+    # Decimal also parses 'NaN', 'sNaN' and 'Infinity'
+    if not amount.is_finite():
+        raise ValidationError(f"Invalid amount: {raw!r}")
+    return -amount if negative else amount
+
+
+def parse_csv(lines):
+    """Yield ``(line_number, row)`` dicts from a CSV export with a header row"""
+    reader = csv.reader(lines)
+    try:
+        header = [column.strip().lower() for column in next(reader)]
+    except StopIteration:
+        return
+
+    positions = {}
+    for name, aliases in CSV_COLUMNS.items():
+        for alias in aliases:
+            if alias in header:
+                positions[name] = header.index(alias)
+                break
+    missing = {'date', 'amount'} - set(positions)
+    if missing:
+        raise ImportFormatError(f"CSV is missing required column(s): {', '.join(sorted(missing))}")
+
+    for values in reader:
+        if not any(value.strip() for value in values):
+            continue
+        row = {
+            name: values[index].strip() if index < len(values) else ''
+            for name, index in positions.items()
+        }
+        yield reader.line_num, row
+
+
+def parse_ofx(lines):
+    """Yield ``(line_number, row)`` dicts from the STMTTRN blocks of an OFX file"""
+    current = None
+    start = 0
+    # The statement's CURDEF precedes its transactions
+    currency = ''
+    for line_number, line in enumerate(lines, start=1):
+        for closing, tag, value in _OFX_TAG_RE.findall(line):
+            tag = tag.upper()
+            if tag == 'STMTTRN':
+                if closing and current is not None:
+                    yield start, _ofx_row(current, currency)
+                    current = None
+                elif not closing:
+                    current, start = {}, line_number
+            elif tag == 'CURDEF' and not closing:
+                currency = value.strip()
+            elif current is not None and not closing and value.strip():
+                current[tag] = value.strip()
+
+
+def _ofx_row(block, currency=''):
+    posted = block.get('DTPOSTED', '')[:8]
+    date = f'{posted[:4]}-{posted[4:6]}-{posted[6:8]}' if len(posted) == 8 else posted
+    description = ' - '.join(part for part in (block.get('NAME'), block.get('MEMO')) if part)
+    return {
+        'date': date,
+        'amount': block.get('TRNAMT', ''),
+        'transaction_type': _TYPE_LOOKUP.get(block.get('TRNTYPE', '').lower(), ''),
+        'currency': currency,
+        'description': description,
+    }
+
+
+def _clean_date(date_field, raw):
+    # Bank exports are mostly ISO dates; skip the form's format probing for them.
+    try:
+        return datetime.date.fromisoformat(raw)
+    except (TypeError, ValueError):
+        return date_field.clean(raw)
+
+
+def clean_row(row, currency=None):
+    """Validate a parsed row with TransactionForm's field rules.
+
+    Returns the cleaned field values; raises ValidationError otherwise. A
+    signed amount decides the type when the row does not carry one, and
+    ``currency`` is used when it does not name a currency.
+    """
+    fields = TransactionForm.base_fields
+    amount = parse_amount(row.get('amount'))
+
+    transaction_type = _TYPE_LOOKUP.get((row.get('transaction_type') or '').strip().lower())
+    if not transaction_type:
+        transaction_type = 'EXPENSE' if amount < 0 else 'INCOME'
+
+    raw_category = (row.get('category') or '').strip()
+    category = _CATEGORY_LOOKUP.get(raw_category.lower(), raw_category) or 'OTHER'
+
+    cleaned = {
+        'transaction_type': fields['transaction_type'].clean(transaction_type),
+        'category': fields['category'].clean(category),
+        'amount': fields['amount'].clean(abs(amount)),
+        'currency': fields['currency'].clean(
+            (row.get('currency') or '').strip().upper() or currency or fx.default_currency()
+        ),
+        'description': fields['description'].clean(row.get('description') or ''),
+        'date': _clean_date(fields['date'], row.get('date')),
+    }
+    validate_positive_amount(cleaned['amount'])
+    return cleaned
+
+
+def import_transactions(user, rows, batch_size=None):
+    """Validate and bulk-insert parsed rows for ``user``.
+
+    ``rows`` is an iterable of ``(line_number, row)`` pairs as produced by
+    ``parse_csv``/``parse_ofx``. Invalid rows are skipped and reported; valid
+    rows are written in batches of ``batch_size`` within one transaction.
+    Rows without a currency are in the user's base currency.
+    """
+    batch_size = batch_size or default_batch_size()
+    currency = fx.base_currency(user.pk)
+    result = ImportResult()
+    created_ids = []
+    created_states = Counter()
+    batch = []
+    started = time.perf_counter()
+
+    def flush():
+        created = Transaction.objects.bulk_create(batch, batch_size=batch_size)
+        created_ids.extend(obj.pk for obj in created if obj.pk is not None)
+        count_created(created, created_states)
+        result.created += len(batch)
+        batch.clear()
+
+    with db_transaction.atomic():
+        for line_number, row in rows:
+            try:
+                cleaned = clean_row(row, currency)
+            except ValidationError as exc:
+                result.skipped += 1
+                if len(result.errors) < MAX_REPORTED_ERRORS:
+                    result.errors.append((line_number, '; '.join(exc.messages)))
+                continue
+            batch.append(Transaction(user=user, **cleaned))
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+
+        if result.created:
+            # Backends that cannot return ids from bulk_create re-index
+            # the user's rows instead.
+            refresh_after_bulk_write(
+                [user.pk], created_ids if len(created_ids) == result.created else None,
+                created=created_states,
+            )
+
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def import_file(user, lines, file_format='csv', batch_size=None):
+    """Parse ``lines`` (an iterable of text lines) and import them"""
+    parser = parse_ofx if file_format == 'ofx' else parse_csv
+    return import_transactions(user, parser(lines), batch_size=batch_size)
@@ -0,0 +1,307 @@
+"""
+Balance bookkeeping for UserProfile.total_balance.
+
+In the default ``incremental`` mode each transaction write applies a signed
+delta to the owner's balance with a single ``UPDATE ... SET total_balance =
+total_balance + delta`` statement, so the cost of a write no longer grows with
+the user's history. The ``recompute`` mode keeps the old behaviour of
+re-aggregating every transaction and is mostly useful for debugging drift.
+
+The balance is held in the user's base currency: deltas are converted with
+the cached rate of the transaction's month, and recomputation converts in
+SQL (see ``finance_portfolio.fx``).
+"""
+from collections import namedtuple
+from decimal import Decimal
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.db.models import F, Q, Sum
+
+from finance_portfolio import fx
+
+
+ZERO = Decimal('0.00')
+
+# Persisted values of the fields that feed balances and rollups, captured when
+# a Transaction is loaded so an edit can be applied as a delta.
+LedgerState = namedtuple('LedgerState', 'user_id transaction_type category currency amount date')
+
+
+def ledger_mode():
+    """Return the configured ledger mode ('incremental' or 'recompute')"""
+    return getattr(settings, 'LEDGER_MODE', 'incremental')
+
+
+def signed_amount(transaction_type, amount):
+    """Return the effect of a transaction on the balance"""
+    amount = abs(amount or ZERO)
+    return amount if transaction_type == 'INCOME' else -amount
+
+
+def base_value(state, currency=None):
+    """The effect of a ``LedgerState`` on its owner's balance, in ``currency``
+    (default: their base currency)"""
+    amount = fx.convert(
+        abs(state.amount or ZERO), state.currency, currency or fx.base_currency(state.user_id),
+        fx.period_start(state.date),
+    )
+    return signed_amount(state.transaction_type, amount)
+
+
+def apply_base_delta(user_id, delta_in, create=True):
+    """Add ``delta_in(currency)`` to a user's balance, ``currency`` being their base currency.
+
+    The base currency comes from the cache, which can be stale in this
+    process, so the UPDATE only matches while the profile still holds the
+    currency the delta was converted into. Otherwise the currency is re-read
+    from the profile and the delta converted again. A missing profile is
+    created from the full history unless ``create`` is false.
+    """
+    from .models import UserProfile
+
+    for refresh in (False, True):
+        currency = fx.base_currency(user_id, refresh=refresh)
+        delta = delta_in(currency)
+        if not delta:
+            return
+        if UserProfile.objects.filter(user_id=user_id, base_currency=currency).update(
+            total_balance=F('total_balance') + delta
+        ):
+            return
+    if create:
+        apply_balance_delta(user_id, delta)
+
+
+def apply_balance_delta(user_id, delta):
+    """Atomically add ``delta`` to a user's balance"""
+    from .models import UserProfile
+
+    if not delta:
+        return
+    updated = UserProfile.objects.filter(user_id=user_id).update(
+        total_balance=F('total_balance') + delta
+    )
+    if not updated:
+        # No profile yet: create it from the full history once, which
+        # already includes the transaction that triggered this call.
+        with db_transaction.atomic():
+            profile, created = UserProfile.objects.select_for_update().get_or_create(
+                user_id=user_id
+            )
+            if created:
+                profile.total_balance = calculate_balance(user_id)
+                profile.save(update_fields=['total_balance', 'updated_at'])
+            else:
+                UserProfile.objects.filter(pk=profile.pk).update(
+                    total_balance=F('total_balance') + delta
+                )
+
+
+def calculate_balance(user_id):
+    """Compute a user's balance from their full transaction history"""
+    totals = _converted(user_id, fx.base_currency(user_id, refresh=True)).aggregate(**_totals())
+    fx.check_converted(totals['unconverted'])
+    return _balance(totals['income'], totals['expenses'])
+
+
+def _converted(user_ids, currency):
+    # Transactions of ``user_ids`` with their amount converted into ``currency``
+    from .models import Transaction
+
+    if isinstance(user_ids, int):
+        user_ids = [user_ids]
+    return Transaction.objects.filter(user_id__in=user_ids).annotate(
+        fx_day=fx.month_start('date'),
+        converted=fx.to_currency('amount', currency, day='fx_day'),
+    )
+
+
+def _totals():
+    return {
+        'income': Sum('converted', filter=Q(transaction_type='INCOME')),
+        'expenses': Sum('converted', filter=Q(transaction_type='EXPENSE')),
+        'unconverted': fx.unconverted('converted'),
+    }
+
+
+def _balance(income, expenses):
+    # SQLite sums decimals as floating point; round back to the stored precision.
+    return ((income or ZERO) - (expenses or ZERO)).quantize(ZERO)
+
+
+def recalculate_balance(user_id):
+    """Overwrite a user's stored balance with the recomputed value"""
+    from .models import UserProfile
+
+    balance = calculate_balance(user_id)
+    profile, _ = UserProfile.objects.get_or_create(user_id=user_id)
+    profile.total_balance = balance
+    profile.save(update_fields=['total_balance', 'updated_at'])
+    return balance
+
+
+def record_save(instance, previous):
+    """Apply the balance change caused by saving ``instance``.
+
+    ``previous`` is the ``LedgerState`` the row held before this save, or
+    ``None`` for a new row.
+    """
+    if ledger_mode() == 'recompute':
+        recalculate_balance(instance.user_id)
+        if previous and previous.user_id != instance.user_id:
+            recalculate_balance(previous.user_id)
+        return
+
+    state = instance.ledger_state()
+    if previous is None:
+        apply_base_delta(instance.user_id, partial(base_value, state))
+    elif previous.user_id == instance.user_id:
+        apply_base_delta(
+            instance.user_id, lambda currency: base_value(state, currency) - base_value(previous, currency)
+        )
+    else:
+        apply_base_delta(previous.user_id, lambda currency: -base_value(previous, currency))
+        apply_base_delta(instance.user_id, partial(base_value, state))
+
+
+def record_delete(state):
+    """Apply the balance change caused by deleting a transaction"""
+    from .models import UserProfile
+
+    if ledger_mode() == 'recompute':
+        if UserProfile.objects.filter(user_id=state.user_id).exists():
+            recalculate_balance(state.user_id)
+        return
+
+    apply_base_delta(state.user_id, lambda currency: -base_value(state, currency), create=False)
+
+
+def reconcile_balances(user_ids=None, batch_size=1000, fix=True):
+    """Recompute balances in bulk and report profiles that have drifted.
+
+    Balances are computed with one grouped aggregate per batch of profiles
+    (per base currency present in the batch), converted in SQL.
+    Returns a list of ``(user_id, stored, actual)`` tuples for every profile
+    whose stored balance did not match; when ``fix`` is true those profiles
+    are corrected with ``bulk_update``.
+    """
+    from .models import UserProfile
+
+    profiles = UserProfile.objects.order_by('pk')
+    if user_ids is not None:
+        profiles = profiles.filter(user_id__in=list(user_ids))
+
+    drift = []
+    last_pk = 0
+    while True:
+        batch = list(
+            profiles.filter(pk__gt=last_pk).only('pk', 'user_id', 'total_balance', 'base_currency')[:batch_size]
+        )
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+
+        by_currency = {}
+        for profile in batch:
+            by_currency.setdefault(profile.base_currency, []).append(profile.user_id)
+        totals = {}
+        for currency, batch_user_ids in by_currency.items():
+            for row in _converted(batch_user_ids, currency).values('user_id').annotate(**_totals()).order_by():
+                fx.check_converted(row['unconverted'])
+                totals[row['user_id']] = _balance(row['income'], row['expenses'])
+
+        changed = []
+        for profile in batch:
+            actual = totals.get(profile.user_id, ZERO)
+            if profile.total_balance != actual:
+                drift.append((profile.user_id, profile.total_balance, actual))
+                profile.total_balance = actual
+                changed.append(profile)
+
+        if fix and changed:
+            UserProfile.objects.bulk_update(changed, ['total_balance'])
+
+    return drift
+
+
+def count_created(transactions, counts):
+    """Add newly inserted ``transactions`` to ``counts``.
+
+    ``counts`` is a ``Counter`` of ``LedgerState`` tuples dated to the first
+    of their month, which is all a row's balance and rollup deltas depend on;
+    rows generated from one rule collapse into a single entry.
+    """
+    counts.update(
+        transaction.ledger_state()._replace(date=fx.period_start(transaction.date))
+        for transaction in transactions
+    )
+
+
+def record_bulk_create(counts):
+    """Apply the balance change of the rows counted by ``count_created``.
+
+    Each distinct state is converted once (with the per-row rounding of
+    ``base_value``) and every user gets a single delta, so the cost depends
+    on the rows written, not on the users' histories.
+    """
+    by_user = {}
+    for state, count in counts.items():
+        by_user.setdefault(state.user_id, []).append((state, count))
+    for user_id, states in by_user.items():
+        if ledger_mode() == 'recompute':
+            recalculate_balance(user_id)
+        else:
+            apply_base_delta(
+                user_id,
+                lambda currency, states=states: sum(
+                    (base_value(state, currency) * count for state, count in states), ZERO
+                ),
+            )
+
+
+def refresh_after_bulk_write(user_ids, transaction_ids=None, created=None):
+    """Bring derived state up to date after writes that bypassed the signals.
+
+    ``bulk_create``/``bulk_update`` do not send post_save, so callers that use
+    them call this once at the end: balances are reconciled with one grouped
+    query, the affected users' monthly rollups are rebuilt, the written rows
+    are (re-)indexed for search, budget alerts are checked and the users'
+    dashboard caches invalidated. Callers that only inserted rows pass
+    ``created`` (see ``count_created``) and balances and rollups are updated
+    by delta instead of being recomputed from the full history.
+    """
+    from finance_portfolio import search
+
+    from . import alerts, cache as dashboard_cache, rollups
+    from .models import Transaction, UserProfile
+
+    user_ids = sorted(set(user_ids))
+    if not user_ids:
+        return
+
+    if created is not None:
+        # A missing profile is created from the full history by the delta
+        record_bulk_create(created)
+        rollups.record_bulk_create(created)
+    else:
+        missing = set(user_ids) - set(
+            UserProfile.objects.filter(user_id__in=user_ids).values_list('user_id', flat=True)
+        )
+        if missing:
+            UserProfile.objects.bulk_create(
+                [UserProfile(user_id=user_id) for user_id in missing], ignore_conflicts=True
+            )
+        reconcile_balances(user_ids)
+        rollups.rebuild_monthly_summaries(user_ids)
+
+    if transaction_ids is None:
+        transaction_ids = Transaction.objects.filter(
+            user_id__in=user_ids
+        ).values_list('pk', flat=True)
+    search.rebuild_index(Transaction, transaction_ids)
+    alerts.check_users(user_ids)
+
+    for user_id in user_ids:
+        dashboard_cache.invalidate_dashboard(user_id)
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from transactions.rollups import rebuild_monthly_summaries
+
+
+class Command(BaseCommand):
+    help = "Rebuild the MonthlySummary rollup table from the Transaction history in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, action='append', dest='user_ids',
+            help='Only rebuild the given user id (may be repeated)',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Number of users to rebuild per database transaction (default: 500)',
+        )
+
+    def handle(self, *args, **options):
+        written = rebuild_monthly_summaries(
+            user_ids=options['user_ids'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} monthly summary row(s).'))
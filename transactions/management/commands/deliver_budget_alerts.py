@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from transactions.alerts import get_alert_backend, deliver_alerts
+
+
+class Command(BaseCommand):
+    help = "Send queued budget alerts through the configured backend (safe to run from cron)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--backend', default=None,
+            help="Backend name or dotted path (default: BUDGET_ALERT_BACKEND)",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Alerts handed to the backend at a time (default: 500)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            backend = get_alert_backend(options['backend'])
+        except ImportError as exc:
+            raise CommandError(f"Unknown alert backend {options['backend']!r}: {exc}")
+
+        delivered, failed = deliver_alerts(backend, batch_size=options['batch_size'])
+
+        if failed:
+            self.stdout.write(self.style.WARNING(
+                f'Delivered {delivered} alert(s); {failed} failed and stay queued.'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Delivered {delivered} alert(s).'))
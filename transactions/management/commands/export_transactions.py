@@ -0,0 +1,87 @@
+import os
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from transactions.exporters import EXPORT_FORMATS, export_filename, stream_export
+from transactions.filters import filter_transactions
+from transactions.models import Transaction
+
+
+class Command(BaseCommand):
+    help = "Stream users' transactions to CSV, NDJSON or columnar JSON files"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', action='append', dest='users', default=[],
+            help='Username or id to export (repeatable; default: every user)',
+        )
+        parser.add_argument(
+            '--format', choices=list(EXPORT_FORMATS), default='csv', dest='export_format',
+        )
+        parser.add_argument(
+            '--output', default=None,
+            help="Output file for a single user ('-' for stdout) or directory for per-user dumps",
+        )
+        parser.add_argument('--type', choices=['EXPENSE', 'INCOME'], default=None)
+        parser.add_argument('--category', default=None)
+        parser.add_argument('--date-from', default=None, help='YYYY-MM-DD, inclusive')
+        parser.add_argument('--date-to', default=None, help='YYYY-MM-DD, inclusive')
+        parser.add_argument(
+            '--chunk-size', type=int, default=None,
+            help='Rows fetched per round trip (default: EXPORT_CHUNK_SIZE)',
+        )
+
+    def handle(self, *args, **options):
+        users = self.get_users(options['users'])
+        export_format = options['export_format']
+        params = {
+            'type': options['type'],
+            'category': options['category'],
+            'date_from': options['date_from'],
+            'date_to': options['date_to'],
+        }
+        output = options['output']
+        single = len(options['users']) == 1
+
+        if single and (output is None or output == '-'):
+            self.write(users[0], sys.stdout, export_format, params, options['chunk_size'])
+            return
+
+        if single and not os.path.isdir(output):
+            targets = [(users[0], output)]
+        else:
+            directory = output or '.'
+            os.makedirs(directory, exist_ok=True)
+            targets = [
+                (user, os.path.join(directory, export_filename(user.username, export_format)))
+                for user in users
+            ]
+
+        for user, path in targets:
+            try:
+                with open(path, 'w', encoding='utf-8', newline='') as stream:
+                    self.write(user, stream, export_format, params, options['chunk_size'])
+            except OSError as exc:
+                raise CommandError(str(exc))
+            self.stdout.write(f'{user.username}: {path}')
+        self.stdout.write(self.style.SUCCESS(f'Exported {len(targets)} user(s).'))
+
+    def get_users(self, lookups):
+        if not lookups:
+            return list(User.objects.order_by('pk').only('pk', 'username'))
+        users = []
+        for lookup in lookups:
+            try:
+                users.append(
+                    User.objects.get(pk=int(lookup)) if lookup.isdigit() else User.objects.get(username=lookup)
+                )
+            except User.DoesNotExist:
+                raise CommandError(f'User {lookup!r} does not exist.')
+        return users
+
+    def write(self, user, stream, export_format, params, chunk_size):
+        queryset = filter_transactions(Transaction.objects.filter(user=user), params)
+        for chunk in stream_export(queryset, export_format, chunk_size=chunk_size):
+            stream.write(chunk)
@@ -0,0 +1,49 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from transactions.importers import ImportFormatError, detect_format, import_file
+
+
+class Command(BaseCommand):
+    help = "Stream a CSV or OFX bank export into a user's transactions"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path to the CSV/OFX file')
+        parser.add_argument('--user', required=True, help='Username or id of the owner')
+        parser.add_argument(
+            '--format', choices=['auto', 'csv', 'ofx'], default='auto', dest='file_format',
+            help='File format (default: detect from the extension)',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help='Rows per bulk_create batch (default: TRANSACTION_IMPORT_BATCH_SIZE)',
+        )
+
+    def handle(self, *args, **options):
+        lookup = options['user']
+        try:
+            user = User.objects.get(pk=int(lookup)) if lookup.isdigit() else User.objects.get(username=lookup)
+        except User.DoesNotExist:
+            raise CommandError(f'User {lookup!r} does not exist.')
+
+        file_format = options['file_format']
+        if file_format == 'auto':
+            file_format = detect_format(options['path'])
+
+        try:
+            with open(options['path'], encoding='utf-8-sig', errors='replace', newline='') as lines:
+                result = import_file(user, lines, file_format, batch_size=options['batch_size'])
+        except OSError as exc:
+            raise CommandError(str(exc))
+        except ImportFormatError as exc:
+            raise CommandError(str(exc))
+
+        for line, error in result.errors:
+            self.stderr.write(f'line {line}: {error}')
+        if result.skipped > len(result.errors):
+            self.stderr.write(f'... {result.skipped - len(result.errors)} more invalid row(s)')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {result.created} row(s), skipped {result.skipped}, '
+            f'in {result.elapsed:.2f}s ({result.rows_per_second:,.0f} rows/s).'
+        ))
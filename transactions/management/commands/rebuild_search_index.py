@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from finance_portfolio.search import rebuild_index
+from transactions.models import Transaction
+from watchlist.models import Watchlist
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index for transactions and watchlist items"
+
+    def handle(self, *args, **options):
+        for model in (Transaction, Watchlist):
+            rebuild_index(model)
+            self.stdout.write(f'Re-indexed {model._meta.verbose_name_plural}.')
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt.'))
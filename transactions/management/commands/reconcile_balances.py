@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from transactions.ledger import reconcile_balances
+
+
+class Command(BaseCommand):
+    help = "Recompute every UserProfile.total_balance in bulk and report any drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, action='append', dest='user_ids',
+            help='Only reconcile the given user id (may be repeated)',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of profiles to reconcile per grouped query (default: 1000)',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report drift without correcting the stored balances',
+        )
+
+    def handle(self, *args, **options):
+        drift = reconcile_balances(
+            user_ids=options['user_ids'],
+            batch_size=options['batch_size'],
+            fix=not options['dry_run'],
+        )
+
+        for user_id, stored, actual in drift:
+            self.stdout.write(
+                f"user {user_id}: stored {stored} != actual {actual} (drift {stored - actual})"
+            )
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('All balances are consistent.'))
+        elif options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'{len(drift)} balance(s) drifted (not fixed).'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Fixed {len(drift)} drifted balance(s).'))
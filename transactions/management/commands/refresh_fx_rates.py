@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from finance_portfolio.fx import FxProviderError, get_fx_provider, refresh_rates
+
+
+class Command(BaseCommand):
+    help = 'Load exchange rates from the configured provider and re-convert affected balances'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--provider', default=None,
+            help='Provider name or dotted path (default: FX_PROVIDER)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            provider = get_fx_provider(options['provider'])
+        except ImportError as exc:
+            raise CommandError(str(exc))
+
+        try:
+            result = refresh_rates(provider)
+        except FxProviderError as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Stored {result.rates} rate(s) for {result.days} day(s) from {provider.name}, '
+            f'reconciled {result.users_reconciled} user(s), in {result.elapsed * 1000:.0f}ms.'
+        ))
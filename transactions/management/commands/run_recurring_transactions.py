@@ -0,0 +1,35 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from transactions.recurring import run_recurring
+
+
+class Command(BaseCommand):
+    help = "Create the transactions of every due recurring rule (safe to run from cron)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date', default=None,
+            help='Materialize occurrences up to this ISO date (default: today)',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help='Rows per bulk_create batch (default: RECURRING_BATCH_SIZE)',
+        )
+
+    def handle(self, *args, **options):
+        today = None
+        if options['date']:
+            try:
+                today = datetime.date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError(f"Invalid date {options['date']!r}; expected YYYY-MM-DD.")
+
+        result = run_recurring(today=today, batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {result.created} transaction(s) from {result.rules} due rule(s) '
+            f'for {result.users} user(s) in {result.elapsed:.2f}s '
+            f'({result.rows_per_second:,.0f} rows/s); {result.finished} rule(s) finished.'
+        ))
@@ -0,0 +1,60 @@
+# Generated by Django 5.0.1 on 2026-10-18 15:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0005_recurringtransaction'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryBudget',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(choices=[('FOOD', 'Food & Dining'), ('TRANSPORT', 'Transportation'), ('SHOPPING', 'Shopping'), ('ENTERTAINMENT', 'Entertainment'), ('BILLS', 'Bills & Utilities'), ('HEALTH', 'Healthcare'), ('EDUCATION', 'Education'), ('INVESTMENT', 'Investment'), ('SALARY', 'Salary'), ('OTHER', 'Other')], max_length=20)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='category_budgets', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Category Budget',
+                'verbose_name_plural': 'Category Budgets',
+                'ordering': ['category'],
+            },
+        ),
+        migrations.CreateModel(
+            name='BudgetAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(blank=True, choices=[('FOOD', 'Food & Dining'), ('TRANSPORT', 'Transportation'), ('SHOPPING', 'Shopping'), ('ENTERTAINMENT', 'Entertainment'), ('BILLS', 'Bills & Utilities'), ('HEALTH', 'Healthcare'), ('EDUCATION', 'Education'), ('INVESTMENT', 'Investment'), ('SALARY', 'Salary'), ('OTHER', 'Other')], max_length=20)),
+                ('year', models.PositiveSmallIntegerField()),
+                ('month', models.PositiveSmallIntegerField()),
+                ('level', models.CharField(choices=[('WARNING', 'Warning'), ('DANGER', 'Danger'), ('EXCEEDED', 'Exceeded')], max_length=10)),
+                ('spent', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('budget', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('delivered_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='budget_alerts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Budget Alert',
+                'verbose_name_plural': 'Budget Alerts',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(condition=models.Q(('delivered_at__isnull', True)), fields=['created_at'], name='budget_alert_pending_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='budgetalert',
+            constraint=models.UniqueConstraint(fields=('user', 'category', 'year', 'month', 'level'), name='unique_budget_alert'),
+        ),
+        migrations.AddConstraint(
+            model_name='categorybudget',
+            constraint=models.UniqueConstraint(fields=('user', 'category'), name='unique_category_budget'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.0.1 on 2026-10-18 19:00
+
+import json
+from decimal import Decimal
+from pathlib import Path
+
+from django.db import migrations
+
+
+FIXTURE = Path(__file__).resolve().parent.parent / 'data' / 'fx_rates.json'
+
+
+def seed_rates(apps, schema_editor):
+    """Load the bundled USD-based rates so every currency converts on a fresh install"""
+    ExchangeRate = apps.get_model('transactions', 'ExchangeRate')
+    with open(FIXTURE, encoding='utf-8') as fixture:
+        data = json.load(fixture)
+    ExchangeRate.objects.bulk_create(
+        [
+            ExchangeRate(currency=currency, date=day, rate=Decimal(rate))
+            for day, quotes in data['rates'].items()
+            for currency, rate in quotes.items()
+        ],
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0008_transaction_date_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_rates, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,11 @@
-from django.db import models
+from django.db import models, router, transaction as db_transaction
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_save, post_delete, pre_delete
 from django.dispatch import receiver
-from decimal import Decimal
+
+from finance_portfolio import fx, search
+
+from . import alerts, cache as dashboard_cache, ledger, rollups
 
 
 class UserProfile(models.Model):
@@ -10,6 +13,8 @@ class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     total_balance = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
     monthly_budget = models.DecimalField(max_digits=12, decimal_places=2, default=5000.00)
+    # Currency of the balance, budgets and every converted total
+    base_currency = models.CharField(max_length=3, choices=fx.CURRENCY_CHOICES, default=fx.default_currency)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -19,6 +24,13 @@ class UserProfile(models.Model):
     class Meta:
         verbose_name = "User Profile"
         verbose_name_plural = "User Profiles"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the stored base currency so changing it can re-convert the balance"""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_base_currency = instance.__dict__.get('base_currency')
+        return instance
 
 
 class Transaction(models.Model):
@@ -45,6 +57,7 @@ class Transaction(models.Model):
     transaction_type = models.CharField(max_length=10, choices=TRANSACTION_TYPES, default='EXPENSE')
     category = models.CharField(max_length=20, choices=CATEGORY_CHOICES, default='OTHER')
     amount = models.DecimalField(max_digits=10, decimal_places=2)
+    currency = models.CharField(max_length=3, choices=fx.CURRENCY_CHOICES, default=fx.default_currency)
     description = models.TextField(blank=True)
     date = models.DateField()
     created_at = models.DateTimeField(auto_now_add=True)
@@ -55,60 +68,291 @@ class Transaction(models.Model):
         verbose_name = "Transaction"
         verbose_name_plural = "Transactions"
         indexes = [
-            models.Index(fields=['-date', 'user']),
+            models.Index(fields=['user', '-date', '-created_at', '-id'], name='transaction_user_date_idx'),
+            # The admin changelist's unfiltered ordering
+            models.Index(fields=['-date', '-created_at', '-id'], name='transaction_date_idx'),
         ]
     
     def __str__(self):
         return f"{self.get_transaction_type_display()} - {self.amount} - {self.date}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the persisted ledger fields so edits can apply a delta"""
+        instance = super().from_db(db, field_names, values)
+        instance._remember_ledger_state()
+        return instance
+    
+    def ledger_state(self):
+        """Return the fields that feed balances and rollups as a LedgerState"""
+        return ledger.LedgerState(
+            user_id=self.user_id,
+            transaction_type=self.transaction_type,
+            category=self.category,
+            currency=self.currency,
+            amount=self.amount,
+            date=self._meta.get_field('date').to_python(self.date),
+        )
+    
+    def _remember_ledger_state(self):
+        deferred = self.get_deferred_fields()
+        if deferred.intersection(ledger.LedgerState._fields):
+            self._ledger_state = None
+        else:
+            self._ledger_state = self.ledger_state()
+    
+    def _locked_ledger_state(self, using=None):
+        """The ledger fields of the stored row, locked until the transaction ends.
+
+        Returns None if the row no longer exists.
+        """
+        row = (
+            Transaction.objects.using(using or router.db_for_write(Transaction, instance=self))
+            .select_for_update()
+            .filter(pk=self.pk)
+            .values_list(*ledger.LedgerState._fields)
+            .first()
+        )
+        return ledger.LedgerState(*row) if row else None
+    
     def save(self, *args, **kwargs):
         """Override save to ensure amount is positive"""
         self.amount = abs(self.amount)
+        using = kwargs.get('using') or router.db_for_write(Transaction, instance=self)
+        # The row and the balance, rollup and index updates of the post_save
+        # handlers commit together or not at all
+        with db_transaction.atomic(using=using):
+            if not self._state.adding:
+                # Take the delta against the row as stored now rather than as
+                # loaded, which a concurrent edit may have changed since; the
+                # lock holds until the handlers have applied it.
+                self._ledger_state = self._locked_ledger_state(using)
+            super().save(*args, **kwargs)
+
+
+class MonthlySummary(models.Model):
+    """Per-user monthly totals by transaction type and category"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='monthly_summaries')
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    transaction_type = models.CharField(max_length=10, choices=Transaction.TRANSACTION_TYPES)
+    category = models.CharField(max_length=20, choices=Transaction.CATEGORY_CHOICES)
+    # Totals stay in the transactions' currency; reads convert them
+    currency = models.CharField(max_length=3, choices=fx.CURRENCY_CHOICES)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.IntegerField(default=0)
+    
+    class Meta:
+        ordering = ['-year', '-month']
+        verbose_name = "Monthly Summary"
+        verbose_name_plural = "Monthly Summaries"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'year', 'month', 'transaction_type', 'category', 'currency'],
+                name='unique_monthly_summary_bucket',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id} {self.year}-{self.month:02d} {self.transaction_type} {self.category}: {self.total} {self.currency}"
+
+
+class RecurringTransaction(models.Model):
+    """A rule that materializes a Transaction on a schedule"""
+    FREQUENCY_CHOICES = [
+        ('DAILY', 'Daily'),
+        ('WEEKLY', 'Weekly'),
+        ('MONTHLY', 'Monthly'),
+        ('YEARLY', 'Yearly'),
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='recurring_transactions')
+    transaction_type = models.CharField(max_length=10, choices=Transaction.TRANSACTION_TYPES, default='EXPENSE')
+    category = models.CharField(max_length=20, choices=Transaction.CATEGORY_CHOICES, default='OTHER')
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    currency = models.CharField(max_length=3, choices=fx.CURRENCY_CHOICES, default=fx.default_currency)
+    description = models.TextField(blank=True)
+    frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES, default='MONTHLY')
+    interval = models.PositiveSmallIntegerField(default=1, help_text="Repeat every N periods")
+    start_date = models.DateField()
+    end_date = models.DateField(null=True, blank=True)
+    next_run = models.DateField(blank=True, help_text="Date of the next transaction to create (defaults to the start date)")
+    active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['next_run', 'id']
+        verbose_name = "Recurring Transaction"
+        verbose_name_plural = "Recurring Transactions"
+        indexes = [
+            models.Index(
+                fields=['next_run'], condition=models.Q(active=True), name='recurring_due_idx',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_frequency_display()} {self.get_transaction_type_display()} - {self.amount}"
+    
+    def save(self, *args, **kwargs):
+        """Keep the amount positive and start the schedule at start_date"""
+        self.amount = abs(self.amount)
+        if self.next_run is None:
+            self.next_run = self.start_date
         super().save(*args, **kwargs)
 
 
-# Django Signals to update user balance
-@receiver(post_save, sender=Transaction)
-def update_balance_on_transaction_save(sender, instance, created, **kwargs):
-    """Update user's total balance when a transaction is created or updated"""
-    profile, _ = UserProfile.objects.get_or_create(user=instance.user)
+class ExchangeRate(models.Model):
+    """Units of a currency per one US dollar on a day (see finance_portfolio.fx)"""
+    currency = models.CharField(max_length=3, choices=fx.CURRENCY_CHOICES)
+    date = models.DateField()
+    rate = models.DecimalField(max_digits=18, decimal_places=8)
+    
+    class Meta:
+        ordering = ['currency', '-date']
+        verbose_name = "Exchange Rate"
+        verbose_name_plural = "Exchange Rates"
+        constraints = [
+            # Also the index behind the as-of lookups
+            models.UniqueConstraint(fields=['currency', 'date'], name='unique_exchange_rate_day'),
+        ]
+    
+    def __str__(self):
+        return f"{self.currency} {self.date}: {self.rate}"
+
+
+class CategoryBudget(models.Model):
+    """Monthly spending limit for one category (the overall limit is UserProfile.monthly_budget)"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='category_budgets')
+    category = models.CharField(max_length=20, choices=Transaction.CATEGORY_CHOICES)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['category']
+        verbose_name = "Category Budget"
+        verbose_name_plural = "Category Budgets"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'category'], name='unique_category_budget'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id} {self.get_category_display()}: {self.amount}"
+
+
+class BudgetAlert(models.Model):
+    """A budget threshold crossed in a month, queued for delivery"""
+    LEVEL_CHOICES = [
+        ('WARNING', 'Warning'),
+        ('DANGER', 'Danger'),
+        ('EXCEEDED', 'Exceeded'),
+    ]
     
-    # Recalculate total balance from all transactions
-    transactions = Transaction.objects.filter(user=instance.user)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='budget_alerts')
+    # Blank for the overall monthly budget
+    category = models.CharField(max_length=20, choices=Transaction.CATEGORY_CHOICES, blank=True)
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    level = models.CharField(max_length=10, choices=LEVEL_CHOICES)
+    spent = models.DecimalField(max_digits=14, decimal_places=2)
+    budget = models.DecimalField(max_digits=12, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
     
-    income = transactions.filter(transaction_type='INCOME').aggregate(
-        total=models.Sum('amount')
-    )['total'] or Decimal('0.00')
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Budget Alert"
+        verbose_name_plural = "Budget Alerts"
+        constraints = [
+            # One alert per threshold, scope and month
+            models.UniqueConstraint(
+                fields=['user', 'category', 'year', 'month', 'level'], name='unique_budget_alert',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['created_at'], condition=models.Q(delivered_at__isnull=True),
+                name='budget_alert_pending_idx',
+            ),
+        ]
     
-    expenses = transactions.filter(transaction_type='EXPENSE').aggregate(
-        total=models.Sum('amount')
-    )['total'] or Decimal('0.00')
+    def __str__(self):
+        scope = self.get_category_display() if self.category else 'Monthly budget'
+        return f"{self.user_id} {scope} {self.year}-{self.month:02d}: {self.get_level_display()}"
     
-    profile.total_balance = income - expenses
-    profile.save()
+    @property
+    def percentage(self):
+        return self.spent / self.budget * 100 if self.budget else None
+
+
+# Django Signals to update user balance and monthly rollups
+@receiver(post_save, sender=Transaction)
+def update_balance_on_transaction_save(sender, instance, created, **kwargs):
+    """Apply the balance delta when a transaction is created or updated"""
+    previous = None if created else getattr(instance, '_ledger_state', None)
+    if not created and previous is None:
+        # Instance was not loaded from the database (or was loaded with
+        # deferred fields), so the delta cannot be derived; fall back to
+        # recomputing the balance and rollups for this user.
+        ledger.recalculate_balance(instance.user_id)
+        rollups.rebuild_monthly_summaries([instance.user_id])
+    else:
+        ledger.record_save(instance, previous)
+        rollups.record_save(instance.ledger_state(), previous)
+    # Reads the month totals the rollup now holds
+    alerts.record_save(instance.ledger_state(), previous)
+    dashboard_cache.invalidate_dashboard(instance.user_id)
+    if previous is not None and previous.user_id != instance.user_id:
+        dashboard_cache.invalidate_dashboard(previous.user_id)
+    search.index_instance(instance)
+    instance._remember_ledger_state()
+
+
+@receiver(pre_delete, sender=Transaction)
+def lock_transaction_for_delete(sender, instance, using, **kwargs):
+    """Re-read the row being deleted under a lock (deletes run in a transaction)"""
+    instance._ledger_state = instance._locked_ledger_state(using)
 
 
 @receiver(post_delete, sender=Transaction)
 def update_balance_on_transaction_delete(sender, instance, **kwargs):
-    """Update user's total balance when a transaction is deleted"""
-    try:
-        profile = UserProfile.objects.get(user=instance.user)
-        
-        # Recalculate total balance from remaining transactions
-        transactions = Transaction.objects.filter(user=instance.user)
-        
-        income = transactions.filter(transaction_type='INCOME').aggregate(
-            total=models.Sum('amount')
-        )['total'] or Decimal('0.00')
-        
-        expenses = transactions.filter(transaction_type='EXPENSE').aggregate(
-            total=models.Sum('amount')
-        )['total'] or Decimal('0.00')
-        
-        profile.total_balance = income - expenses
-        profile.save()
-    except UserProfile.DoesNotExist:
-        pass
+    """Reverse the transaction's effect on the balance when it is deleted"""
+    state = instance._ledger_state
+    if state is None:
+        # A concurrent delete removed the row first and already reversed it
+        return
+    ledger.record_delete(state)
+    rollups.record_delete(state)
+    dashboard_cache.invalidate_dashboard(state.user_id)
+    search.remove_instance(instance)
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_save, sender=CategoryBudget)
+@receiver(post_delete, sender=CategoryBudget)
+def invalidate_budget_limits(sender, instance, **kwargs):
+    """Drop the cached budget limits used by the alert checks"""
+    update_fields = kwargs.get('update_fields')
+    if sender is UserProfile and update_fields and 'monthly_budget' not in update_fields:
+        return
+    alerts.invalidate_limits(instance.user_id)
+
+
+@receiver(post_save, sender=UserProfile)
+def convert_balance_on_currency_change(sender, instance, created, **kwargs):
+    """Re-express the balance and dashboard in a newly chosen base currency"""
+    update_fields = kwargs.get('update_fields')
+    if update_fields and 'base_currency' not in update_fields:
+        return
+    changed = instance.base_currency != getattr(instance, '_loaded_base_currency', None)
+    instance._loaded_base_currency = instance.base_currency
+    if not (created or changed):
+        return
+    fx.invalidate_base_currency(instance.user_id)
+    if created:
+        return
+    ledger.recalculate_balance(instance.user_id)
+    dashboard_cache.invalidate_dashboard(instance.user_id)
 
 
 @receiver(post_save, sender=User)
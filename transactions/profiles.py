@@ -0,0 +1,63 @@
+"""
+Per-request access to the signed-in user's UserProfile.
+
+``ProfileMiddleware`` (after Django's AuthenticationMiddleware) gives every
+request a lazy ``request.profile``, loaded on first use and memoized for the
+rest of the request, and ``await request.aprofile()`` for async views.
+``ProfileBackend`` loads the profile in the same query as the session's user
+(``select_related('profile')``), so with it the profile costs no query at
+all. Anonymous users have no profile (``request.profile`` is falsy).
+"""
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.functional import SimpleLazyObject
+
+from .models import UserProfile
+
+
+class ProfileBackend(ModelBackend):
+    """ModelBackend that loads the user together with their profile"""
+
+    def get_user(self, user_id):
+        UserModel = get_user_model()
+        try:
+            user = UserModel._default_manager.select_related('profile').get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
+
+
+def load_profile(user):
+    """The profile of ``user``, created if missing; None for anonymous users"""
+    if not user.is_authenticated:
+        return None
+    try:
+        return user.profile
+    except UserProfile.DoesNotExist:
+        profile, _ = UserProfile.objects.get_or_create(user=user)
+        return profile
+
+
+def get_profile(request):
+    if not hasattr(request, '_cached_profile'):
+        request._cached_profile = load_profile(request.user)
+    return request._cached_profile
+
+
+async def aprofile(request):
+    if not hasattr(request, '_cached_profile'):
+        user = await request.auser()
+        request._cached_profile = await sync_to_async(load_profile)(user)
+    return request._cached_profile
+
+
+class ProfileMiddleware(MiddlewareMixin):
+    """Attach a lazy, memoized ``request.profile`` (and ``request.aprofile``)"""
+
+    def process_request(self, request):
+        request.profile = SimpleLazyObject(lambda: get_profile(request))
+        request.aprofile = partial(aprofile, request)
@@ -0,0 +1,126 @@
+"""
+Maintenance and queries for the MonthlySummary rollup table.
+
+MonthlySummary keeps one row per (user, year, month, transaction_type,
+category, currency) holding the running total and row count, in that
+currency; readers convert the totals (see ``finance_portfolio.fx``). The Transaction signals
+apply deltas to it on every write, so reports can read O(categories) rows
+instead of scanning every transaction (see ``transactions.summary``).
+"""
+import datetime
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+
+ZERO = Decimal('0.00')
+
+
+def apply_delta(user_id, date, transaction_type, category, currency, amount, count):
+    """Add ``amount``/``count`` to the rollup bucket for a transaction"""
+    from .models import MonthlySummary
+
+    bucket = {
+        'user_id': user_id,
+        'year': date.year,
+        'month': date.month,
+        'transaction_type': transaction_type,
+        'category': category,
+        'currency': currency,
+    }
+    updated = MonthlySummary.objects.filter(**bucket).update(
+        total=F('total') + amount,
+        count=F('count') + count,
+    )
+    if updated or count <= 0:
+        # Never create a bucket just to subtract from it: a missing bucket
+        # means the rollup was never built or its user is being deleted.
+        return
+    try:
+        with db_transaction.atomic():
+            MonthlySummary.objects.create(total=amount, count=count, **bucket)
+    except IntegrityError:
+        # Another writer created the bucket between our UPDATE and INSERT.
+        MonthlySummary.objects.filter(**bucket).update(
+            total=F('total') + amount,
+            count=F('count') + count,
+        )
+
+
+def _bucket_key(state):
+    return (state.user_id, state.date.year, state.date.month,
+            state.transaction_type, state.category, state.currency)
+
+
+def record_save(state, previous):
+    """Move a saved transaction into its rollup bucket.
+
+    ``state`` and ``previous`` are ``LedgerState`` tuples for the row after
+    and before the save (``previous`` is ``None`` for a new row).
+    """
+    if previous is not None:
+        if _bucket_key(previous) == _bucket_key(state):
+            delta = abs(state.amount) - abs(previous.amount)
+            if delta:
+                apply_delta(state.user_id, state.date, state.transaction_type,
+                            state.category, state.currency, delta, 0)
+            return
+        record_delete(previous)
+    apply_delta(state.user_id, state.date, state.transaction_type,
+                state.category, state.currency, abs(state.amount), 1)
+
+
+def record_delete(state):
+    """Remove a deleted transaction from its rollup bucket"""
+    apply_delta(state.user_id, state.date, state.transaction_type,
+                state.category, state.currency, -abs(state.amount), -1)
+
+
+def record_bulk_create(counts):
+    """Add inserted rows to their rollup buckets, one update per bucket.
+
+    ``counts`` is the ``Counter`` built by ``ledger.count_created``.
+    """
+    buckets = {}
+    for state, count in counts.items():
+        key = _bucket_key(state)
+        total, rows = buckets.get(key, (ZERO, 0))
+        buckets[key] = (total + abs(state.amount) * count, rows + count)
+    for (user_id, year, month, transaction_type, category, currency), (total, rows) in buckets.items():
+        apply_delta(user_id, datetime.date(year, month, 1), transaction_type, category, currency, total, rows)
+
+
+def rebuild_monthly_summaries(user_ids=None, batch_size=500):
+    """Recompute MonthlySummary rows from the Transaction table.
+
+    Users are processed in batches of ``batch_size``; each batch replaces its
+    users' rollup rows inside one database transaction using a single grouped
+    aggregate and ``bulk_create``. Returns the number of rollup rows written.
+    """
+    from .models import MonthlySummary, Transaction
+
+    if user_ids is None:
+        user_ids = Transaction.objects.values_list(
+            'user_id', flat=True
+        ).distinct().order_by('user_id')
+    user_ids = sorted(set(user_ids))
+
+    written = 0
+    for start in range(0, len(user_ids), batch_size):
+        batch = user_ids[start:start + batch_size]
+        rows = (
+            Transaction.objects.filter(user_id__in=batch)
+            .annotate(year=ExtractYear('date'), month=ExtractMonth('date'))
+            .values('user_id', 'year', 'month', 'transaction_type', 'category', 'currency')
+            .annotate(total=Sum('amount'), count=Count('id'))
+            .order_by()
+        )
+        summaries = [MonthlySummary(**row) for row in rows]
+        with db_transaction.atomic():
+            MonthlySummary.objects.filter(user_id__in=batch).delete()
+            MonthlySummary.objects.bulk_create(summaries, batch_size=batch_size)
+        written += len(summaries)
+    return written
+
@@ -0,0 +1,230 @@
+"""
+Summary service for the figures shown on the dashboard, in the finance
+template tags and in the admin.
+
+Every total is produced by conditional aggregation (``Sum(..., filter=Q(...))``)
+so a whole summary is computed in one pass instead of one query per figure.
+Per-user summaries read the MonthlySummary rollup; ``transaction_totals``
+summarises an arbitrary Transaction queryset (used by the admin changelist).
+
+Totals are in the user's base currency: each rollup bucket is converted in
+the same query, joined to the rate of its month (see ``finance_portfolio.fx``).
+"""
+from dataclasses import dataclass, field
+from datetime import date
+from decimal import Decimal
+
+from django.db.models import Count, Q, Sum
+
+from finance_portfolio import fx
+
+
+ZERO = Decimal('0.00')
+
+
+@dataclass(frozen=True)
+class Totals:
+    """Income and expense totals for a period"""
+    income: Decimal = ZERO
+    expenses: Decimal = ZERO
+    count: int = 0
+
+    @property
+    def net(self):
+        return self.income - self.expenses
+
+
+@dataclass(frozen=True)
+class DashboardSummary:
+    """Everything DashboardView needs, computed in two queries"""
+    month: Totals
+    all_time: Totals
+    expense_by_category: list = field(default_factory=list)
+    recent_transactions: list = field(default_factory=list)
+    # Per month and category: {'year', 'month', 'category', 'income', 'expenses'}
+    months: list = field(default_factory=list)
+
+    @property
+    def monthly_income(self):
+        return self.month.income
+
+    @property
+    def monthly_expenses(self):
+        return self.month.expenses
+
+    @property
+    def total_income(self):
+        return self.all_time.income
+
+    @property
+    def total_expenses(self):
+        return self.all_time.expenses
+
+
+def _money(value):
+    # Converted sums carry the expression's extra decimal places
+    return (value or ZERO).quantize(ZERO)
+
+
+def _sum(amount_field, transaction_type, extra=None):
+    condition = Q(transaction_type=transaction_type)
+    if extra is not None:
+        condition &= extra
+    return Sum(amount_field, filter=condition)
+
+
+def converted_summaries(**filters):
+    """MonthlySummary rows annotated with ``base_total``, the total in the owner's base currency"""
+    from .models import MonthlySummary
+
+    return MonthlySummary.objects.filter(**filters).annotate(
+        fx_day=fx.MonthStart('year', 'month'),
+        base_total=fx.to_base('total', day='fx_day'),
+    )
+
+
+def _dashboard_queries(user, recent):
+    from .models import Transaction
+
+    rows = converted_summaries(user=user).values('year', 'month', 'category').annotate(
+        income=_sum('base_total', 'INCOME'),
+        expenses=_sum('base_total', 'EXPENSE'),
+        count=Sum('count'),
+        unconverted=fx.unconverted('base_total'),
+    ).order_by()
+    return rows, Transaction.objects.filter(user=user)[:recent]
+
+
+def _fold_summary(rows, recent_transactions, today, top_categories):
+    month = {'income': ZERO, 'expenses': ZERO, 'count': 0}
+    all_time = {'income': ZERO, 'expenses': ZERO, 'count': 0}
+    categories = []
+    months = []
+    for row in rows:
+        fx.check_converted(row['unconverted'])
+        income, expenses, count = _money(row['income']), _money(row['expenses']), row['count'] or 0
+        months.append({
+            'year': row['year'], 'month': row['month'], 'category': row['category'],
+            'income': income, 'expenses': expenses,
+        })
+        all_time['income'] += income
+        all_time['expenses'] += expenses
+        all_time['count'] += count
+        if (row['year'], row['month']) != (today.year, today.month):
+            continue
+        month['income'] += income
+        month['expenses'] += expenses
+        month['count'] += count
+        if expenses:
+            categories.append({'category': row['category'], 'total': expenses})
+
+    categories.sort(key=lambda item: item['total'], reverse=True)
+
+    return DashboardSummary(
+        month=Totals(**month),
+        all_time=Totals(**all_time),
+        expense_by_category=categories[:top_categories],
+        recent_transactions=list(recent_transactions),
+        months=months,
+    )
+
+
+def dashboard_summary(user, today=None, top_categories=5, recent=5):
+    """Build a DashboardSummary for ``user``.
+
+    One grouped query over the user's MonthlySummary rows returns the income
+    and expense totals per month and category; the month and all-time totals,
+    the top expense categories and ``months`` (the input of
+    ``analytics.monthly_analytics``) are folded from those. A second query
+    fetches the recent rows.
+    """
+    today = today or date.today()
+    rows, recent_transactions = _dashboard_queries(user, recent)
+    return _fold_summary(rows, recent_transactions, today, top_categories)
+
+
+async def adashboard_summary(user, today=None, top_categories=5, recent=5):
+    """Async ``dashboard_summary``.
+
+    The event loop is free while the queries run, but they run one after
+    the other: the async ORM executes them on the single thread Django keeps
+    for sync code (``sync_to_async`` is thread sensitive).
+    """
+    today = today or date.today()
+    rows, recent_transactions = _dashboard_queries(user, recent)
+    rows = await _alist(rows)
+    recent_transactions = await _alist(recent_transactions)
+    return _fold_summary(rows, recent_transactions, today, top_categories)
+
+
+async def _alist(queryset):
+    return [item async for item in queryset]
+
+
+def period_totals(user, month=None, year=None):
+    """Return Totals for a user, optionally restricted to one month"""
+    queryset = converted_summaries(user=user)
+    if month and year:
+        queryset = queryset.filter(month=month, year=year)
+
+    totals = queryset.aggregate(
+        income=_sum('base_total', 'INCOME'),
+        expenses=_sum('base_total', 'EXPENSE'),
+        count=Sum('count'),
+        unconverted=fx.unconverted('base_total'),
+    )
+    fx.check_converted(totals['unconverted'])
+    return Totals(
+        income=_money(totals['income']),
+        expenses=_money(totals['expenses']),
+        count=totals['count'] or 0,
+    )
+
+
+def monthly_totals(user):
+    """``{(year, month): Totals}`` for every month of ``user``'s history.
+
+    One grouped query over the rollup; callers that need several months (or
+    the all-time figure, which is the sum of them) fold from the result
+    instead of asking for each month separately.
+    """
+    rows = converted_summaries(user=user).values('year', 'month').annotate(
+        income=_sum('base_total', 'INCOME'),
+        expenses=_sum('base_total', 'EXPENSE'),
+        count=Sum('count'),
+        unconverted=fx.unconverted('base_total'),
+    ).order_by()
+    for row in rows:
+        fx.check_converted(row['unconverted'])
+    return {
+        (row['year'], row['month']): Totals(
+            income=_money(row['income']),
+            expenses=_money(row['expenses']),
+            count=row['count'] or 0,
+        )
+        for row in rows
+    }
+
+
+def transaction_totals(queryset, currency=None):
+    """Return Totals for an arbitrary Transaction queryset in one query.
+
+    Rows may belong to several users, so amounts are converted into
+    ``currency`` (default ``settings.DEFAULT_CURRENCY``) rather than into
+    each owner's base currency.
+    """
+    totals = queryset.order_by().annotate(
+        fx_day=fx.month_start('date'),
+        converted=fx.to_currency('amount', currency or fx.default_currency(), day='fx_day'),
+    ).aggregate(
+        income=_sum('converted', 'INCOME'),
+        expenses=_sum('converted', 'EXPENSE'),
+        count=Count('id'),
+        unconverted=fx.unconverted('converted'),
+    )
+    fx.check_converted(totals['unconverted'])
+    return Totals(
+        income=_money(totals['income']),
+        expenses=_money(totals['expenses']),
+        count=totals['count'] or 0,
+    )
@@ -1,59 +1,60 @@
 from django import template
-from django.db.models import Sum
-from decimal import Decimal
 from datetime import datetime
 
 register = template.Library()
 
 
-@register.simple_tag
-def calculate_total_spend(user, month=None, year=None):
-    """Calculate total spending for a user, optionally filtered by month/year"""
-    from transactions.models import Transaction
-    
-    queryset = Transaction.objects.filter(
-        user=user,
-        transaction_type='EXPENSE'
-    )
-    
+def _period_totals(context, user, month=None, year=None):
+    """Totals for ``user``, memoized for the rest of the request.
+
+    The first lookup for a user loads every month of their rollup in one
+    grouped query and stores it on the request (or, without one, on the
+    render context), so a template that asks for many months or users costs
+    one query per user rather than one per tag call.
+    """
+    from transactions.summary import ZERO, Totals, monthly_totals
+
+    if getattr(user, 'pk', None) is None:
+        return Totals()
+
+    request = context.get('request')
+    if request is not None:
+        memo = getattr(request, '_finance_totals', None)
+        if memo is None:
+            memo = request._finance_totals = {}
+    else:
+        memo = context.render_context.setdefault('_finance_totals', {})
+    months = memo.get(user.pk)
+    if months is None:
+        months = memo[user.pk] = monthly_totals(user)
+
     if month and year:
-        queryset = queryset.filter(date__month=month, date__year=year)
-    
-    total = queryset.aggregate(total=Sum('amount'))['total']
-    return total or Decimal('0.00')
+        return months.get((int(year), int(month)), Totals())
+    return Totals(
+        income=sum((totals.income for totals in months.values()), ZERO),
+        expenses=sum((totals.expenses for totals in months.values()), ZERO),
+        count=sum(totals.count for totals in months.values()),
+    )
 
 
-@register.simple_tag
-def calculate_total_income(user, month=None, year=None):
+@register.simple_tag(takes_context=True)
+def calculate_total_spend(context, user, month=None, year=None):
+    """Calculate total spending for a user, optionally filtered by month/year"""
+    return _period_totals(context, user, month, year).expenses
+
+
+@register.simple_tag(takes_context=True)
+def calculate_total_income(context, user, month=None, year=None):
     """Calculate total income for a user, optionally filtered by month/year"""
-    from transactions.models import Transaction
-    
-    queryset = Transaction.objects.filter(
-        user=user,
-        transaction_type='INCOME'
-    )
-    
-    if month and year:
-        queryset = queryset.filter(date__month=month, date__year=year)
-    
-    total = queryset.aggregate(total=Sum('amount'))['total']
-    return total or Decimal('0.00')
+    return _period_totals(context, user, month, year).income
 
 
 @register.simple_tag
 def budget_status(spent, budget):
     """Return budget status based on spending"""
-    if budget == 0:
-        return 'no-budget'
-    
-    percentage = (spent / budget) * 100
+    from transactions.alerts import budget_level
     
-    if percentage < 70:
-        return 'safe'
-    elif percentage < 90:
-        return 'warning'
-    else:
-        return 'danger'
+    return budget_level(spent, budget)
 
 
 @register.filter
@@ -77,9 +78,32 @@ def abs_value(value):
 
 
 @register.filter
-def format_currency(value):
-    """Format number as currency"""
+def format_currency(value, currency=None):
+    """Format number as currency, e.g. ``{{ amount|format_currency:transaction.currency }}``"""
+    from finance_portfolio import fx
+    
+    prefix = fx.symbol(currency or fx.default_currency())
     try:
-        return f"${float(value):,.2f}"
+        return f"{prefix}{float(value):,.2f}"
     except (ValueError, TypeError):
-        return "$0.00"
+        return f"{prefix}0.00"
+
+
+@register.filter
+def currency_symbol(currency):
+    """Display prefix for a currency code"""
+    from finance_portfolio import fx
+    
+    return fx.symbol(currency or fx.default_currency())
+
+
+@register.simple_tag
+def current_month_name():
+    """Return current month name"""
+    return datetime.now().strftime('%B')
+
+
+@register.simple_tag
+def current_year():
+    """Return current year"""
+    return datetime.now().year
@@ -0,0 +1,312 @@
+import datetime
+import tempfile
+from decimal import Decimal
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from benchmarks.scenarios import default_scenarios
+from benchmarks.seed import seed
+from finance_portfolio import fx
+
+from . import alerts, cache as dashboard_cache, ledger, rollups, summary
+from .importers import clean_row, parse_amount
+from .models import CategoryBudget, ExchangeRate, MonthlySummary, RecurringTransaction, Transaction, UserProfile
+from .profiles import ProfileBackend, ProfileMiddleware
+from .recurring import run_recurring
+from .views import DashboardView
+
+
+class LedgerConcurrencyTests(TestCase):
+    """Balance deltas are taken against the stored row, not the loaded one"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='pw')
+        self.txn = Transaction.objects.create(
+            user=self.user, transaction_type='EXPENSE', category='FOOD',
+            amount=Decimal('10.00'), date=datetime.date(2026, 10, 1),
+        )
+
+    def balance(self):
+        return UserProfile.objects.get(user=self.user).total_balance
+
+    def test_edits_of_stale_instances(self):
+        first = Transaction.objects.get(pk=self.txn.pk)
+        second = Transaction.objects.get(pk=self.txn.pk)
+        first.amount = Decimal('30.00')
+        first.save()
+        second.amount = Decimal('50.00')
+        second.save()
+        self.assertEqual(self.balance(), Decimal('-50.00'))
+        self.assertEqual(self.balance(), ledger.calculate_balance(self.user.pk))
+
+    def test_delete_of_stale_instance(self):
+        stale = Transaction.objects.get(pk=self.txn.pk)
+        fresh = Transaction.objects.get(pk=self.txn.pk)
+        fresh.amount = Decimal('25.00')
+        fresh.save()
+        stale.delete()
+        self.assertEqual(self.balance(), Decimal('0.00'))
+
+    def test_repeated_delete_reverses_once(self):
+        Transaction.objects.create(
+            user=self.user, transaction_type='INCOME', category='SALARY',
+            amount=Decimal('100.00'), date=datetime.date(2026, 10, 2),
+        )
+        first = Transaction.objects.get(pk=self.txn.pk)
+        second = Transaction.objects.get(pk=self.txn.pk)
+        first.delete()
+        second.delete()
+        self.assertEqual(self.balance(), Decimal('100.00'))
+
+
+class DashboardQueryTests(TestCase):
+    """A cold dashboard is computed in two queries"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='pw')
+        today = datetime.date.today()
+        for index in range(30):
+            Transaction.objects.create(
+                user=self.user, transaction_type='INCOME' if index % 3 == 0 else 'EXPENSE',
+                category=['FOOD', 'BILLS', 'SALARY'][index % 3], amount=Decimal(10 + index),
+                date=today - datetime.timedelta(days=index * 7),
+            )
+        cache.clear()
+        dashboard_cache.reset_cache_stats()
+
+    def dashboard_request(self):
+        # As the session middleware and ProfileBackend would load the user
+        request = RequestFactory().get(reverse('dashboard'))
+        request.user = ProfileBackend().get_user(self.user.pk)
+        ProfileMiddleware(lambda request: None).process_request(request)
+        return request
+
+    def test_cold_dashboard_queries(self):
+        request = self.dashboard_request()
+        with self.assertNumQueries(2):
+            response = DashboardView.as_view()(request)
+            response.render()
+        self.assertEqual(response.status_code, 200)
+        context = response.context_data
+        self.assertEqual(context['total_balance'], ledger.calculate_balance(self.user.pk))
+        self.assertEqual(len(context['recent_transactions']), 5)
+        self.assertEqual(len(context['analytics'].monthly_expenses), 12)
+
+    def test_warm_dashboard_queries(self):
+        DashboardView.as_view()(self.dashboard_request()).render()
+        request = self.dashboard_request()
+        with self.assertNumQueries(0):
+            DashboardView.as_view()(request).render()
+        stats = dashboard_cache.cache_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_fragments_follow_the_month(self):
+        Transaction.objects.filter(user=self.user).delete()
+        Transaction.objects.create(
+            user=self.user, transaction_type='EXPENSE', category='FOOD',
+            amount=Decimal('10.00'), date=datetime.date(2026, 10, 15),
+        )
+        pages = []
+        for now in (datetime.datetime(2026, 10, 20, 12), datetime.datetime(2026, 11, 2, 12)):
+            clock = mock.Mock(wraps=datetime.datetime, now=mock.Mock(return_value=now))
+            with mock.patch('transactions.views.datetime', clock):
+                pages.append(DashboardView.as_view()(self.dashboard_request()).render().content.decode())
+        self.assertNotIn('No expense data for this month', pages[0])
+        self.assertIn('No expense data for this month', pages[1])
+
+
+class DashboardInvalidationTests(TestCase):
+    """Dashboard versions are bumped when the write commits"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='pw')
+
+    def test_bump_waits_for_commit(self):
+        version = dashboard_cache.dashboard_version(self.user.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            Transaction.objects.create(
+                user=self.user, transaction_type='EXPENSE', category='FOOD',
+                amount=Decimal('10.00'), date=datetime.date(2026, 10, 1),
+            )
+            self.assertEqual(dashboard_cache.dashboard_version(self.user.pk), version)
+        self.assertNotEqual(dashboard_cache.dashboard_version(self.user.pk), version)
+
+
+class ImporterTests(TestCase):
+    """Rows with unusable amounts are rejected, not crashed on"""
+
+    def test_non_finite_amounts(self):
+        for raw in ('NaN', 'sNaN', '-nan', 'Infinity', '(inf)'):
+            with self.subTest(raw=raw):
+                with self.assertRaises(ValidationError):
+                    parse_amount(raw)
+                with self.assertRaises(ValidationError):
+                    clean_row({'date': '2026-10-01', 'amount': raw, 'description': 'x'})
+
+    def test_signed_amounts(self):
+        self.assertEqual(parse_amount('-1,234.50'), Decimal('-1234.50'))
+        self.assertEqual(parse_amount('(12.00)'), Decimal('-12.00'))
+        self.assertEqual(parse_amount('$12'), Decimal('12'))
+
+
+class BulkWriteTests(TestCase):
+    """Generated rows are applied to balances and rollups as deltas"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='pw')
+        Transaction.objects.create(
+            user=self.user, transaction_type='INCOME', category='SALARY',
+            amount=Decimal('1000.00'), date=datetime.date(2026, 6, 15),
+        )
+
+    def rollup(self):
+        return sorted(
+            MonthlySummary.objects.filter(user=self.user)
+            .values_list('year', 'month', 'transaction_type', 'category', 'currency', 'total', 'count')
+        )
+
+    def test_recurring_run(self):
+        for currency, amount in (('USD', '12.34'), ('EUR', '7.77')):
+            RecurringTransaction.objects.create(
+                user=self.user, transaction_type='EXPENSE', category='BILLS', amount=Decimal(amount),
+                currency=currency, frequency='WEEKLY', start_date=datetime.date(2026, 7, 1),
+            )
+        result = run_recurring(today=datetime.date(2026, 10, 18))
+        self.assertEqual(result.created, 32)
+
+        balance = UserProfile.objects.get(user=self.user).total_balance
+        self.assertEqual(balance, ledger.calculate_balance(self.user.pk))
+        incremental = self.rollup()
+        rollups.rebuild_monthly_summaries([self.user.pk])
+        self.assertEqual(incremental, self.rollup())
+
+
+class ExportTests(TestCase):
+    """Exports stream under both WSGI and ASGI"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='pw')
+        for index in range(25):
+            Transaction.objects.create(
+                user=self.user, transaction_type='EXPENSE', category='FOOD',
+                amount=Decimal(index + 1), date=datetime.date(2026, 10, 1),
+            )
+
+    def test_wsgi_export(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('transaction_export'), secure=True)
+        self.assertFalse(response.is_async)
+        self.assertEqual(b''.join(response.streaming_content).count(b'\n'), 26)
+
+    async def test_asgi_export(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(
+            reverse('transaction_export'), {'format': 'ndjson'}, secure=True
+        )
+        self.assertTrue(response.is_async)
+        lines = [chunk async for chunk in response.streaming_content]
+        self.assertEqual(len(lines), 25)
+
+
+class BudgetLimitTests(TestCase):
+    """Cached budget limits are dropped when the budget change commits"""
+
+    def test_invalidated_on_commit(self):
+        cache.clear()
+        user = User.objects.create_user('alice', password='pw')
+        self.assertEqual(alerts.get_limits(user.pk), {alerts.OVERALL: Decimal('5000.00')})
+        with self.captureOnCommitCallbacks(execute=True):
+            CategoryBudget.objects.create(user=user, category='FOOD', amount=Decimal('300.00'))
+            self.assertNotIn('FOOD', alerts.get_limits(user.pk))
+        self.assertEqual(alerts.get_limits(user.pk)['FOOD'], Decimal('300.00'))
+
+
+class BaseCurrencyTests(TestCase):
+    """Balance deltas use the stored base currency, not a stale cached one"""
+
+    def test_stale_cached_base_currency(self):
+        user = User.objects.create_user('alice', password='pw')
+        UserProfile.objects.filter(user=user).update(base_currency='EUR')
+        # What a worker that missed the change still has cached
+        cache.set(f'fx:base:{user.pk}', 'USD')
+        Transaction.objects.create(
+            user=user, transaction_type='INCOME', category='SALARY', currency='USD',
+            amount=Decimal('100.00'), date=datetime.date(2026, 10, 1),
+        )
+        expected = fx.convert(Decimal('100.00'), 'USD', 'EUR', datetime.date(2026, 10, 1))
+        self.assertNotEqual(expected, Decimal('100.00'))
+        self.assertEqual(UserProfile.objects.get(user=user).total_balance, expected)
+        self.assertEqual(fx.base_currency(user.pk), 'EUR')
+
+
+class MissingRateTests(TestCase):
+    """A currency without rates is reported the same way by both conversion paths"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='pw')
+        self.client.force_login(self.user)
+        cache.clear()
+        self.addCleanup(fx._rates.clear)
+
+    def drop_rates(self, currency):
+        ExchangeRate.objects.filter(currency=currency).delete()
+        fx._rates.clear()
+
+    def test_single_conversion(self):
+        self.drop_rates('CHF')
+        response = self.client.post(reverse('transaction_create'), {
+            'transaction_type': 'EXPENSE', 'category': 'FOOD', 'amount': '10.00',
+            'currency': 'CHF', 'description': 'Lunch', 'date': '2026-10-01',
+        }, secure=True)
+        self.assertContains(response, 'No exchange rate for CHF', status_code=503)
+        # The row goes with the balance update that failed
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_aggregate_conversion(self):
+        for currency in ('USD', 'CHF'):
+            Transaction.objects.create(
+                user=self.user, transaction_type='EXPENSE', category='FOOD', currency=currency,
+                amount=Decimal('10.00'), date=datetime.date.today(),
+            )
+        self.drop_rates('CHF')
+        response = self.client.get(reverse('dashboard'), secure=True)
+        self.assertContains(response, 'No exchange rate for CHF', status_code=503)
+        with self.assertRaises(fx.MissingRateError):
+            summary.period_totals(self.user)
+        with self.assertRaises(fx.MissingRateError):
+            ledger.calculate_balance(self.user.pk)
+
+
+class QueryBudgetTests(TransactionTestCase):
+    """Each view stays within its VIEW_QUERY_BUDGETS entry in the benchmark scenarios"""
+    # Keep the seeded exchange rates for the test cases that run after this one
+    serialized_rollback = True
+
+    def test_benchmark_scenarios(self):
+        # No price history files yet, as on a fresh host
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(PRICE_HISTORY_DIR=directory.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        user = seed(users=1, transactions=200, watchlist=5)[0]
+        self.client.force_login(user)
+        views = set()
+        for scenario in default_scenarios():
+            # Cold caches first, as after a deploy
+            cache.clear()
+            fx._rates.clear()
+            scenario.prepare(user, 12)
+            for iteration in range(12):
+                with self.subTest(scenario=scenario.name, iteration=iteration):
+                    with self.assertNoLogs('finance_portfolio.instrumentation', 'WARNING'):
+                        response = scenario.request(self.client, iteration)
+                    self.assertEqual(response.status_code, scenario.expect)
+                    views.add(response.resolver_match.view_name)
+        self.assertLessEqual(set(settings.VIEW_QUERY_BUDGETS), views)
@@ -1,18 +1,29 @@
+from django.conf import settings
 from django.urls import path
 from .views import (
+    AsyncTransactionListView,
     TransactionListView,
     TransactionCreateView,
     TransactionUpdateView,
     TransactionDeleteView,
+    TransactionImportView,
+    TransactionExportView,
     BudgetUpdateView,
+    SpendingAnalyticsView,
+    DashboardCacheStatsView,
     SignUpView,
 )
 
 urlpatterns = [
-    path('', TransactionListView.as_view(), name='transaction_list'),
+    path('', (AsyncTransactionListView if settings.ASYNC_VIEWS else TransactionListView).as_view(),
+         name='transaction_list'),
     path('add/', TransactionCreateView.as_view(), name='transaction_create'),
+    path('import/', TransactionImportView.as_view(), name='transaction_import'),
+    path('export/', TransactionExportView.as_view(), name='transaction_export'),
     path('<int:pk>/edit/', TransactionUpdateView.as_view(), name='transaction_update'),
     path('<int:pk>/delete/', TransactionDeleteView.as_view(), name='transaction_delete'),
     path('budget/', BudgetUpdateView.as_view(), name='budget_update'),
+    path('analytics/', SpendingAnalyticsView.as_view(), name='spending_analytics'),
+    path('cache-stats/', DashboardCacheStatsView.as_view(), name='dashboard_cache_stats'),
     path('signup/', SignUpView.as_view(), name='signup'),
 ]
@@ -1,13 +1,24 @@
-from django.views.generic import ListView, CreateView, DeleteView, UpdateView, TemplateView, FormView
-from django.contrib.auth.mixins import LoginRequiredMixin
+from django.views.generic import ListView, CreateView, DeleteView, UpdateView, TemplateView, FormView, View
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.urls import reverse_lazy
 from django.db.models import Sum, Q
 from django.contrib import messages
 from django.shortcuts import redirect
 from datetime import datetime, timedelta
 from decimal import Decimal
-from .models import Transaction, UserProfile
-from .forms import TransactionForm, SignUpForm, BudgetUpdateForm
+import io
+from finance_portfolio import fx
+from finance_portfolio.asyncviews import AsyncListMixin, AsyncLoginRequiredMixin
+from finance_portfolio.pagination import KeysetPaginationMixin
+from .models import BudgetAlert, CategoryBudget, Transaction
+from .summary import adashboard_summary, dashboard_summary
+from . import alerts, cache as dashboard_cache
+from .forms import TransactionForm, SignUpForm, BudgetUpdateForm, TransactionImportForm
+from .importers import ImportFormatError, detect_format, import_file
+from .exporters import EXPORT_FORMATS, astream_export, export_filename, stream_export
+from .filters import filter_transactions
 
 
 class DashboardView(LoginRequiredMixin, TemplateView):
@@ -16,101 +27,108 @@ class DashboardView(LoginRequiredMixin, TemplateView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        user = self.request.user
-        
-        # Get or create user profile
-        profile, _ = UserProfile.objects.get_or_create(user=user)
-        
-        # Get current month transactions
         today = datetime.now()
-        first_day = today.replace(day=1)
-        
-        current_month_transactions = Transaction.objects.filter(
-            user=user,
-            date__gte=first_day
+        context.update(self.get_dashboard(self.request.user, today))
+        context['dashboard_cache_timeout'] = dashboard_cache.cache_timeout()
+        context['current_month'] = today.strftime('%B %Y')
+        # Fragments show this month's figures, so a new month needs new ones
+        context['dashboard_month'] = today.strftime('%Y-%m')
+        return context
+    
+    def get_dashboard(self, user, today):
+        # Served from the per-user cache until the next transaction or budget change
+        return dashboard_cache.get_dashboard_context(
+            user.pk, today.date(), lambda: self.build_dashboard_context(user, today)
         )
+    
+    def build_dashboard_context(self, user, today):
+        """Compute the dashboard figures from the database"""
+        # Loaded with the user by the profile middleware
+        profile = self.request.profile
         
-        # Calculate current month expenses and income
-        monthly_expenses = current_month_transactions.filter(
-            transaction_type='EXPENSE'
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-        
-        monthly_income = current_month_transactions.filter(
-            transaction_type='INCOME'
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-        
-        # Calculate all-time totals
-        all_transactions = Transaction.objects.filter(user=user)
-        
-        total_expenses = all_transactions.filter(
-            transaction_type='EXPENSE'
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-        
-        total_income = all_transactions.filter(
-            transaction_type='INCOME'
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-        
-        # Calculate budget progress
-        budget_remaining = profile.monthly_budget - monthly_expenses
-        budget_percentage = (monthly_expenses / profile.monthly_budget * 100) if profile.monthly_budget > 0 else 0
-        
-        # Get recent transactions
-        recent_transactions = Transaction.objects.filter(user=user)[:5]
+        # All totals, the category breakdown and recent rows in two queries
+        summary = dashboard_summary(user, today=today.date())
         
-        # Calculate expense by category
-        expense_by_category = current_month_transactions.filter(
-            transaction_type='EXPENSE'
-        ).values('category').annotate(
-            total=Sum('amount')
-        ).order_by('-total')[:5]
+        # Trends, run-rate and anomalies from the summary's monthly totals;
+        # NumPy is imported on first use, not at startup
+        from .analytics import monthly_analytics
         
-        context.update({
-            'profile': profile,
-            'total_balance': profile.total_balance,
-            'monthly_budget': profile.monthly_budget,
-            'monthly_expenses': monthly_expenses,
-            'monthly_income': monthly_income,
-            'budget_remaining': budget_remaining,
-            'budget_percentage': budget_percentage,
-            'total_expenses': total_expenses,
-            'total_income': total_income,
-            'recent_transactions': recent_transactions,
-            'expense_by_category': expense_by_category,
-            'current_month': today.strftime('%B %Y'),
-        })
+        analytics = monthly_analytics(summary.months, today.date(), profile.monthly_budget)
+        return dashboard_context(profile, summary, analytics)
+
+
+def dashboard_context(profile, summary, analytics):
+    """The dashboard template's figures from already loaded data"""
+    monthly_expenses = summary.monthly_expenses
+    
+    # Calculate budget progress
+    budget_remaining = profile.monthly_budget - monthly_expenses
+    budget_percentage = (monthly_expenses / profile.monthly_budget * 100) if profile.monthly_budget > 0 else 0
+    
+    return {
+        'profile': profile,
+        'currency': profile.base_currency,
+        'currency_symbol': fx.symbol(profile.base_currency),
+        'total_balance': profile.total_balance,
+        'monthly_budget': profile.monthly_budget,
+        'monthly_expenses': monthly_expenses,
+        'monthly_income': summary.monthly_income,
+        'budget_remaining': budget_remaining,
+        'budget_percentage': budget_percentage,
+        'total_expenses': summary.total_expenses,
+        'total_income': summary.total_income,
+        'recent_transactions': summary.recent_transactions,
+        'expense_by_category': summary.expense_by_category,
+        'summary': summary,
+        'analytics': analytics,
+    }
+
+
+class AsyncDashboardView(AsyncLoginRequiredMixin, DashboardView):
+    """DashboardView for ASGI: the cache and the database are awaited"""
+    
+    async def get(self, request, *args, **kwargs):
+        today = datetime.now()
+        user = request.user
+        self._dashboard = await dashboard_cache.aget_dashboard_context(
+            user.pk, today.date(), lambda: self.abuild_dashboard_context(user, today)
+        )
+        return self.render_to_response(self.get_context_data(**kwargs))
+    
+    def get_dashboard(self, user, today):
+        return self._dashboard
+    
+    async def abuild_dashboard_context(self, user, today):
+        """Async ``build_dashboard_context``; the queries are awaited one after the other"""
+        profile = await self.request.aprofile()
+        summary = await adashboard_summary(user, today=today.date())
+        from .analytics import monthly_analytics
         
-        return context
+        analytics = monthly_analytics(summary.months, today.date(), profile.monthly_budget)
+        return dashboard_context(profile, summary, analytics)
 
 
-class TransactionListView(LoginRequiredMixin, ListView):
+class TransactionListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     """List all transactions for the logged-in user"""
     model = Transaction
     template_name = 'transactions/transaction_list.html'
     context_object_name = 'transactions'
     paginate_by = 20
+    cursor_ordering = ('-date', '-created_at', '-id')
     
     def get_queryset(self):
         queryset = Transaction.objects.filter(user=self.request.user)
         
-        # Filter by type
-        transaction_type = self.request.GET.get('type')
-        if transaction_type in ['EXPENSE', 'INCOME']:
-            queryset = queryset.filter(transaction_type=transaction_type)
-        
-        # Filter by category
-        category = self.request.GET.get('category')
-        if category:
-            queryset = queryset.filter(category=category)
+        # Type, category, date range and search (full-text index, best matches first)
+        queryset = filter_transactions(queryset, self.request.GET, ranked=True)
+        if self.request.GET.get('search'):
+            return queryset
         
-        # Search
-        search = self.request.GET.get('search')
-        if search:
-            queryset = queryset.filter(
-                Q(description__icontains=search) | 
-                Q(category__icontains=search)
-            )
-        
-        return queryset
+        return queryset.order_by(*self.cursor_ordering)
+    
+    def use_cursor_pagination(self):
+        # Ranked search results are ordered by relevance, not by the keyset
+        return super().use_cursor_pagination() and not self.request.GET.get('search')
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -119,9 +137,16 @@ class TransactionListView(LoginRequiredMixin, ListView):
         context['current_type'] = self.request.GET.get('type', '')
         context['current_category'] = self.request.GET.get('category', '')
         context['current_search'] = self.request.GET.get('search', '')
+        context['current_date_from'] = self.request.GET.get('date_from', '')
+        context['current_date_to'] = self.request.GET.get('date_to', '')
+        context['export_formats'] = list(EXPORT_FORMATS)
         return context
 
 
+class AsyncTransactionListView(AsyncLoginRequiredMixin, AsyncListMixin, TransactionListView):
+    """TransactionListView for ASGI: the page is fetched with async iteration"""
+
+
 class TransactionCreateView(LoginRequiredMixin, CreateView):
     """Create a new transaction"""
     model = Transaction
@@ -129,6 +154,9 @@ class TransactionCreateView(LoginRequiredMixin, CreateView):
     template_name = 'transactions/transaction_form.html'
     success_url = reverse_lazy('transaction_list')
     
+    def get_initial(self):
+        return {'currency': self.request.profile.base_currency}
+    
     def form_valid(self, form):
         form.instance.user = self.request.user
         messages.success(self.request, 'Transaction added successfully!')
@@ -177,23 +205,126 @@ class TransactionDeleteView(LoginRequiredMixin, DeleteView):
 
 
 class BudgetUpdateView(LoginRequiredMixin, FormView):
-    """Update monthly budget"""
+    """Update monthly budget and per-category budgets"""
     form_class = BudgetUpdateForm
     template_name = 'transactions/budget_update.html'
     success_url = reverse_lazy('dashboard')
     
     def get_initial(self):
-        profile, _ = UserProfile.objects.get_or_create(user=self.request.user)
-        return {'monthly_budget': profile.monthly_budget}
+        profile = self.request.profile
+        initial = {'monthly_budget': profile.monthly_budget, 'base_currency': profile.base_currency}
+        for category, amount in CategoryBudget.objects.filter(user=self.request.user).values_list('category', 'amount'):
+            initial[BudgetUpdateForm.category_field(category)] = amount
+        return initial
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['budget_alerts'] = BudgetAlert.objects.filter(user=self.request.user)[:10]
+        return context
     
     def form_valid(self, form):
-        profile, _ = UserProfile.objects.get_or_create(user=self.request.user)
+        user = self.request.user
+        profile = self.request.profile
         profile.monthly_budget = form.cleaned_data['monthly_budget']
+        # A new base currency re-converts the balance (see the UserProfile signals)
+        profile.base_currency = form.cleaned_data['base_currency']
         profile.save()
+        
+        budgets = form.category_budgets()
+        CategoryBudget.objects.filter(
+            user=user, category__in=[category for category, amount in budgets.items() if not amount]
+        ).delete()
+        CategoryBudget.objects.bulk_create(
+            [CategoryBudget(user=user, category=category, amount=amount)
+             for category, amount in budgets.items() if amount],
+            update_conflicts=True,
+            unique_fields=['user', 'category'],
+            update_fields=['amount', 'updated_at'],
+        )
+        # bulk_create skips the signals that drop the cached limits
+        alerts.invalidate_limits(user.pk)
+        alerts.check_users([user.pk])
+        
+        dashboard_cache.invalidate_dashboard(user.pk)
         messages.success(self.request, 'Budget updated successfully!')
         return super().form_valid(form)
 
 
+class TransactionImportView(LoginRequiredMixin, FormView):
+    """Import transactions in bulk from a CSV or OFX bank export"""
+    form_class = TransactionImportForm
+    template_name = 'transactions/transaction_import.html'
+    success_url = reverse_lazy('transaction_list')
+    
+    def form_valid(self, form):
+        upload = form.cleaned_data['file']
+        file_format = form.cleaned_data['file_format']
+        if file_format == 'auto':
+            file_format = detect_format(upload.name)
+        
+        # Decode the upload as a stream of lines rather than reading it whole
+        lines = io.TextIOWrapper(upload.file, encoding='utf-8-sig', errors='replace', newline='')
+        try:
+            result = import_file(self.request.user, lines, file_format)
+        except ImportFormatError as exc:
+            form.add_error('file', str(exc))
+            return self.form_invalid(form)
+        
+        messages.success(
+            self.request,
+            f'Imported {result.created} transaction(s) in {result.elapsed:.2f}s '
+            f'({result.rows_per_second:,.0f} rows/s).'
+        )
+        if result.skipped:
+            first_errors = '; '.join(f'line {line}: {error}' for line, error in result.errors[:5])
+            messages.warning(self.request, f'Skipped {result.skipped} invalid row(s). {first_errors}')
+        return super().form_valid(form)
+
+
+class TransactionExportView(LoginRequiredMixin, View):
+    """Stream the user's transactions as CSV, NDJSON or columnar JSON"""
+    
+    def get(self, request, *args, **kwargs):
+        export_format = request.GET.get('format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            raise Http404('Unknown export format.')
+        
+        # Same filters as the transaction list; rows are streamed, never loaded
+        queryset = filter_transactions(Transaction.objects.filter(user=request.user), request.GET)
+        # Under ASGI a sync iterator would be read whole before sending
+        chunks = astream_export if isinstance(request, ASGIRequest) else stream_export
+        response = StreamingHttpResponse(
+            chunks(queryset, export_format),
+            content_type=EXPORT_FORMATS[export_format][0],
+        )
+        filename = export_filename(request.user.username, export_format)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class SpendingAnalyticsView(LoginRequiredMixin, View):
+    """Spending series, run-rate projection and anomaly flags as JSON"""
+    
+    def get(self, request, *args, **kwargs):
+        from .analytics import spending_analytics
+        
+        today = datetime.now().date()
+        analytics = dashboard_cache.get_spending_analytics(
+            request.user.pk, today, lambda: spending_analytics(request.user, today=today)
+        )
+        return JsonResponse(analytics.as_dict())
+
+
+class DashboardCacheStatsView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """Expose dashboard cache hit/miss counters to staff"""
+    
+    def test_func(self):
+        return self.request.user.is_staff
+    
+    def get(self, request, *args, **kwargs):
+        return JsonResponse(dashboard_cache.cache_stats())
+
+
 class SignUpView(CreateView):
     """User registration view"""
     form_class = SignUpForm
@@ -1,12 +1,14 @@
 from django.contrib import admin
-from .models import Watchlist
+from finance_portfolio.admin_tools import ScalableAdminMixin, UserFilter
+
+from .models import PriceRefreshRun, PriceSnapshot, TargetTrigger, Watchlist
 
 
 @admin.register(Watchlist)
-class WatchlistAdmin(admin.ModelAdmin):
+class WatchlistAdmin(ScalableAdminMixin, admin.ModelAdmin):
     list_display = ('symbol', 'name', 'user', 'asset_type', 'status', 
-                    'current_price', 'target_price', 'quantity', 'updated_at')
-    list_filter = ('status', 'asset_type', 'user')
+                    'current_price', 'target_price', 'currency', 'quantity', 'updated_at')
+    list_filter = ('status', 'asset_type', 'currency', UserFilter)
     search_fields = ('symbol', 'name', 'user__username', 'notes')
     ordering = ('-updated_at',)
     
@@ -15,7 +17,7 @@ class WatchlistAdmin(admin.ModelAdmin):
             'fields': ('user', 'symbol', 'name', 'asset_type')
         }),
         ('Trading Information', {
-            'fields': ('status', 'current_price', 'target_price')
+            'fields': ('status', 'currency', 'current_price', 'target_price')
         }),
         ('Position Details', {
             'fields': ('quantity', 'purchase_price'),
@@ -28,3 +30,29 @@ class WatchlistAdmin(admin.ModelAdmin):
     )
     
     readonly_fields = ('created_at', 'updated_at')
+
+
+@admin.register(PriceRefreshRun)
+class PriceRefreshRunAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'provider', 'symbols', 'fetched', 'rows_updated', 'triggered', 'errors', 'elapsed_ms')
+    list_filter = ('provider',)
+    ordering = ('-created_at',)
+    readonly_fields = ('provider', 'symbols', 'fetched', 'rows_updated', 'triggered', 'errors', 'elapsed_ms', 'created_at')
+
+
+@admin.register(PriceSnapshot)
+class PriceSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('symbol', 'date', 'price', 'created_at')
+    list_filter = ('date',)
+    search_fields = ('symbol',)
+    ordering = ('symbol', '-date')
+    readonly_fields = ('symbol', 'date', 'price', 'created_at')
+
+
+@admin.register(TargetTrigger)
+class TargetTriggerAdmin(admin.ModelAdmin):
+    list_display = ('symbol', 'signal', 'user', 'target_price', 'previous_price', 'price', 'created_at')
+    list_filter = ('signal',)
+    search_fields = ('symbol', 'user__username')
+    ordering = ('-created_at',)
+    readonly_fields = ('watchlist', 'user', 'symbol', 'signal', 'target_price', 'previous_price', 'price', 'created_at')
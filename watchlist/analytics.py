@@ -0,0 +1,200 @@
+"""
+Portfolio analytics computed on NumPy arrays.
+
+A user's positions are read with one ``values_list`` query and their price
+history is taken from the memory-mapped series in ``history`` (wrapped with
+``np.frombuffer``, so no copy). The series are aligned onto one calendar as
+a (days x positions) price matrix with as-of (forward-filled) prices, and
+every metric is then a whole-array operation:
+
+* time-weighted return and annualised volatility of the daily portfolio value
+* maximum drawdown of the chain-linked growth series
+* allocation by asset type and concentration (largest weight, Herfindahl index)
+
+Positions are assumed constant over the window, since the watchlist keeps
+current holdings only, not a trade history. Values are in the user's base
+currency, each position converted at today's rate.
+"""
+import datetime
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from finance_portfolio import fx
+
+from .history import get_series_many
+from .models import Watchlist
+
+
+TRADING_DAYS = 252
+
+
+@dataclass
+class PortfolioAnalytics:
+    """Metrics for one portfolio over a window"""
+    positions: int = 0
+    start: datetime.date = None
+    end: datetime.date = None
+    market_value: float = 0.0
+    time_weighted_return: float = None
+    volatility: float = None
+    max_drawdown: float = None
+    allocation: dict = field(default_factory=dict)
+    weights: dict = field(default_factory=dict)
+    largest_weight: float = None
+    herfindahl: float = None
+
+    def as_dict(self):
+        return {
+            'positions': self.positions,
+            'start': self.start.isoformat() if self.start else None,
+            'end': self.end.isoformat() if self.end else None,
+            'market_value': self.market_value,
+            'time_weighted_return': self.time_weighted_return,
+            'volatility': self.volatility,
+            'max_drawdown': self.max_drawdown,
+            'allocation': self.allocation,
+            'weights': self.weights,
+            'largest_weight': self.largest_weight,
+            'herfindahl': self.herfindahl,
+        }
+
+
+def load_positions(user, today=None):
+    """Held positions as ``(symbols, asset_types, quantities, current_prices)``.
+
+    Quantities are scaled by each position's rate into the base currency, so
+    quantity x local price is a value in the base currency.
+    """
+    rows = list(
+        Watchlist.objects.filter(user=user, quantity__gt=0)
+        .order_by('pk')
+        .values_list('symbol', 'asset_type', 'quantity', 'current_price', 'currency')
+    )
+    rates = fx.factors(
+        {row[4] for row in rows}, fx.base_currency(user.pk), today or datetime.date.today()
+    ) if rows else {}
+    symbols = [row[0] for row in rows]
+    asset_types = [row[1] for row in rows]
+    quantities = np.array([float(row[2] * rates[row[4]]) for row in rows], dtype=np.float64)
+    current_prices = np.array(
+        [np.nan if row[3] is None else float(row[3]) for row in rows], dtype=np.float64
+    )
+    return symbols, asset_types, quantities, current_prices
+
+
+def align_prices(series_columns, start, end):
+    """Align ``[(days, prices), ...]`` onto one calendar of days in ``[start, end]``.
+
+    ``days`` are ordinal arrays and ``prices`` float arrays, both ascending by
+    day. Returns ``(calendar, matrix)`` where ``calendar`` holds every day any
+    series has in the window and ``matrix[t, i]`` is the latest price of
+    position ``i`` on or before ``calendar[t]`` - NaN only before its first
+    observation.
+    """
+    start, end = start.toordinal(), end.toordinal()
+    count = len(series_columns)
+    bounds = [
+        (np.searchsorted(days, start, side='left'), np.searchsorted(days, end, side='right'))
+        for days, _ in series_columns
+    ]
+
+    present = np.zeros(end - start + 1, dtype=bool)
+    for (days, _), (lo, hi) in zip(series_columns, bounds):
+        present[days[lo:hi] - start] = True
+    calendar = np.flatnonzero(present) + start
+    length = len(calendar)
+
+    # One row per position (contiguous writes); column 0 holds the last
+    # price before the window so the first day can be forward filled.
+    aligned = np.full((count, length + 1), np.nan)
+    gaps = []
+    for column, ((days, prices), (lo, hi)) in enumerate(zip(series_columns, bounds)):
+        if lo:
+            aligned[column, 0] = prices[lo - 1]
+        if hi - lo == length:
+            # Every series day is a calendar day, so equal length means same days
+            aligned[column, 1:] = prices[lo:hi]
+        elif hi > lo:
+            aligned[column, np.searchsorted(calendar, days[lo:hi]) + 1] = prices[lo:hi]
+            gaps.append(column)
+        elif lo:
+            gaps.append(column)
+
+    if gaps:
+        block = aligned[gaps]
+        rows = np.where(np.isnan(block), 0, np.arange(length + 1))
+        np.maximum.accumulate(rows, axis=1, out=rows)
+        aligned[gaps] = np.take_along_axis(block, rows, axis=1)
+    return calendar, aligned[:, 1:].T
+
+
+def analyze(quantities, asset_types, calendar, matrix, current_prices=None, symbols=None):
+    """Compute ``PortfolioAnalytics`` from the output of ``align_prices``.
+
+    ``symbols``, when given, labels the per-position weights in the result.
+    """
+    result = PortfolioAnalytics(positions=len(quantities))
+    if current_prices is None:
+        current_prices = np.full(len(quantities), np.nan)
+
+    # Latest known price per position: history first, then the stored price
+    if len(calendar):
+        result.start = datetime.date.fromordinal(int(calendar[0]))
+        result.end = datetime.date.fromordinal(int(calendar[-1]))
+        last_prices = np.where(np.isnan(matrix[-1]), current_prices, matrix[-1])
+    else:
+        last_prices = current_prices
+    values = np.nan_to_num(quantities * last_prices)
+    total = values.sum()
+    result.market_value = float(total)
+
+    if total > 0:
+        weights = values / total
+        result.largest_weight = float(weights.max())
+        result.herfindahl = float(np.square(weights).sum())
+        if symbols is not None:
+            result.weights = dict(zip(symbols, weights.tolist()))
+        types, codes = np.unique(np.asarray(asset_types, dtype=object).astype(str), return_inverse=True)
+        by_type = np.bincount(codes, weights=weights, minlength=len(types))
+        result.allocation = {str(name): float(weight) for name, weight in zip(types, by_type)}
+
+    length = len(calendar)
+    if length > 1:
+        # Daily portfolio value, then chain-linked returns over the positions
+        # priced on both days: a position's first day adds value that is not
+        # a gain, so it is taken out of that day's closing value.
+        priced = ~np.isnan(matrix)
+        first = np.where(priced.any(axis=0), priced.argmax(axis=0), length)
+        value = np.nan_to_num(matrix) @ quantities
+        joining = (first > 0) & (first < length)
+        entry = np.bincount(
+            first[joining] - 1,
+            weights=quantities[joining] * matrix[first[joining], np.flatnonzero(joining)],
+            minlength=length - 1,
+        )
+        before, after = value[:-1], value[1:] - entry
+        mask = before > 0
+        returns = after[mask] / before[mask] - 1.0
+        if len(returns):
+            growth = np.cumprod(1.0 + returns)
+            result.time_weighted_return = float(growth[-1] - 1.0)
+            result.volatility = float(returns.std(ddof=1) * np.sqrt(TRADING_DAYS)) if len(returns) > 1 else 0.0
+            peaks = np.maximum.accumulate(np.concatenate(([1.0], growth)))
+            result.max_drawdown = float((growth / peaks[1:] - 1.0).min())
+
+    return result
+
+
+def portfolio_analytics(user, days=365, today=None):
+    """Load ``user``'s positions and price history once and analyse them"""
+    today = today or datetime.date.today()
+    symbols, asset_types, quantities, current_prices = load_positions(user, today)
+    series = get_series_many(symbols)
+    columns = [
+        (np.frombuffer(series[symbol].days, dtype=np.int32),
+         np.frombuffer(series[symbol].prices, dtype=np.float64))
+        for symbol in symbols
+    ]
+    calendar, matrix = align_prices(columns, today - datetime.timedelta(days=days), today)
+    return analyze(quantities, asset_types, calendar, matrix, current_prices, symbols)
@@ -7,7 +7,7 @@ class WatchlistForm(forms.ModelForm):
     
     class Meta:
         model = Watchlist
-        fields = ['symbol', 'name', 'asset_type', 'status', 'target_price', 
+        fields = ['symbol', 'name', 'asset_type', 'status', 'currency', 'target_price', 
                   'current_price', 'quantity', 'purchase_price', 'notes']
         widgets = {
             'symbol': forms.TextInput(attrs={
@@ -25,6 +25,9 @@ class WatchlistForm(forms.ModelForm):
             'status': forms.Select(attrs={
                 'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-blue-500 focus:ring-blue-500 bg-gray-50'
             }),
+            'currency': forms.Select(attrs={
+                'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-blue-500 focus:ring-blue-500 bg-gray-50'
+            }),
             'target_price': forms.NumberInput(attrs={
                 'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-blue-500 focus:ring-blue-500 bg-gray-50',
                 'placeholder': '0.00',
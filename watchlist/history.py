@@ -0,0 +1,293 @@
+"""
+Daily price history per symbol, shared by every user watching it.
+
+``PriceSnapshot`` rows in the database are the durable record (one row per
+symbol and day, written by the price refresh). Reads are served from a
+compact per-symbol file instead of the ORM::
+
+    header  '<4sII'  magic, row count n, capacity c
+    days    c x int32    proleptic ordinals (date.toordinal()), ascending
+    prices  c x float64  (8-byte aligned)
+
+Only the first n slots of each column are in use. The file is
+memory-mapped and exposed as ``memoryview`` columns, so range and as-of
+lookups are a ``bisect`` plus a slice - no model instances and no query.
+Files live in ``settings.PRICE_HISTORY_DIR``, named by the hex encoding of
+the symbol (symbols are user input). They are a derived cache: built from
+the snapshot table on first use, and replaced atomically so readers never
+see a partial file.
+
+A refresh appends its day in place: the day and price go into the next free
+slot and only then is the count raised, so a reader sees the old or the new
+series and never half a row. A file is rebuilt when it is full, or when a
+snapshot is recorded for a day before its last one.
+"""
+import bisect
+import datetime
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from array import array
+
+from django.conf import settings
+
+from .models import PriceSnapshot
+
+
+MAGIC = b'PHv2'
+HEADER = struct.Struct('<4sII')
+DAY = struct.Struct('<i')
+PRICE = struct.Struct('<d')
+
+# Free slots a rebuilt file keeps for the days appended after it
+HEADROOM = 366
+
+_series = {}
+_lock = threading.Lock()
+
+
+def history_dir():
+    path = getattr(settings, 'PRICE_HISTORY_DIR', None) or os.path.join(
+        tempfile.gettempdir(), 'finance_portfolio_prices'
+    )
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _path(symbol):
+    # Symbols are user input ('BRK/B', '../X'): name the file by the hex of
+    # the symbol, which is always a plain file name inside the directory
+    directory = history_dir()
+    path = os.path.join(directory, f'{symbol.upper().encode().hex()}.bin')
+    if os.path.dirname(os.path.abspath(path)) != os.path.abspath(directory):
+        raise ValueError(f'History file for {symbol!r} is outside {directory}')
+    return path
+
+
+def _prices_offset(capacity):
+    offset = HEADER.size + 4 * capacity
+    return offset + (-offset % 8)
+
+
+class PriceSeries:
+    """Read-only view of one symbol's daily closes"""
+
+    def __init__(self, symbol, days, prices, mapping=None, stamp=None):
+        self.symbol = symbol
+        self.days = days
+        self.prices = prices
+        self._mapping = mapping
+        self.stamp = stamp
+
+    @classmethod
+    def open(cls, symbol, path):
+        with open(path, 'rb') as handle:
+            stat = os.fstat(handle.fileno())
+            mapping = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(mapping) < HEADER.size or mapping[:4] != MAGIC:
+            mapping.close()
+            raise ValueError(f'{path} is not a price history file')
+        _, count, capacity = HEADER.unpack_from(mapping)
+        view = memoryview(mapping)
+        start = _prices_offset(capacity)
+        days = view[HEADER.size:HEADER.size + 4 * count].cast('i')
+        prices = view[start:start + 8 * count].cast('d')
+        return cls(symbol, days, prices, mapping, (stat.st_ino, count))
+
+    def __len__(self):
+        return len(self.days)
+
+    def stored_count(self):
+        """Row count in the file's header now, which an append may have raised"""
+        return HEADER.unpack_from(self._mapping)[1] if self._mapping is not None else len(self)
+
+    def range(self, start, end):
+        """``(dates, prices)`` lists for ``start <= date <= end``"""
+        lo = bisect.bisect_left(self.days, start.toordinal())
+        hi = bisect.bisect_right(self.days, end.toordinal())
+        return (
+            [datetime.date.fromordinal(day) for day in self.days[lo:hi].tolist()],
+            self.prices[lo:hi].tolist(),
+        )
+
+    def as_of(self, day):
+        """Latest price on or before ``day``, or None"""
+        index = bisect.bisect_right(self.days, day.toordinal())
+        return self.prices[index - 1] if index else None
+
+    def last(self):
+        """``(date, price)`` of the newest snapshot, or None"""
+        if not len(self.days):
+            return None
+        return datetime.date.fromordinal(self.days[-1]), self.prices[-1]
+
+
+def write_series(symbol, days, prices):
+    """Atomically replace the file for ``symbol`` with the given columns"""
+    days, prices = array('i', days), array('d', prices)
+    count = len(days)
+    capacity = count + HEADROOM
+    path = _path(symbol)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as handle:
+            handle.write(HEADER.pack(MAGIC, count, capacity))
+            handle.write(days.tobytes())
+            handle.write(b'\0' * (_prices_offset(capacity) - HEADER.size - 4 * count))
+            handle.write(prices.tobytes())
+            handle.write(b'\0' * (8 * (capacity - count)))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return path
+
+
+def append_day(symbol, day, price):
+    """Write ``price`` for ``day`` into ``symbol``'s file in place.
+
+    ``day`` must be the file's last day (its price is replaced) or later,
+    and the file must have a free slot. Returns False, having written
+    nothing, when the file is missing or cannot take the day that way.
+    """
+    ordinal = day.toordinal()
+    try:
+        handle = open(_path(symbol), 'r+b')
+    except FileNotFoundError:
+        return False
+    with handle:
+        header = handle.read(HEADER.size)
+        if len(header) < HEADER.size:
+            return False
+        magic, count, capacity = HEADER.unpack(header)
+        if magic != MAGIC:
+            return False
+        slot = count
+        if count:
+            handle.seek(HEADER.size + DAY.size * (count - 1))
+            last = DAY.unpack(handle.read(DAY.size))[0]
+            if ordinal < last:
+                return False
+            if ordinal == last:
+                slot = count - 1
+        if slot >= capacity:
+            return False
+        handle.seek(HEADER.size + DAY.size * slot)
+        handle.write(DAY.pack(ordinal))
+        handle.seek(_prices_offset(capacity) + PRICE.size * slot)
+        handle.write(PRICE.pack(price))
+        if slot == count:
+            # Publish the row only once it is complete
+            handle.flush()
+            handle.seek(0)
+            handle.write(HEADER.pack(MAGIC, count + 1, capacity))
+    return True
+
+
+def sync_symbols(symbols, chunk_size=5000):
+    """Rebuild the history files of ``symbols`` from the snapshot table"""
+    symbols = sorted({symbol.upper() for symbol in symbols})
+    columns = {symbol: (array('i'), array('d')) for symbol in symbols}
+    rows = (
+        PriceSnapshot.objects.filter(symbol__in=symbols)
+        .order_by('symbol', 'date')
+        .values_list('symbol', 'date', 'price')
+        .iterator(chunk_size=chunk_size)
+    )
+    for symbol, day, price in rows:
+        days, prices = columns[symbol]
+        days.append(day.toordinal())
+        prices.append(float(price))
+    for symbol, (days, prices) in columns.items():
+        write_series(symbol, days, prices)
+    with _lock:
+        for symbol in symbols:
+            _series.pop(symbol, None)
+    return len(symbols)
+
+
+def get_series(symbol):
+    """The memory-mapped series for ``symbol``, building its file if needed"""
+    symbol = symbol.upper()
+    path = _path(symbol)
+    try:
+        inode = os.stat(path).st_ino
+    except FileNotFoundError:
+        sync_symbols([symbol])
+        inode = os.stat(path).st_ino
+    with _lock:
+        series = _series.get(symbol)
+        # Another process may have replaced the file, or appended to it, since
+        # it was mapped
+        if series is not None and series.stamp == (inode, series.stored_count()):
+            return series
+    try:
+        series = PriceSeries.open(symbol, path)
+    except ValueError:
+        # Written in an older format
+        sync_symbols([symbol])
+        series = PriceSeries.open(symbol, path)
+    with _lock:
+        _series[symbol] = series
+    return series
+
+
+def get_series_many(symbols):
+    """``{symbol: series}`` for ``symbols``, building missing files in one query"""
+    symbols = {symbol.upper() for symbol in symbols}
+    missing = [symbol for symbol in symbols if not os.path.exists(_path(symbol))]
+    if missing:
+        sync_symbols(missing)
+    return {symbol: get_series(symbol) for symbol in symbols}
+
+
+def record_snapshots(prices, day=None):
+    """Store ``{symbol: price}`` as the snapshot for ``day`` (default: today).
+
+    History is append-only: earlier days are never rewritten, while a second
+    refresh on the same day replaces that day's price. ``day`` is appended to
+    each symbol's file in place; only files that cannot take it are rebuilt.
+    Returns the number of symbols.
+    """
+    day = day or datetime.date.today()
+    PriceSnapshot.objects.bulk_create(
+        [PriceSnapshot(symbol=symbol.upper(), date=day, price=price) for symbol, price in prices.items()],
+        update_conflicts=True,
+        unique_fields=['symbol', 'date'],
+        update_fields=['price'],
+        batch_size=1000,
+    )
+    rebuild = [symbol for symbol, price in prices.items() if not append_day(symbol, day, float(price))]
+    if rebuild:
+        sync_symbols(rebuild)
+    return len(prices)
+
+
+def price_chart(symbol, days=365, today=None, width=600, height=160):
+    """Series and SVG polyline points for the last ``days`` days of ``symbol``"""
+    today = today or datetime.date.today()
+    dates, prices = get_series(symbol).range(today - datetime.timedelta(days=days), today)
+    if not prices:
+        return None
+    low, high = min(prices), max(prices)
+    spread = (high - low) or 1.0
+    step = width / max(len(prices) - 1, 1)
+    points = ' '.join(
+        f'{index * step:.1f},{height - (price - low) / spread * height:.1f}'
+        for index, price in enumerate(prices)
+    )
+    return {
+        'points': points,
+        'width': width,
+        'height': height,
+        'start': dates[0],
+        'end': dates[-1],
+        'low': low,
+        'high': high,
+        'first': prices[0],
+        'last': prices[-1],
+        'change': prices[-1] - prices[0],
+    }
+
@@ -0,0 +1,54 @@
+import datetime
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from watchlist.analytics import align_prices, analyze
+from watchlist.models import Watchlist
+
+
+class Command(BaseCommand):
+    help = 'Time the portfolio analytics on synthetic positions and daily prices (no database)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--positions', type=int, default=10000)
+        parser.add_argument('--years', type=int, default=5)
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        positions, repeat = options['positions'], options['repeat']
+        end = datetime.date.today()
+        start = end - datetime.timedelta(days=365 * options['years'])
+
+        # Weekday calendar shared by all symbols, with log-normal price paths
+        ordinals = np.arange(start.toordinal(), end.toordinal() + 1, dtype=np.int32)
+        days = ordinals[(ordinals % 7) < 5]
+        returns = rng.normal(0.0003, 0.015, size=(len(days), positions))
+        paths = 100.0 * np.exp(np.cumsum(returns, axis=0))
+        columns = [(days, np.ascontiguousarray(paths[:, column])) for column in range(positions)]
+        quantities = rng.uniform(1, 100, size=positions)
+        type_codes = [code for code, _ in Watchlist.ASSET_TYPE_CHOICES]
+        asset_types = [type_codes[i] for i in rng.integers(0, len(type_codes), size=positions)]
+
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            calendar, matrix = align_prices(columns, start, end)
+            aligned = time.perf_counter()
+            result = analyze(quantities, asset_types, calendar, matrix)
+            timings.append((aligned - started, time.perf_counter() - aligned))
+
+        align_time = min(t[0] for t in timings)
+        analyze_time = min(t[1] for t in timings)
+        self.stdout.write(
+            f'{positions:,} positions x {len(days):,} days: '
+            f'align {align_time * 1000:.0f}ms, analyze {analyze_time * 1000:.0f}ms, '
+            f'total {(align_time + analyze_time) * 1000:.0f}ms (best of {repeat})'
+        )
+        self.stdout.write(
+            f'TWR {result.time_weighted_return:.2%}, volatility {result.volatility:.2%}, '
+            f'max drawdown {result.max_drawdown:.2%}, largest weight {result.largest_weight:.3%}'
+        )
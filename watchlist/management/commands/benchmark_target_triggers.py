@@ -0,0 +1,78 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from watchlist.triggers import TargetIndex
+
+
+class Command(BaseCommand):
+    help = 'Time target-price trigger detection on synthetic watchlist rows (no database)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--symbols', type=int, default=1000)
+        parser.add_argument('--updates', type=int, default=20000, help='Price updates to evaluate')
+        parser.add_argument('--scans', type=int, default=20, help='Updates to time with a full scan, for comparison')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        rows, symbol_count = options['rows'], options['symbols']
+
+        # Zipf-like popularity, targets within +-30% of each symbol's price
+        popularity = 1.0 / np.arange(1, symbol_count + 1)
+        symbol_of = rng.choice(symbol_count, size=rows, p=popularity / popularity.sum())
+        base = rng.uniform(5, 500, size=symbol_count)
+        targets = np.round(base[symbol_of] * rng.uniform(0.7, 1.3, size=rows), 2)
+        pks = np.arange(1, rows + 1)
+
+        started = time.perf_counter()
+        order = np.lexsort((pks, targets, symbol_of))
+        bounds = np.searchsorted(symbol_of[order], np.arange(symbol_count + 1))
+        indexes = {}
+        for symbol in range(symbol_count):
+            chunk = order[bounds[symbol]:bounds[symbol + 1]]
+            indexes[symbol] = TargetIndex.from_rows(
+                symbol, zip(targets[chunk].tolist(), pks[chunk].tolist()), float(base[symbol])
+            )
+        build = time.perf_counter() - started
+
+        # Price moves of up to +-2%, skewed towards the popular symbols
+        updates = options['updates']
+        moved = rng.choice(symbol_count, size=updates, p=popularity / popularity.sum())
+        factors = rng.uniform(0.98, 1.02, size=updates)
+        prices = base.copy()
+
+        crossed = 0
+        started = time.perf_counter()
+        for symbol, factor in zip(moved.tolist(), factors.tolist()):
+            index = indexes[symbol]
+            new = index.last_price * factor
+            _, hits = index.crossed(index.last_price, new)
+            crossed += len(hits)
+            index.last_price = new
+        indexed = time.perf_counter() - started
+
+        # The same kind of update answered by scanning every row
+        scans = min(options['scans'], updates)
+        started = time.perf_counter()
+        for symbol, factor in zip(moved[:scans].tolist(), factors[:scans].tolist()):
+            old, new = prices[symbol], prices[symbol] * factor
+            low, high = min(old, new), max(old, new)
+            hits = np.flatnonzero((symbol_of == symbol) & (targets > low) & (targets <= high))
+            prices[symbol] = new
+        scanned = (time.perf_counter() - started) / scans if scans else 0.0
+
+        per_update = indexed / updates
+        self.stdout.write(
+            f'{rows:,} rows over {symbol_count:,} symbols: index built in {build * 1000:.0f}ms'
+        )
+        self.stdout.write(
+            f'{updates:,} price updates: {indexed * 1000:.0f}ms total, '
+            f'{per_update * 1e6:.1f}us per update, {crossed:,} targets crossed'
+        )
+        if scans:
+            self.stdout.write(
+                f'full scan: {scanned * 1e6:,.0f}us per update ({scanned / per_update:,.0f}x slower)'
+            )
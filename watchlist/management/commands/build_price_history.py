@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from watchlist.history import history_dir, sync_symbols
+from watchlist.models import PriceSnapshot
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the memory-mapped price history files from the snapshot table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--symbol', action='append', dest='symbols', default=[],
+            help='Only rebuild this symbol (repeatable; default: every symbol)',
+        )
+
+    def handle(self, *args, **options):
+        symbols = options['symbols'] or (
+            PriceSnapshot.objects.order_by().values_list('symbol', flat=True).distinct()
+        )
+        count = sync_symbols(symbols)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} series in {history_dir()}.'))
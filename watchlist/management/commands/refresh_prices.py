@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from watchlist.prices import PriceProviderError, get_price_provider, refresh_prices
+
+
+class Command(BaseCommand):
+    help = 'Fetch the latest price of every watched symbol once and update all matching rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--symbol', action='append', dest='symbols', default=[],
+            help='Only refresh this symbol (repeatable)',
+        )
+        parser.add_argument(
+            '--provider', default=None,
+            help='Provider name or dotted path (default: PRICE_PROVIDER)',
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=None,
+            help='Maximum concurrent fetches (default: PRICE_REFRESH_CONCURRENCY)',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help='Rows per bulk_update batch (default: PRICE_REFRESH_BATCH_SIZE)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            provider = get_price_provider(options['provider'])
+        except ImportError as exc:
+            raise CommandError(str(exc))
+
+        try:
+            result = refresh_prices(
+                provider,
+                symbols=options['symbols'],
+                concurrency=options['concurrency'],
+                batch_size=options['batch_size'],
+            )
+        except PriceProviderError as exc:
+            raise CommandError(str(exc))
+
+        for symbol, error in sorted(result.errors.items()):
+            self.stderr.write(f'{symbol}: {error}')
+        if result.missing:
+            self.stderr.write(f"No price for: {', '.join(result.missing)}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Fetched {result.fetched}/{result.symbols} symbol(s) from {provider.name}, '
+            f'updated {result.rows_updated} row(s), {result.triggered} target(s) crossed, '
+            f'in {result.elapsed * 1000:.0f}ms.'
+        ))
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.1 on 2026-10-18 11:00
+
+from django.db import migrations
+
+from finance_portfolio.search import create_search_index, drop_search_index
+
+
+SEARCH_FIELDS = ('notes', 'symbol', 'name')
+
+
+def create_index(apps, schema_editor):
+    create_search_index(schema_editor, 'watchlist_watchlist', SEARCH_FIELDS)
+
+
+def drop_index(apps, schema_editor):
+    drop_search_index(schema_editor, 'watchlist_watchlist', SEARCH_FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('watchlist', '0002_watchlist_user_created_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
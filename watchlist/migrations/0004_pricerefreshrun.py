@@ -0,0 +1,31 @@
+# Generated by Django 5.0.1 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('watchlist', '0003_watchlist_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceRefreshRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(max_length=50)),
+                ('symbols', models.PositiveIntegerField(default=0, help_text='Distinct symbols requested')),
+                ('fetched', models.PositiveIntegerField(default=0, help_text='Symbols with a price returned')),
+                ('rows_updated', models.PositiveIntegerField(default=0, help_text='Watchlist rows written')),
+                ('errors', models.PositiveIntegerField(default=0)),
+                ('elapsed_ms', models.PositiveIntegerField(default=0, help_text='Wall-clock latency of the run')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Price Refresh Run',
+                'verbose_name_plural': 'Price Refresh Runs',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.1 on 2026-10-18 13:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('watchlist', '0004_pricerefreshrun'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symbol', models.CharField(max_length=10)),
+                ('date', models.DateField()),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Price Snapshot',
+                'verbose_name_plural': 'Price Snapshots',
+                'ordering': ['symbol', '-date'],
+                'constraints': [models.UniqueConstraint(fields=('symbol', 'date'), name='unique_price_snapshot_day')],
+            },
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.0.1 on 2026-10-18 16:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('watchlist', '0005_pricesnapshot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TargetTrigger',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symbol', models.CharField(max_length=10)),
+                ('signal', models.CharField(choices=[('BUY', 'Buy'), ('SELL', 'Sell')], max_length=4)),
+                ('target_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('previous_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Target Trigger',
+                'verbose_name_plural': 'Target Triggers',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='pricerefreshrun',
+            name='triggered',
+            field=models.PositiveIntegerField(default=0, help_text='Target prices crossed'),
+        ),
+        migrations.AddIndex(
+            model_name='watchlist',
+            index=models.Index(fields=['symbol', 'target_price'], name='watchlist_symbol_target_idx'),
+        ),
+        migrations.AddField(
+            model_name='targettrigger',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='target_triggers', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='targettrigger',
+            name='watchlist',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='target_triggers', to='watchlist.watchlist'),
+        ),
+        migrations.AddIndex(
+            model_name='targettrigger',
+            index=models.Index(fields=['user', '-created_at'], name='target_trigger_user_idx'),
+        ),
+    ]
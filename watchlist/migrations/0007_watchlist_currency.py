@@ -0,0 +1,19 @@
+# Generated by Django 5.0.1 on 2026-10-18 17:00
+
+import finance_portfolio.fx
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('watchlist', '0006_target_triggers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='watchlist',
+            name='currency',
+            field=models.CharField(choices=[('USD', 'US Dollar'), ('EUR', 'Euro'), ('GBP', 'British Pound'), ('JPY', 'Japanese Yen'), ('INR', 'Indian Rupee'), ('CAD', 'Canadian Dollar'), ('AUD', 'Australian Dollar'), ('CHF', 'Swiss Franc')], default=finance_portfolio.fx.default_currency, help_text='Currency of the prices', max_length=3),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.1 on 2026-10-18 18:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('watchlist', '0007_watchlist_currency'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='watchlist',
+            index=models.Index(fields=['-updated_at', '-id'], name='watchlist_updated_idx'),
+        ),
+    ]
@@ -1,5 +1,90 @@
+from decimal import Decimal
+
 from django.db import models
 from django.contrib.auth.models import User
+from django.db.models import Case, DecimalField, ExpressionWrapper, F, Q, Sum, Value, When
+from django.db.models.functions import Coalesce, NullIf
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from finance_portfolio import fx, search
+
+
+# Output types for valuation expressions: quantity (4 dp) times a price (2 dp)
+MONEY = DecimalField(max_digits=24, decimal_places=6)
+PERCENT = DecimalField(max_digits=24, decimal_places=6)
+
+
+def _nonzero(name):
+    # Zero behaves like a missing value, as in the Python properties
+    return NullIf(F(name), Value(0))
+
+
+class WatchlistQuerySet(models.QuerySet):
+    """Watchlist queries with valuation computed by the database"""
+    
+    def with_valuation(self):
+        """Annotate each row with its value, cost, gain/loss and gain/loss %.
+        
+        The model properties return these annotations when present instead of
+        recomputing them in Python.
+        """
+        quantity = _nonzero('quantity')
+        current_price = _nonzero('current_price')
+        purchase_price = _nonzero('purchase_price')
+        return self.annotate(
+            valuation_total_value=ExpressionWrapper(quantity * current_price, output_field=MONEY),
+            valuation_total_cost=ExpressionWrapper(quantity * purchase_price, output_field=MONEY),
+            valuation_gain_loss=ExpressionWrapper(
+                (current_price - purchase_price) * quantity, output_field=MONEY
+            ),
+            valuation_gain_loss_percentage=Case(
+                When(
+                    purchase_price__gt=0,
+                    then=ExpressionWrapper(
+                        (current_price - purchase_price) * Value(Decimal('100.0')) / purchase_price,
+                        output_field=PERCENT,
+                    ),
+                ),
+                default=None,
+                output_field=PERCENT,
+            ),
+        )
+    
+    def _totals_aggregates(self):
+        # Each item is converted into its owner's base currency at today's rate
+        return {
+            'total_value': Coalesce(
+                Sum(fx.to_base(ExpressionWrapper(F('quantity') * _nonzero('current_price'), output_field=MONEY))),
+                Value(Decimal('0')), output_field=MONEY,
+            ),
+            'total_cost': Coalesce(
+                Sum(fx.to_base(ExpressionWrapper(F('quantity') * _nonzero('purchase_price'), output_field=MONEY))),
+                Value(Decimal('0')), output_field=MONEY,
+            ),
+            # An item whose currency has no rate converts even 1 to NULL
+            'unconverted': fx.unconverted(fx.to_base(Value(Decimal('1'), output_field=MONEY))),
+        }
+    
+    @staticmethod
+    def _with_gain_loss(totals):
+        fx.check_converted(totals.pop('unconverted'))
+        total_value, total_cost = totals['total_value'], totals['total_cost']
+        total_gain_loss = total_value - total_cost if total_value and total_cost else Decimal('0')
+        totals['total_gain_loss'] = total_gain_loss
+        totals['total_gain_loss_percentage'] = (
+            total_gain_loss / total_cost * 100 if total_cost else None
+        )
+        return totals
+    
+    def portfolio_totals(self):
+        """Total value, cost, gain/loss and gain/loss % of held items in one query, in the base currency"""
+        return self._with_gain_loss(self.filter(quantity__gt=0).aggregate(**self._totals_aggregates()))
+    
+    async def aportfolio_totals(self):
+        """Async version of ``portfolio_totals``"""
+        totals = await self.filter(quantity__gt=0).aaggregate(**self._totals_aggregates())
+        return self._with_gain_loss(totals)
 
 
 class Watchlist(models.Model):
@@ -27,27 +112,45 @@ class Watchlist(models.Model):
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='HOLD')
     target_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     current_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    currency = models.CharField(
+        max_length=3, choices=fx.CURRENCY_CHOICES, default=fx.default_currency, help_text="Currency of the prices",
+    )
     quantity = models.DecimalField(max_digits=10, decimal_places=4, default=0, help_text="Quantity owned")
     purchase_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     notes = models.TextField(blank=True, help_text="Investment thesis or notes")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = WatchlistQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-created_at']
         verbose_name = "Watchlist Item"
         verbose_name_plural = "Watchlist Items"
         unique_together = ['user', 'symbol']
         indexes = [
-            models.Index(fields=['user', 'status']),
+            models.Index(fields=['user', 'status'], name='watchlist_user_status_idx'),
+            models.Index(fields=['user', '-created_at', '-id'], name='watchlist_user_created_idx'),
+            models.Index(fields=['symbol', 'target_price'], name='watchlist_symbol_target_idx'),
+            # The admin changelist's ordering
+            models.Index(fields=['-updated_at', '-id'], name='watchlist_updated_idx'),
         ]
     
     def __str__(self):
         return f"{self.symbol} - {self.get_status_display()}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the stored symbol so renaming one can refresh its target index"""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_symbol = instance.__dict__.get('symbol')
+        return instance
+    
     @property
     def gain_loss(self):
         """Calculate gain/loss if quantity and prices are available"""
+        if 'valuation_gain_loss' in self.__dict__:
+            return self.valuation_gain_loss
         if self.quantity and self.purchase_price and self.current_price:
             return (self.current_price - self.purchase_price) * self.quantity
         return None
@@ -55,6 +158,8 @@ class Watchlist(models.Model):
     @property
     def gain_loss_percentage(self):
         """Calculate gain/loss percentage"""
+        if 'valuation_gain_loss_percentage' in self.__dict__:
+            return self.valuation_gain_loss_percentage
         if self.purchase_price and self.current_price and self.purchase_price > 0:
             return ((self.current_price - self.purchase_price) / self.purchase_price) * 100
         return None
@@ -62,13 +167,121 @@ class Watchlist(models.Model):
     @property
     def total_value(self):
         """Calculate total current value"""
+        if 'valuation_total_value' in self.__dict__:
+            return self.valuation_total_value
         if self.quantity and self.current_price:
             return self.quantity * self.current_price
         return None
     
+    @property
+    def potential_gain(self):
+        """Distance from the current price to the target price"""
+        if self.target_price is not None and self.current_price is not None:
+            return self.target_price - self.current_price
+        return None
+    
     @property
     def total_cost(self):
         """Calculate total purchase cost"""
+        if 'valuation_total_cost' in self.__dict__:
+            return self.valuation_total_cost
         if self.quantity and self.purchase_price:
             return self.quantity * self.purchase_price
         return None
+
+
+class PriceSnapshot(models.Model):
+    """Daily price of a symbol, shared by every user watching it (append-only)"""
+    
+    symbol = models.CharField(max_length=10)
+    date = models.DateField()
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['symbol', '-date']
+        verbose_name = "Price Snapshot"
+        verbose_name_plural = "Price Snapshots"
+        constraints = [
+            models.UniqueConstraint(fields=['symbol', 'date'], name='unique_price_snapshot_day'),
+        ]
+    
+    def __str__(self):
+        return f"{self.symbol} {self.date}: {self.price}"
+
+
+class PriceRefreshRun(models.Model):
+    """One execution of the market price refresh"""
+    
+    provider = models.CharField(max_length=50)
+    symbols = models.PositiveIntegerField(default=0, help_text="Distinct symbols requested")
+    fetched = models.PositiveIntegerField(default=0, help_text="Symbols with a price returned")
+    rows_updated = models.PositiveIntegerField(default=0, help_text="Watchlist rows written")
+    errors = models.PositiveIntegerField(default=0)
+    triggered = models.PositiveIntegerField(default=0, help_text="Target prices crossed")
+    elapsed_ms = models.PositiveIntegerField(default=0, help_text="Wall-clock latency of the run")
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Price Refresh Run"
+        verbose_name_plural = "Price Refresh Runs"
+    
+    def __str__(self):
+        return f"{self.provider} @ {self.created_at:%Y-%m-%d %H:%M} ({self.rows_updated} rows)"
+
+
+class TargetTrigger(models.Model):
+    """A price update that crossed a watchlist item's target price"""
+    
+    SIGNAL_CHOICES = [
+        ('BUY', 'Buy'),
+        ('SELL', 'Sell'),
+    ]
+    
+    watchlist = models.ForeignKey(Watchlist, on_delete=models.CASCADE, related_name='target_triggers')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='target_triggers')
+    symbol = models.CharField(max_length=10)
+    signal = models.CharField(max_length=4, choices=SIGNAL_CHOICES)
+    target_price = models.DecimalField(max_digits=10, decimal_places=2)
+    previous_price = models.DecimalField(max_digits=10, decimal_places=2)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Target Trigger"
+        verbose_name_plural = "Target Triggers"
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='target_trigger_user_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.symbol} {self.get_signal_display()}: {self.previous_price} -> {self.price} (target {self.target_price})"
+
+
+# Keep the full-text search index in sync
+@receiver(post_save, sender=Watchlist)
+def index_watchlist_on_save(sender, instance, **kwargs):
+    """Add or refresh the item in the search index"""
+    search.index_instance(instance)
+    _invalidate_targets(instance)
+
+
+@receiver(post_delete, sender=Watchlist)
+def remove_watchlist_from_index(sender, instance, **kwargs):
+    """Drop a deleted item from the search index"""
+    search.remove_instance(instance)
+    _invalidate_targets(instance)
+
+
+def _invalidate_targets(instance):
+    # Rebuild the symbol's target index, and the old symbol's after a rename
+    from .triggers import invalidate_symbols
+
+    symbols = {instance.symbol}
+    loaded = getattr(instance, '_loaded_symbol', None)
+    if loaded:
+        symbols.add(loaded)
+    invalidate_symbols(symbols)
+    instance._loaded_symbol = instance.symbol
@@ -0,0 +1,191 @@
+"""
+Market price refresh for ``Watchlist.current_price``.
+
+The same ticker appears once per user (``unique_together = ['user',
+'symbol']``), so a refresh first collects the distinct symbols, fetches each
+one exactly once - concurrently, bounded by an asyncio semaphore - and then
+writes the prices back to every affected row with one ``bulk_update`` per
+batch. The prices are also appended to the price history, and each run is
+recorded as a ``PriceRefreshRun``.
+
+Providers implement ``PriceProvider.fetch``. ``LocalPriceProvider`` reads
+prices from a JSON file (``{"AAPL": "189.50", ...}``) for offline use and
+development; other providers are selected with ``settings.PRICE_PROVIDER``
+(a registered name or a dotted path).
+"""
+import asyncio
+import json
+import time
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .history import record_snapshots
+from .models import PriceRefreshRun, Watchlist
+from .triggers import fire_triggers
+
+
+# current_price is stored with two decimal places
+PRICE_QUANTUM = Decimal('0.01')
+
+
+class PriceProviderError(Exception):
+    """Raised by a provider when a quote cannot be fetched"""
+
+
+class PriceProvider:
+    """Interface for market data sources"""
+    name = 'base'
+
+    async def fetch(self, symbol):
+        """Return the latest price for ``symbol`` as a Decimal, or None if unknown"""
+        raise NotImplementedError
+
+
+class LocalPriceProvider(PriceProvider):
+    """Prices read from a local JSON file of ``{symbol: price}``"""
+    name = 'local'
+
+    def __init__(self, path=None, delay=0.0):
+        self.path = path or getattr(settings, 'PRICE_FIXTURE_PATH', None)
+        # Optional artificial latency, to exercise the concurrent fetch path
+        self.delay = delay
+        self._prices = None
+
+    def load(self):
+        if self._prices is None:
+            try:
+                with open(self.path, encoding='utf-8') as fixture:
+                    data = json.load(fixture)
+            except (OSError, ValueError) as exc:
+                raise PriceProviderError(f'Cannot read price file {self.path}: {exc}') from exc
+            self._prices = {str(symbol).upper(): price for symbol, price in data.items()}
+        return self._prices
+
+    async def fetch(self, symbol):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        price = self.load().get(symbol.upper())
+        return None if price is None else Decimal(str(price))
+
+
+PROVIDERS = {
+    'local': LocalPriceProvider,
+}
+
+
+def get_price_provider(name=None):
+    """Instantiate the configured provider (registered name or dotted path)"""
+    name = name or getattr(settings, 'PRICE_PROVIDER', 'local')
+    provider_class = PROVIDERS.get(name) or import_string(name)
+    return provider_class()
+
+
+@dataclass
+class PriceRefreshResult:
+    """Outcome of a refresh run"""
+    symbols: int = 0
+    fetched: int = 0
+    rows_updated: int = 0
+    triggered: int = 0
+    elapsed: float = 0.0
+    missing: list = field(default_factory=list)
+    errors: dict = field(default_factory=dict)
+
+
+async def fetch_prices(provider, symbols, concurrency=None):
+    """Fetch ``symbols`` concurrently; returns ``(prices, errors)`` dicts"""
+    semaphore = asyncio.Semaphore(concurrency or getattr(settings, 'PRICE_REFRESH_CONCURRENCY', 8))
+    prices, errors = {}, {}
+
+    async def fetch_one(symbol):
+        async with semaphore:
+            try:
+                price = await provider.fetch(symbol)
+            except Exception as exc:  # one bad quote must not abort the run
+                errors[symbol] = str(exc) or exc.__class__.__name__
+                return
+        if price is not None:
+            try:
+                prices[symbol] = Decimal(price).quantize(PRICE_QUANTUM)
+            except InvalidOperation:
+                errors[symbol] = f'Invalid price: {price!r}'
+
+    await asyncio.gather(*(fetch_one(symbol) for symbol in symbols))
+    return prices, errors
+
+
+def write_prices(prices, batch_size=None):
+    """Write ``prices`` to every row holding those symbols; returns rows written"""
+    batch_size = batch_size or getattr(settings, 'PRICE_REFRESH_BATCH_SIZE', 500)
+    now = timezone.now()
+    rows = (
+        Watchlist.objects.filter(symbol__in=list(prices))
+        .only('pk', 'symbol', 'current_price')
+        .order_by('pk')
+        .iterator(chunk_size=batch_size)
+    )
+    written = 0
+    batch = []
+
+    def flush():
+        Watchlist.objects.bulk_update(batch, ['current_price', 'updated_at'])
+        batch.clear()
+
+    with db_transaction.atomic():
+        for item in rows:
+            price = prices[item.symbol]
+            if item.current_price == price:
+                continue
+            item.current_price = price
+            # bulk_update does not apply auto_now
+            item.updated_at = now
+            batch.append(item)
+            written += 1
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+    return written
+
+
+def refresh_prices(provider=None, symbols=None, concurrency=None, batch_size=None):
+    """Fetch every distinct watched symbol once and update all matching rows"""
+    provider = provider or get_price_provider()
+    started = time.perf_counter()
+
+    queryset = Watchlist.objects.all()
+    if symbols:
+        queryset = queryset.filter(symbol__in=[symbol.upper() for symbol in symbols])
+    # order_by() drops the default ordering so DISTINCT applies to the symbol alone
+    distinct_symbols = sorted(queryset.order_by().values_list('symbol', flat=True).distinct())
+
+    prices, errors = asyncio.run(fetch_prices(provider, distinct_symbols, concurrency))
+    result = PriceRefreshResult(
+        symbols=len(distinct_symbols),
+        fetched=len(prices),
+        missing=[symbol for symbol in distinct_symbols if symbol not in prices and symbol not in errors],
+        errors=errors,
+    )
+    if prices:
+        with db_transaction.atomic():
+            # Compares against the previous prices, so before they are overwritten
+            result.triggered = len(fire_triggers(prices))
+            result.rows_updated = write_prices(prices, batch_size)
+        record_snapshots(prices)
+    result.elapsed = time.perf_counter() - started
+
+    PriceRefreshRun.objects.create(
+        provider=provider.name,
+        symbols=result.symbols,
+        fetched=result.fetched,
+        rows_updated=result.rows_updated,
+        errors=len(errors),
+        triggered=result.triggered,
+        elapsed_ms=round(result.elapsed * 1000),
+    )
+    return result
@@ -0,0 +1,138 @@
+import datetime
+import os
+import tempfile
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from . import history, triggers
+from .models import PriceSnapshot, Watchlist
+
+
+class PriceHistoryTestCase(TestCase):
+    """Runs against an empty PRICE_HISTORY_DIR of its own"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = os.path.join(directory.name, 'prices')
+        settings_override = override_settings(PRICE_HISTORY_DIR=self.directory)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(history._series.clear)
+
+
+class PriceHistoryPathTests(PriceHistoryTestCase):
+    """History files stay inside PRICE_HISTORY_DIR whatever the symbol"""
+
+    def assert_inside(self, symbol):
+        path = history._path(symbol)
+        self.assertEqual(os.path.dirname(path), self.directory)
+        return path
+
+    def test_symbol_with_slash(self):
+        day = datetime.date(2026, 10, 1)
+        history.record_snapshots({'BRK/B': Decimal('412.50')}, day=day)
+        self.assertTrue(os.path.exists(self.assert_inside('BRK/B')))
+        self.assertEqual(history.get_series('brk/b').last(), (day, 412.5))
+
+    def test_symbol_with_parent_reference(self):
+        self.assert_inside('../EVIL')
+        self.assertIsNone(history.get_series('../EVIL').last())
+        self.assertEqual(os.listdir(os.path.dirname(self.directory)), ['prices'])
+
+    def test_detail_view_of_symbol_with_slash(self):
+        user = User.objects.create_user('alice', password='pw')
+        item = Watchlist.objects.create(user=user, symbol='BRK/B', quantity=Decimal('2'))
+        self.client.force_login(user)
+        response = self.client.get(reverse('watchlist_detail', args=[item.pk]), secure=True)
+        self.assertEqual(response.status_code, 200)
+
+
+class PriceHistoryAppendTests(PriceHistoryTestCase):
+    """A refresh appends its day to the history file instead of rewriting it"""
+
+    def record(self, day, price):
+        history.record_snapshots({'AAA': Decimal(price)}, day=datetime.date(2026, 10, day))
+
+    def inode(self):
+        return os.stat(history._path('AAA')).st_ino
+
+    def assert_series(self, expected):
+        series = history.get_series('AAA')
+        dates, prices = series.range(datetime.date(2026, 1, 1), datetime.date(2026, 12, 31))
+        self.assertEqual(list(zip((day.day for day in dates), prices)), expected)
+
+    def test_new_day_is_appended_in_place(self):
+        self.record(1, '10.00')
+        inode = self.inode()
+        self.assert_series([(1, 10.0)])
+        self.record(2, '11.00')
+        self.record(2, '12.00')
+        self.assertEqual(self.inode(), inode)
+        self.assert_series([(1, 10.0), (2, 12.0)])
+
+    def test_earlier_day_rebuilds(self):
+        self.record(1, '10.00')
+        self.record(3, '13.00')
+        inode = self.inode()
+        self.record(2, '12.00')
+        self.assertNotEqual(self.inode(), inode)
+        self.assert_series([(1, 10.0), (2, 12.0), (3, 13.0)])
+
+    def test_full_file_rebuilds(self):
+        with mock.patch.object(history, 'HEADROOM', 1):
+            self.record(1, '10.00')
+            self.record(2, '11.00')
+            inode = self.inode()
+            self.record(3, '12.00')
+        self.assertNotEqual(self.inode(), inode)
+        self.assert_series([(1, 10.0), (2, 11.0), (3, 12.0)])
+
+    def test_older_format_rebuilds(self):
+        self.record(1, '10.00')
+        history._series.clear()
+        with open(history._path('AAA'), 'wb') as handle:
+            handle.write(b'PHv1\0\0\0\0')
+        self.assert_series([(1, 10.0)])
+
+
+class TargetIndexQueryTests(PriceHistoryTestCase):
+    """Target indexes are built in a fixed number of queries however many symbols"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.addCleanup(triggers._indexes.clear)
+        user = User.objects.create_user('alice', password='pw')
+        self.symbols = ['AAA', 'BBB', 'CCC', 'DDD']
+        for index, symbol in enumerate(self.symbols):
+            Watchlist.objects.create(
+                user=user, symbol=symbol, quantity=Decimal('1'), target_price=Decimal(100 + index),
+            )
+            for day in (1, 2):
+                PriceSnapshot.objects.create(
+                    symbol=symbol, date=datetime.date(2026, 10, day), price=Decimal(90 + index + day),
+                )
+
+    def test_cold_build(self):
+        # Targets, then the snapshots of every symbol without a history file
+        with self.assertNumQueries(2):
+            indexes = triggers.get_indexes(self.symbols)
+        self.assertEqual(
+            {symbol: index.last_price for symbol, index in indexes.items()},
+            {'AAA': 92.0, 'BBB': 93.0, 'CCC': 94.0, 'DDD': 95.0},
+        )
+        with self.assertNumQueries(0):
+            triggers.get_indexes(self.symbols)
+
+    def test_rebuild_with_history_files(self):
+        triggers.get_indexes(self.symbols)
+        triggers._indexes.clear()
+        with self.assertNumQueries(1):
+            indexes = triggers.get_indexes(self.symbols)
+        self.assertEqual(indexes['DDD'].last_price, 95.0)
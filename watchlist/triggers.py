@@ -0,0 +1,207 @@
+"""
+Target-price triggers: detect watchlist rows whose ``target_price`` a price
+update has crossed.
+
+Each symbol has an in-memory ``TargetIndex``: the targets of every row
+watching it, sorted, in two parallel arrays (targets and row ids). A price
+move from ``old`` to ``new`` crosses exactly the targets between the two, so
+the rows are found with two ``bisect`` calls and a slice - O(log n + k) for
+n targets and k crossings, instead of a scan of the watchlist table.
+
+Indexes are built lazily from the database and rebuilt when their
+per-symbol version in the cache moves, which the Watchlist signals do on
+every save and delete; other processes notice on their next update. The
+price an index starts from is the symbol's latest price snapshot, read from
+its history file. A build of any number of symbols takes one query for their
+targets (served by ``watchlist_symbol_target_idx``), plus one for the
+snapshots of the symbols that have no history file yet.
+
+A rise through a target is a SELL signal and a fall through one a BUY
+signal. Every crossing is recorded as a ``TargetTrigger``; with
+``WATCHLIST_TRIGGER_UPDATE_STATUS`` the row's ``status`` is set to the
+signal as well.
+"""
+import bisect
+import threading
+import time
+from array import array
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction as db_transaction
+
+from .models import TargetTrigger, Watchlist
+
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+def update_status_enabled():
+    return getattr(settings, 'WATCHLIST_TRIGGER_UPDATE_STATUS', False)
+
+
+def _version_key(symbol):
+    return f'watchlist:targets:version:{symbol}'
+
+
+def invalidate_symbols(symbols):
+    """Mark the target indexes of ``symbols`` stale in every process"""
+    cache.set_many({_version_key(symbol.upper()): time.time_ns() for symbol in symbols}, None)
+
+
+def _versions(symbols):
+    keys = {_version_key(symbol): symbol for symbol in symbols}
+    found = cache.get_many(list(keys))
+    missing = {key: time.time_ns() for key in keys if key not in found}
+    if missing:
+        for key, version in missing.items():
+            cache.add(key, version, None)
+        found.update(cache.get_many(list(missing)))
+    return {keys[key]: version for key, version in found.items()}
+
+
+class TargetIndex:
+    """Sorted targets of one symbol with the id of the row holding each"""
+
+    def __init__(self, symbol, targets, pks, last_price=None, version=None):
+        self.symbol = symbol
+        self.targets = targets
+        self.pks = pks
+        self.last_price = last_price
+        self.version = version
+
+    @classmethod
+    def from_rows(cls, symbol, rows, last_price=None, version=None):
+        """Build from ``(target, pk)`` pairs already sorted by target"""
+        targets, pks = array('d'), array('q')
+        for target, pk in rows:
+            targets.append(float(target))
+            pks.append(pk)
+        return cls(symbol, targets, pks, last_price, version)
+
+    def __len__(self):
+        return len(self.targets)
+
+    def crossed(self, old, new):
+        """``(signal, pks)`` for the targets a move from ``old`` to ``new`` crossed.
+
+        Rising crosses ``old < target <= new`` (SELL), falling crosses
+        ``new <= target < old`` (BUY). No previous price, no crossing.
+        """
+        if old is None or new == old:
+            return None, self.pks[:0]
+        if new > old:
+            lo = bisect.bisect_right(self.targets, old)
+            hi = bisect.bisect_right(self.targets, new)
+            return 'SELL', self.pks[lo:hi]
+        lo = bisect.bisect_left(self.targets, new)
+        hi = bisect.bisect_left(self.targets, old)
+        return 'BUY', self.pks[lo:hi]
+
+
+def _last_prices(symbols):
+    from .history import get_series_many
+
+    prices = {}
+    for symbol, series in get_series_many(symbols).items():
+        last = series.last()
+        prices[symbol] = last[1] if last else None
+    return prices
+
+
+def _build(symbols, versions):
+    rows = {symbol: [] for symbol in symbols}
+    queryset = (
+        Watchlist.objects.filter(symbol__in=symbols, target_price__isnull=False)
+        .order_by('symbol', 'target_price', 'pk')
+        .values_list('symbol', 'target_price', 'pk')
+        .iterator(chunk_size=10000)
+    )
+    for symbol, target, pk in queryset:
+        rows[symbol].append((target, pk))
+    last_prices = _last_prices(symbols)
+    return {
+        symbol: TargetIndex.from_rows(symbol, pairs, last_prices[symbol], versions.get(symbol))
+        for symbol, pairs in rows.items()
+    }
+
+
+def get_indexes(symbols):
+    """``{symbol: TargetIndex}``, (re)building stale ones together (see ``_build``)"""
+    symbols = sorted({symbol.upper() for symbol in symbols})
+    versions = _versions(symbols)
+    with _lock:
+        current = {symbol: _indexes.get(symbol) for symbol in symbols}
+    stale = [
+        symbol for symbol, index in current.items()
+        if index is None or index.version != versions.get(symbol)
+    ]
+    if stale:
+        built = _build(stale, versions)
+        with _lock:
+            for symbol, index in built.items():
+                # Carry the in-process price forward when only the targets changed
+                previous = _indexes.get(symbol)
+                if previous is not None and previous.last_price is not None:
+                    index.last_price = previous.last_price
+                _indexes[symbol] = index
+        current.update(built)
+    return current
+
+
+def fire_triggers(prices, update_status=None):
+    """Record the targets crossed by moving each symbol to its price in ``prices``.
+
+    Call before the new prices are written. Returns the TargetTrigger rows
+    created. Crossed rows are re-read (O(k)), so an index that missed an
+    invalidation never fires for a changed or deleted row.
+    """
+    update_status = update_status_enabled() if update_status is None else update_status
+    prices = {symbol.upper(): price for symbol, price in prices.items()}
+    indexes = get_indexes(prices)
+    triggers = []
+    flips = {'BUY': [], 'SELL': []}
+    moved = {}
+
+    for symbol, index in indexes.items():
+        new = prices.get(symbol)
+        if new is None:
+            continue
+        new = float(new)
+        old = index.last_price
+        moved[symbol] = new
+        signal, pks = index.crossed(old, new)
+        if not len(pks):
+            continue
+        low, high = min(old, new), max(old, new)
+        current = Watchlist.objects.filter(pk__in=pks.tolist(), symbol=symbol).values_list(
+            'pk', 'user_id', 'target_price', 'status'
+        )
+        for pk, user_id, target, status in current:
+            if target is None or not low <= float(target) <= high:
+                continue
+            triggers.append(TargetTrigger(
+                watchlist_id=pk, user_id=user_id, symbol=symbol, signal=signal,
+                target_price=target, previous_price=Decimal(str(old)), price=Decimal(str(new)),
+            ))
+            if update_status and status != signal:
+                flips[signal].append(pk)
+
+    if triggers:
+        TargetTrigger.objects.bulk_create(triggers, batch_size=1000)
+    for signal, pks in flips.items():
+        for start in range(0, len(pks), 1000):
+            Watchlist.objects.filter(pk__in=pks[start:start + 1000]).update(status=signal)
+
+    def advance():
+        with _lock:
+            for symbol, price in moved.items():
+                index = _indexes.get(symbol)
+                if index is not None:
+                    index.last_price = price
+
+    # Only move the indexes on once the triggers and prices are committed
+    db_transaction.on_commit(advance)
+    return triggers
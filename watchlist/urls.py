@@ -1,14 +1,19 @@
+from django.conf import settings
 from django.urls import path
 from .views import (
+    AsyncWatchlistListView,
     WatchlistListView,
     WatchlistCreateView,
     WatchlistUpdateView,
     WatchlistDeleteView,
     WatchlistDetailView,
+    PortfolioAnalyticsView,
 )
 
 urlpatterns = [
-    path('', WatchlistListView.as_view(), name='watchlist_list'),
+    path('', (AsyncWatchlistListView if settings.ASYNC_VIEWS else WatchlistListView).as_view(),
+         name='watchlist_list'),
+    path('analytics/', PortfolioAnalyticsView.as_view(), name='portfolio_analytics'),
     path('add/', WatchlistCreateView.as_view(), name='watchlist_create'),
     path('<int:pk>/', WatchlistDetailView.as_view(), name='watchlist_detail'),
     path('<int:pk>/edit/', WatchlistUpdateView.as_view(), name='watchlist_update'),
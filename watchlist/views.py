@@ -1,22 +1,29 @@
-from django.views.generic import ListView, CreateView, UpdateView, DeleteView, DetailView
+from django.views.generic import ListView, CreateView, UpdateView, DeleteView, DetailView, View
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import JsonResponse
 from django.urls import reverse_lazy
 from django.contrib import messages
 from django.db.models import Sum, Q
 from decimal import Decimal
+from finance_portfolio import fx
+from finance_portfolio.asyncviews import AsyncListMixin, AsyncLoginRequiredMixin
+from finance_portfolio.pagination import KeysetPaginationMixin
+from finance_portfolio.search import get_search_backend
+from .history import price_chart
 from .models import Watchlist
 from .forms import WatchlistForm
 
 
-class WatchlistListView(LoginRequiredMixin, ListView):
+class WatchlistListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     """List all watchlist items for the logged-in user"""
     model = Watchlist
     template_name = 'watchlist/watchlist_list.html'
     context_object_name = 'watchlist_items'
     paginate_by = 20
+    cursor_ordering = ('-created_at', '-id')
     
     def get_queryset(self):
-        queryset = Watchlist.objects.filter(user=self.request.user)
+        queryset = Watchlist.objects.filter(user=self.request.user).with_valuation()
         
         # Filter by status
         status = self.request.GET.get('status')
@@ -28,29 +35,22 @@ class WatchlistListView(LoginRequiredMixin, ListView):
         if asset_type:
             queryset = queryset.filter(asset_type=asset_type)
         
-        # Search
+        # Search (full-text index, best matches first)
         search = self.request.GET.get('search')
         if search:
-            queryset = queryset.filter(
-                Q(symbol__icontains=search) | 
-                Q(name__icontains=search) |
-                Q(notes__icontains=search)
-            )
+            return get_search_backend(Watchlist).ranked(queryset, search)
         
-        return queryset
+        return queryset.order_by(*self.cursor_ordering)
+    
+    def use_cursor_pagination(self):
+        # Ranked search results are ordered by relevance, not by the keyset
+        return super().use_cursor_pagination() and not self.request.GET.get('search')
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Calculate portfolio statistics
-        all_items = Watchlist.objects.filter(
-            user=self.request.user,
-            quantity__gt=0
-        )
-        
-        total_value = sum([item.total_value for item in all_items if item.total_value])
-        total_cost = sum([item.total_cost for item in all_items if item.total_cost])
-        total_gain_loss = total_value - total_cost if total_value and total_cost else 0
+        # Portfolio statistics from a single aggregate query
+        totals = self.get_portfolio_totals()
         
         context.update({
             'statuses': Watchlist.STATUS_CHOICES,
@@ -58,12 +58,33 @@ class WatchlistListView(LoginRequiredMixin, ListView):
             'current_status': self.request.GET.get('status', ''),
             'current_asset_type': self.request.GET.get('asset_type', ''),
             'current_search': self.request.GET.get('search', ''),
-            'total_portfolio_value': total_value,
-            'total_portfolio_cost': total_cost,
-            'total_gain_loss': total_gain_loss,
+            # Totals are in the base currency, items in their own
+            'currency_symbol': fx.symbol(self.get_base_currency()),
+            'total_portfolio_value': totals['total_value'],
+            'total_portfolio_cost': totals['total_cost'],
+            'total_gain_loss': totals['total_gain_loss'],
+            'total_gain_loss_percentage': totals['total_gain_loss_percentage'],
         })
         
         return context
+    
+    def get_portfolio_totals(self):
+        return Watchlist.objects.filter(user=self.request.user).portfolio_totals()
+    
+    def get_base_currency(self):
+        return self.request.profile.base_currency
+
+
+class AsyncWatchlistListView(AsyncLoginRequiredMixin, AsyncListMixin, WatchlistListView):
+    """WatchlistListView for ASGI: the page and the totals are awaited"""
+    
+    async def aprefetch(self):
+        # The profile is memoized on the request, where get_base_currency finds it
+        await self.request.aprofile()
+        self._portfolio_totals = await Watchlist.objects.filter(user=self.request.user).aportfolio_totals()
+    
+    def get_portfolio_totals(self):
+        return self._portfolio_totals
 
 
 class WatchlistCreateView(LoginRequiredMixin, CreateView):
@@ -73,6 +94,9 @@ class WatchlistCreateView(LoginRequiredMixin, CreateView):
     template_name = 'watchlist/watchlist_form.html'
     success_url = reverse_lazy('watchlist_list')
     
+    def get_initial(self):
+        return {'currency': self.request.profile.base_currency}
+    
     def form_valid(self, form):
         form.instance.user = self.request.user
         messages.success(self.request, f'Added {form.instance.symbol} to your watchlist!')
@@ -128,4 +152,31 @@ class WatchlistDetailView(LoginRequiredMixin, DetailView):
     context_object_name = 'item'
     
     def get_queryset(self):
-        return Watchlist.objects.filter(user=self.request.user)
+        return Watchlist.objects.filter(user=self.request.user).with_valuation()
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # 1-year chart from the memory-mapped price history (no ORM rows)
+        context['price_chart'] = price_chart(self.object.symbol)
+        context['target_triggers'] = self.object.target_triggers.all()[:5]
+        if self.object.quantity:
+            # NumPy is imported on first use, not at startup
+            from .analytics import portfolio_analytics
+            
+            analytics = portfolio_analytics(self.request.user)
+            context['analytics'] = analytics
+            context['position_weight'] = analytics.weights.get(self.object.symbol)
+        return context
+
+
+class PortfolioAnalyticsView(LoginRequiredMixin, View):
+    """Portfolio return, risk and allocation metrics as JSON"""
+    
+    def get(self, request, *args, **kwargs):
+        from .analytics import portfolio_analytics
+        
+        try:
+            days = min(max(int(request.GET.get('days', 365)), 2), 3650)
+        except ValueError:
+            days = 365
+        return JsonResponse(portfolio_analytics(request.user, days=days).as_dict())